@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, ForeignKey, Numeric, Index, event
 from sqlalchemy.orm import relationship
 from .database import Base
+from ..services.business_day import to_business_day
+from ..services import plates
 from datetime import datetime, timezone
 
 class User(Base):
@@ -25,15 +27,27 @@ class ParkingSpot(Base):
     type_id = Column(Integer, ForeignKey('vehicle_types.id'), nullable=False)
     is_occupied = Column(Boolean, default=False)
     booking = Column(Boolean, default=False)  # True if spot is reserved for mobile booking
+    # Layout used to order spot assignment (services/spot_assignment.py)
+    zone = Column(String(20), nullable=True)
+    level = Column(Integer, nullable=False, default=0)  # 0 = ground floor
+    distance_rank = Column(Integer, nullable=True)  # 1 = closest to the entrance
     vehicle_type = relationship('VehicleType')
 
 class Vehicle(Base):
     __tablename__ = 'vehicles'
     id = Column(Integer, primary_key=True)
     plate_number = Column(String(20), unique=True, nullable=False)
+    # Letters and digits of the plate (services/plates.py), kept in sync on write
+    plate_key = Column(String(20), unique=True, nullable=False)
     type_id = Column(Integer, ForeignKey('vehicle_types.id'), nullable=False)
     vehicle_type = relationship('VehicleType')
 
+@event.listens_for(Vehicle, 'before_insert')
+@event.listens_for(Vehicle, 'before_update')
+def _set_plate_key(mapper, connection, target):
+    target.plate_number = plates.canonical_plate(target.plate_number)
+    target.plate_key = plates.plate_key(target.plate_number)
+
 class RFIDAccount(Base):
     __tablename__ = 'rfid_accounts'
     id = Column(Integer, primary_key=True)
@@ -82,6 +96,9 @@ class ParkingSession(Base):
     calculated_fee_lkr = Column(Numeric(10,2))
     payment_method = Column(String(20))
     payment_status = Column(String(20))
+    # Local business-day keys (see services/business_day.py), kept in sync on write
+    entry_day = Column(Date, index=True)
+    exit_day = Column(Date, index=True)
     vehicle = relationship('Vehicle')
     spot = relationship('ParkingSpot')
 
@@ -92,8 +109,24 @@ class Payment(Base):
     method = Column(String(20), nullable=False)  # cash | rfid
     amount_lkr = Column(Numeric(10,2), nullable=False)
     timestamp = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    business_day = Column(Date, index=True)  # Local business day of timestamp
     cashier_id = Column(Integer, ForeignKey('users.id'))
 
+@event.listens_for(ParkingSession, 'before_insert')
+@event.listens_for(ParkingSession, 'before_update')
+def _set_session_days(mapper, connection, target):
+    if target.entry_time is None:
+        target.entry_time = datetime.now(timezone.utc)
+    target.entry_day = to_business_day(target.entry_time)
+    target.exit_day = to_business_day(target.exit_time)
+
+@event.listens_for(Payment, 'before_insert')
+@event.listens_for(Payment, 'before_update')
+def _set_payment_day(mapper, connection, target):
+    if target.timestamp is None:
+        target.timestamp = datetime.now(timezone.utc)
+    target.business_day = to_business_day(target.timestamp)
+
 class AuditLog(Base):
     __tablename__ = 'audit_logs'
     id = Column(Integer, primary_key=True)
@@ -124,6 +157,12 @@ class MobileUser(Base):
 class MobileBooking(Base):
     """Parking spot reservations from mobile app - valid for 15 minutes"""
     __tablename__ = 'mobile_bookings'
+    __table_args__ = (
+        # A user's active bookings (not cancelled, not checked in, not expired)
+        Index('ix_mobile_bookings_user_state', 'user_id', 'is_cancelled', 'is_checked_in', 'expires_at'),
+        # A user's booking history, newest first, paged on (expires_at, id)
+        Index('ix_mobile_bookings_user_expires', 'user_id', 'expires_at', 'id'),
+    )
     
     id = Column(String(50), primary_key=True)
     user_id = Column(Integer, ForeignKey('mobile_users.id'), nullable=False)
@@ -144,3 +183,26 @@ class MobileBooking(Base):
     user = relationship('MobileUser', back_populates='bookings')
     vehicle = relationship('Vehicle')
     spot = relationship('ParkingSpot')
+
+class AppSetting(Base):
+    """Values the application works out once and shares between its processes"""
+    __tablename__ = 'app_settings'
+
+    key = Column(String(50), primary_key=True)
+    value = Column(String(255), nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class LoginAttempt(Base):
+    """A login or registration attempt from an address (account NULL), or a failed login of account from it"""
+    __tablename__ = 'login_attempts'
+    __table_args__ = (
+        # Attempts of an address (account IS NULL) and failures of an account from it, in a time window
+        Index('ix_login_attempts_ip', 'ip', 'account', 'attempted_at'),
+        # Rows past every window are deleted by time
+        Index('ix_login_attempts_time', 'attempted_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    ip = Column(String(45), nullable=False)
+    account = Column(String(120), nullable=True)
+    attempted_at = Column(DateTime(timezone=True), nullable=False)
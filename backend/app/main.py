@@ -1,29 +1,35 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from .routers import auth, admin
-from .routers.admin_fee import fee as admin_fee
-from .routers import controller as controller_router
-from .routers import controller_sessions as controller_sessions_router
-from .routers import entry as entry_router
-from .routers import payments as payments_router
-from .routers import receipts as receipts_router
-from .routers import admin_spots as admin_spots_router
-from .routers import accountant_reports as accountant_reports_router
-from .routers import camera as camera_router
-from .routers import rfid_accounts as rfid_accounts_router
-from .routers import admin_users as admin_users_router
-from .routers import mobile_api as mobile_api_router
+import os
 from .db.database import engine
 from .db import models
+from .services import run_mode
+from .services.run_mode import close_rpc_clients
+
+# Creating tables is a deploy step (scripts/init_db.py, then migrations/*.sql);
+# AUTO_CREATE_SCHEMA=1 also does it on every start, for local development
+AUTO_CREATE_SCHEMA = os.getenv("AUTO_CREATE_SCHEMA", "0") == "1"
 
-# Create tables on startup (simple bootstrap; replace with Alembic for prod)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    models.Base.metadata.create_all(bind=engine)
+    if AUTO_CREATE_SCHEMA:
+        models.Base.metadata.create_all(bind=engine)
+    if run_mode.serves_api():
+        from .services.passwords import configure_password_cost
+        configure_password_cost()
+    if run_mode.owns_gates():
+        from .services.lane_workflow import get_lane_workflows
+        await get_lane_workflows().start()
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    await close_rpc_clients()
+    if run_mode.owns_gates():
+        from .services.lane_workflow import shutdown_lane_workflows
+        from .services.plc_poller import shutdown_plc_poller
+        await shutdown_lane_workflows()
+        await shutdown_plc_poller()
 
 app = FastAPI(title="Parking System API", lifespan=lifespan)
 
@@ -35,19 +41,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(auth.router, prefix="/auth", tags=["auth"])
-app.include_router(admin.router, prefix="/admin", tags=["admin"])
-app.include_router(admin_fee.router, prefix="/admin/fees", tags=["fees"])
-app.include_router(admin_users_router.router, prefix="/admin", tags=["admin-users"])
-app.include_router(mobile_api_router.router, tags=["mobile"])
-app.include_router(controller_router.router, prefix="/controller", tags=["controller"])
-app.include_router(controller_sessions_router.router, prefix="/controller", tags=["controller-sessions"])
-app.include_router(entry_router.router, prefix="/entry", tags=["entry"])
-app.include_router(payments_router.router, prefix="/payments", tags=["payments"])
-app.include_router(receipts_router.router, tags=["receipts"])
-app.include_router(admin_spots_router.router, prefix="/admin/spots", tags=["admin-spots"])
-app.include_router(camera_router.router, prefix="/camera", tags=["camera"])
-app.include_router(rfid_accounts_router.router)
+# Routers are imported only in the modes that serve them (see services/run_mode.py)
+if run_mode.serves_api():
+    from .routers import auth, admin
+    from .routers.admin_fee import fee as admin_fee
+    from .routers import controller as controller_router
+    from .routers import controller_sessions as controller_sessions_router
+    from .routers import entry as entry_router
+    from .routers import payments as payments_router
+    from .routers import receipts as receipts_router
+    from .routers import admin_spots as admin_spots_router
+    from .routers import accountant_reports as accountant_reports_router
+    from .routers import analytics as analytics_router
+    from .routers import camera as camera_router
+    from .routers import rfid_accounts as rfid_accounts_router
+    from .routers import admin_users as admin_users_router
+    from .routers import mobile_api as mobile_api_router
+
+    app.include_router(auth.router, prefix="/auth", tags=["auth"])
+    app.include_router(admin.router, prefix="/admin", tags=["admin"])
+    app.include_router(admin_fee.router, prefix="/admin/fees", tags=["fees"])
+    app.include_router(admin_users_router.router, prefix="/admin", tags=["admin-users"])
+    app.include_router(mobile_api_router.router, tags=["mobile"])
+    app.include_router(controller_router.router, prefix="/controller", tags=["controller"])
+    app.include_router(controller_sessions_router.router, prefix="/controller", tags=["controller-sessions"])
+    app.include_router(entry_router.router, prefix="/entry", tags=["entry"])
+    app.include_router(payments_router.router, prefix="/payments", tags=["payments"])
+    app.include_router(receipts_router.router, tags=["receipts"])
+    app.include_router(admin_spots_router.router, prefix="/admin/spots", tags=["admin-spots"])
+    app.include_router(camera_router.router, prefix="/camera", tags=["camera"])
+    app.include_router(rfid_accounts_router.router)
+    app.include_router(accountant_reports_router.router, prefix="/accountant", tags=["reports"])
+    app.include_router(analytics_router.router, prefix="/analytics", tags=["analytics"])
+
+# Internal endpoints exist only on dedicated processes; `all` calls the same code in-process
+if run_mode.APP_MODE == run_mode.MODE_OCR_WORKER:
+    from .routers.internal import ocr_router
+    app.include_router(ocr_router, prefix="/internal", tags=["internal"])
+
+if run_mode.APP_MODE == run_mode.MODE_GATE_CONTROLLER:
+    from .routers.internal import lanes_router
+    app.include_router(lanes_router, prefix="/internal", tags=["internal"])
 
 # Simple health check endpoints
 @app.get("/health")
@@ -64,8 +98,27 @@ def health_db():
         return {"database": "connected"}
     except Exception as e:
         return {"database": "error", "detail": str(e)}
-app.include_router(accountant_reports_router.router, prefix="/accountant", tags=["reports"])
+
+if run_mode.owns_gates():
+    from .services.plc_controller import get_plc_link_status
+
+    @app.get("/health/plc")
+    def health_plc():
+        # Reports on the existing link only; never opens a PLC connection itself
+        status = get_plc_link_status()
+        if status is None:
+            return {"plc": "not_started"}
+        all_connected = all(link["connected"] for link in status.values())
+        return {"plc": "connected" if all_connected else "degraded", "links": status}
+
+if run_mode.serves_api():
+    from .services.passwords import bcrypt_rounds, password_pool
+
+    @app.get("/health/passwords")
+    def health_passwords():
+        # Password hashing pool load; a climbing "rejected" means logins are being turned away
+        return {"bcrypt_rounds": bcrypt_rounds(), **password_pool.stats()}
 
 @app.get("/")
 def root():
-    return {"status": "ok"}
+    return {"status": "ok", "mode": run_mode.APP_MODE}
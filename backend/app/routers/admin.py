@@ -1,33 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from datetime import datetime
-import os
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-JWT_SECRET = os.getenv("JWT_SECRET", "change_me_secret")
-ALGORITHM = "HS256"
+# Routers import the auth dependency from here
+from .auth_deps import ALGORITHM, JWT_SECRET, ROLES, get_current_role, oauth2_scheme
 
 router = APIRouter()
 
-ROLES = {"Controller", "Accountant", "Admin", "RFID_Registrar"}
-
-async def get_current_role(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
-        role = payload.get("role")
-        if not role:
-            raise HTTPException(status_code=401, detail="Role not found in token")
-        # Check token expiry
-        exp = payload.get("exp")
-        if exp and datetime.now().timestamp() > exp:
-            raise HTTPException(status_code=401, detail="Token expired")
-        if role not in ROLES:
-            raise HTTPException(status_code=403, detail="Invalid role")
-        return role
-    except JWTError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
-
 @router.get("/me")
 async def me(role: str = Depends(get_current_role)):
     return {"role": role}
@@ -11,6 +11,9 @@ class SpotRequest(BaseModel):
     label: str
     type_code: str = None
     type_id: int = None
+    zone: str = None
+    level: int = None
+    distance_rank: int = None  # 1 = closest to the entrance
 
 @router.get('/')
 async def list_spots(role: str = Depends(get_current_role), db: Session = Depends(get_db)):
@@ -36,7 +39,8 @@ async def create_spot(payload: SpotRequest, role: str = Depends(get_current_role
     existing = db.query(ParkingSpot).filter(ParkingSpot.label == payload.label).first()
     if existing:
         raise HTTPException(status_code=409, detail='Spot label already exists')
-    spot = ParkingSpot(label=payload.label, type_id=vtype.id, is_occupied=False)
+    spot = ParkingSpot(label=payload.label, type_id=vtype.id, is_occupied=False,
+                       zone=payload.zone, level=payload.level or 0, distance_rank=payload.distance_rank)
     db.add(spot)
     db.commit()
     db.refresh(spot)
@@ -69,6 +73,14 @@ async def update_spot(spot_id: int, payload: SpotRequest, role: str = Depends(ge
             raise HTTPException(status_code=404, detail='Vehicle type not found')
         spot.type_id = vtype.id
     
+    # Update layout if provided (re-orders spot assignment for the type)
+    if payload.zone is not None:
+        spot.zone = payload.zone or None
+    if payload.level is not None:
+        spot.level = payload.level
+    if payload.distance_rank is not None:
+        spot.distance_rank = payload.distance_rank
+    
     db.commit()
     db.refresh(spot)
     return spot
@@ -2,12 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
-from passlib.context import CryptContext
 from ..db.database import get_db
 from ..db.models import User
+from .auth_deps import hash_new_password
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class UserCreate(BaseModel):
     username: str
@@ -58,7 +57,7 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"Invalid role. Must be one of: {', '.join(valid_roles)}")
     
     # Hash password
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await hash_new_password(user.password)
     
     # Create user
     new_user = User(
@@ -94,7 +93,7 @@ async def update_user(user_id: int, user_update: UserUpdate, db: Session = Depen
     
     # Update password if provided
     if user_update.password is not None:
-        user.password_hash = pwd_context.hash(user_update.password)  # type: ignore
+        user.password_hash = await hash_new_password(user_update.password)  # type: ignore
     
     # Update role if provided
     if user_update.role is not None:
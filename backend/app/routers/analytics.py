@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from ..db.database import get_db
+from .admin import get_current_role
+from ..services import analytics
+from datetime import datetime
+
+router = APIRouter()
+
+def _parse_day(date_str: str):
+    try:
+        return datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid date format, expected YYYY-MM-DD')
+
+@router.get('/occupancy')
+async def hourly_occupancy(date_str: str, role: str = Depends(get_current_role), db: Session = Depends(get_db)):
+    """Hourly occupancy curve and peak hour for a business day"""
+    if role not in ['Accountant', 'Admin']:
+        raise HTTPException(status_code=403, detail='Not permitted')
+    return analytics.hourly_occupancy(db, _parse_day(date_str))
+
+@router.get('/dwell-time')
+async def dwell_time(date_str: str, role: str = Depends(get_current_role), db: Session = Depends(get_db)):
+    """Dwell-time histogram and averages per vehicle type"""
+    if role not in ['Accountant', 'Admin']:
+        raise HTTPException(status_code=403, detail='Not permitted')
+    return analytics.dwell_time_by_type(db, _parse_day(date_str))
+
+@router.get('/turnover')
+async def spot_turnover(date_str: str, role: str = Depends(get_current_role), db: Session = Depends(get_db)):
+    """Sessions per spot for a business day"""
+    if role not in ['Accountant', 'Admin']:
+        raise HTTPException(status_code=403, detail='Not permitted')
+    return analytics.spot_turnover(db, _parse_day(date_str))
@@ -1,26 +1,28 @@
 from datetime import datetime, timedelta, timezone
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
-import os
 
 from ..db.database import get_db
 from ..db.models import User
+from ..services.passwords import login_limiter
+from .auth_deps import ALGORITHM, JWT_SECRET, check_login_rate, store_upgraded_hash, verify_login
 
 router = APIRouter()
 
-JWT_SECRET = os.getenv("JWT_SECRET", "change_me_secret")
-ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 @router.post("/login")
 @router.post("/token")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    account = f"staff:{form_data.username}"
+    ip = check_login_rate(request, db, account)
     user = db.query(User).filter(User.username == form_data.username, User.status == True).first()
-    if not user or not pwd_context.verify(form_data.password, str(user.password_hash)):
+    valid, new_hash = await verify_login(form_data.password, str(user.password_hash)) if user else (False, None)
+    if not valid:
+        login_limiter.failed(db, account, ip)
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    login_limiter.succeeded(db, account, ip)
+    store_upgraded_hash(db, user, new_hash)
     payload = {
         "sub": user.username,
         "role": user.role,
@@ -0,0 +1,216 @@
+"""
+Auth Dependencies
+Bearer token verification shared by every router
+
+A token is decoded and its HS256 signature checked once; the verified
+claims are then kept in an LRU keyed by the SHA-256 of the token until the
+token expires (at most AUTH_CACHE_TTL seconds for tokens without an exp).
+Within a request FastAPI resolves get_claims once however many dependencies
+use it, so a request costs at most one verification and usually none.
+The dependencies are async so the cached path never leaves the event loop.
+The LRU is per process and needs no sharing between API workers: it only
+saves re-checking a signature, which gives the same answer in every
+process, and tokens are never revoked before they expire.
+
+Routes depend on a principal rather than on raw claims:
+    get_current_role    staff role string (Admin, Controller, ...)
+    get_staff           StaffPrincipal
+    get_mobile_user     MobilePrincipal for /mobile endpoints
+
+Login and registration endpoints go through check_login_rate and the
+password helpers here, which turn services/passwords.py limits into 429
+and 503 responses. Rate limits are per client address (client_ip): the
+X-Forwarded-For header is only believed on requests that come from one of
+TRUSTED_PROXIES (comma-separated addresses or CIDR networks, e.g. the
+nginx container), as anyone else can put any address in it.
+"""
+
+import hashlib
+import ipaddress
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from sqlalchemy.orm import Session
+
+from ..services.passwords import PasswordBusyError, hash_password, login_limiter, verify_and_update
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+JWT_SECRET = os.getenv("JWT_SECRET", "change_me_secret")
+ALGORITHM = "HS256"
+
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+
+TRUSTED_PROXIES: List = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("TRUSTED_PROXIES", "").split(",") if proxy.strip()
+]
+
+ROLES = {"Controller", "Accountant", "Admin", "RFID_Registrar"}
+MOBILE_ROLE = "Mobile_User"
+
+
+@dataclass(frozen=True)
+class StaffPrincipal:
+    username: str
+    role: str
+
+
+@dataclass(frozen=True)
+class MobilePrincipal:
+    user_id: int
+    username: str
+
+
+class ClaimsCache:
+    """Thread-safe LRU of verified claims: {sha256(token): (claims, valid_until)}"""
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[Tuple[dict, float]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: bytes, claims: dict):
+        exp = claims.get("exp")
+        valid_until = float(exp) if exp else time.time() + self.ttl
+        with self._lock:
+            self._items[key] = (claims, valid_until)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def discard(self, key: bytes):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+claims_cache = ClaimsCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+
+async def get_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """Verified claims of the bearer token, decoded once per token"""
+    key = hashlib.sha256(token.encode()).digest()
+    cached = claims_cache.get(key)
+    if cached is None:
+        try:
+            # jose rejects an expired exp here
+            claims = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
+        except JWTError as e:
+            raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+        claims_cache.put(key, claims)
+        return claims
+    claims, valid_until = cached
+    if time.time() > valid_until:
+        claims_cache.discard(key)
+        raise HTTPException(status_code=401, detail="Token expired")
+    return claims
+
+
+async def get_staff(claims: dict = Depends(get_claims)) -> StaffPrincipal:
+    role = claims.get("role")
+    if not role:
+        raise HTTPException(status_code=401, detail="Role not found in token")
+    if role not in ROLES:
+        raise HTTPException(status_code=403, detail="Invalid role")
+    return StaffPrincipal(username=claims.get("sub", ""), role=role)
+
+
+async def get_current_role(staff: StaffPrincipal = Depends(get_staff)) -> str:
+    return staff.role
+
+
+async def get_mobile_user(claims: dict = Depends(get_claims)) -> MobilePrincipal:
+    if claims.get("role") != MOBILE_ROLE or not isinstance(claims.get("user_id"), int):
+        raise HTTPException(status_code=403, detail="Mobile app login required")
+    return MobilePrincipal(user_id=claims["user_id"], username=claims.get("sub", ""))
+
+
+def _trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """
+    Address of the client that sent the request
+
+    Behind trusted proxies this is the right-most X-Forwarded-For entry that
+    is not itself a trusted proxy; entries left of it were written by the
+    client and are ignored.
+    """
+    peer = request.client.host if request.client else ""
+    if not _trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for header in request.headers.getlist("x-forwarded-for")
+            for hop in header.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def check_login_rate(request: Request, db: Session, username: Optional[str] = None) -> str:
+    """
+    Count a login (or registration) attempt; 429 if the client or account is over its limit
+
+    Returns:
+        str: Client address, for reporting the outcome to login_limiter
+    """
+    ip = client_ip(request)
+    retry_after = login_limiter.check(db, ip, username)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    return ip
+
+
+async def hash_new_password(password: str) -> str:
+    try:
+        return await hash_password(password)
+    except PasswordBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+async def verify_login(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """Check a login password; the second value is an upgraded hash to store, if any"""
+    try:
+        return await verify_and_update(password, password_hash)
+    except PasswordBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+def store_upgraded_hash(db, account, new_hash: Optional[str]):
+    """Save a hash re-computed at login; the login succeeds even if this fails"""
+    if not new_hash:
+        return
+    try:
+        account.password_hash = new_hash
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"[Auth] Could not store upgraded password hash: {e}")
@@ -4,25 +4,18 @@ Handles camera capture, vehicle detection, and gate control operations
 """
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
-from typing import Dict
+from typing import Dict, Optional
 import base64
 from datetime import datetime
 
 from ..db.database import get_db
 from ..routers.admin import get_current_role
-from ..services.plate_recognition import (
-    process_vehicle_image, 
-    get_next_available_spot
-)
+from ..services.plate_recognition import get_next_available_spot
+from ..services.lanes import ENTRY, EXIT
+from ..services.run_mode import RPCError, get_gates, get_ocr
 
 router = APIRouter()
 
-# Gate status storage (in production, use Redis or database)
-gate_status = {
-    'entry_gate': {'open': False, 'last_updated': None},
-    'exit_gate': {'open': False, 'last_updated': None}
-}
-
 # Camera settings storage (in production, use database)
 camera_settings = {
     'camera1_device': '0',  # Default to device 0
@@ -78,8 +71,10 @@ async def capture_camera1(
         
         # Process image to extract plate and type
         try:
-            result = process_vehicle_image(image_data)
+            result = await get_ocr().recognize(image_data)
             print(f"[Camera1] OCR Result: plate={result.get('plate')}, type={result.get('type_code')}, error={result.get('error')}")
+        except RPCError as e:
+            raise HTTPException(status_code=503, detail=str(e))
         except Exception as ocr_err:
             print(f"[Camera1] OCR Processing Exception: {str(ocr_err)}")
             import traceback
@@ -174,7 +169,10 @@ async def capture_camera2(
         print(f"[Camera2] Received image: {len(image_data)} bytes")
         
         # Process image to extract plate
-        result = process_vehicle_image(image_data)
+        try:
+            result = await get_ocr().recognize(image_data)
+        except RPCError as e:
+            raise HTTPException(status_code=503, detail=str(e))
         print(f"[Camera2] OCR Result: plate={result.get('plate')}")
         
         # If no plate detected, return UNKNOWN
@@ -216,89 +214,77 @@ async def capture_camera2(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Camera capture failed: {str(e)}")
 
-@router.post("/gates/entry/open")
-async def open_entry_gate(role: str = Depends(get_current_role)):
-    """Open entry gate (green indicator)"""
-    if role not in ['Admin', 'Controller']:
-        raise HTTPException(status_code=403, detail='Controller access required')
-    
-    gate_status['entry_gate']['open'] = True
-    gate_status['entry_gate']['last_updated'] = datetime.utcnow().isoformat()
-    
+def _gate_view(status: Dict) -> Dict:
+    gate_open = status['gate_up']
     return {
-        'gate': 'entry',
-        'status': 'open',
-        'color': 'green',
-        'timestamp': gate_status['entry_gate']['last_updated']
+        'lane_id': status['lane_id'],
+        'open': gate_open,
+        'status': 'open' if gate_open else 'closed',
+        'state': status['state'],
+        'color': 'green' if gate_open else 'red',
+        'last_updated': status['updated_at']
     }
 
-@router.post("/gates/entry/close")
-async def close_entry_gate(role: str = Depends(get_current_role)):
-    """Close entry gate (red indicator)"""
+async def _gate_command(direction: str, action: str, lane_id: Optional[str], role: str) -> Dict:
     if role not in ['Admin', 'Controller']:
         raise HTTPException(status_code=403, detail='Controller access required')
     
-    gate_status['entry_gate']['open'] = False
-    gate_status['entry_gate']['last_updated'] = datetime.utcnow().isoformat()
+    try:
+        status = await get_gates().command(direction, action, lane_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RPCError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
+    view = _gate_view(status)
     return {
-        'gate': 'entry',
-        'status': 'closed',
-        'color': 'red',
-        'timestamp': gate_status['entry_gate']['last_updated']
+        'gate': direction,
+        'lane_id': view['lane_id'],
+        'status': view['status'],
+        'state': view['state'],
+        'color': view['color'],
+        'timestamp': view['last_updated']
     }
 
+@router.post("/gates/entry/open")
+async def open_entry_gate(lane_id: Optional[str] = None, role: str = Depends(get_current_role)):
+    """Open entry gate (green indicator)"""
+    return await _gate_command(ENTRY, 'open', lane_id, role)
+
+@router.post("/gates/entry/close")
+async def close_entry_gate(lane_id: Optional[str] = None, role: str = Depends(get_current_role)):
+    """Close entry gate (red indicator)"""
+    return await _gate_command(ENTRY, 'close', lane_id, role)
+
 @router.post("/gates/exit/open")
-async def open_exit_gate(role: str = Depends(get_current_role)):
+async def open_exit_gate(lane_id: Optional[str] = None, role: str = Depends(get_current_role)):
     """Open exit gate (green indicator)"""
-    if role not in ['Admin', 'Controller']:
-        raise HTTPException(status_code=403, detail='Controller access required')
-    
-    gate_status['exit_gate']['open'] = True
-    gate_status['exit_gate']['last_updated'] = datetime.utcnow().isoformat()
-    
-    return {
-        'gate': 'exit',
-        'status': 'open',
-        'color': 'green',
-        'timestamp': gate_status['exit_gate']['last_updated']
-    }
+    return await _gate_command(EXIT, 'open', lane_id, role)
 
 @router.post("/gates/exit/close")
-async def close_exit_gate(role: str = Depends(get_current_role)):
+async def close_exit_gate(lane_id: Optional[str] = None, role: str = Depends(get_current_role)):
     """Close exit gate (red indicator)"""
-    if role not in ['Admin', 'Controller']:
-        raise HTTPException(status_code=403, detail='Controller access required')
-    
-    gate_status['exit_gate']['open'] = False
-    gate_status['exit_gate']['last_updated'] = datetime.utcnow().isoformat()
-    
-    return {
-        'gate': 'exit',
-        'status': 'closed',
-        'color': 'red',
-        'timestamp': gate_status['exit_gate']['last_updated']
-    }
+    return await _gate_command(EXIT, 'close', lane_id, role)
 
 @router.get("/gates/status")
 async def get_gates_status(role: str = Depends(get_current_role)):
-    """Get current status of both gates"""
+    """Get current state of every lane; entry_gate/exit_gate are the first lane of each direction"""
     if role not in ['Admin', 'Controller']:
         raise HTTPException(status_code=403, detail='Controller access required')
     
+    try:
+        statuses = await get_gates().status()
+    except RPCError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    lanes = [dict(_gate_view(status), direction=status['direction']) for status in statuses]
+    # Lanes come in configuration order, so the first of a direction is its default lane
+    first = {}
+    for lane in lanes:
+        first.setdefault(lane['direction'], lane)
     return {
-        'entry_gate': {
-            'open': gate_status['entry_gate']['open'],
-            'status': 'open' if gate_status['entry_gate']['open'] else 'closed',
-            'color': 'green' if gate_status['entry_gate']['open'] else 'red',
-            'last_updated': gate_status['entry_gate']['last_updated']
-        },
-        'exit_gate': {
-            'open': gate_status['exit_gate']['open'],
-            'status': 'open' if gate_status['exit_gate']['open'] else 'closed',
-            'color': 'green' if gate_status['exit_gate']['open'] else 'red',
-            'last_updated': gate_status['exit_gate']['last_updated']
-        }
+        'entry_gate': first.get(ENTRY),
+        'exit_gate': first.get(EXIT),
+        'lanes': lanes
     }
 
 @router.get("/settings")
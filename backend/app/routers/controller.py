@@ -4,6 +4,7 @@ from ..db.database import get_db
 from ..db.models import Vehicle, ParkingSession, VehicleType
 from .admin import get_current_role
 from ..services.fees import calculate_fee
+from ..services.plates import plate_key
 from datetime import datetime, timezone
 
 router = APIRouter()
@@ -13,7 +14,7 @@ async def exit_calculate_fee(payload: dict, role: str = Depends(get_current_role
     if role != 'Controller':
         raise HTTPException(status_code=403, detail='Controller only')
     plate = payload.get('plate')
-    vehicle = db.query(Vehicle).filter(Vehicle.plate_number == plate).first()
+    vehicle = db.query(Vehicle).filter(Vehicle.plate_key == plate_key(plate)).first()
     if not vehicle:
         raise HTTPException(status_code=404, detail='Vehicle not found')
     session = db.query(ParkingSession).filter(ParkingSession.vehicle_id == vehicle.id, ParkingSession.status == 'active').first()
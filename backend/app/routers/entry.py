@@ -4,6 +4,8 @@ from pydantic import BaseModel
 from typing import Dict, Any
 from ..db.database import get_db
 from ..db.models import Vehicle, VehicleType, ParkingSpot, ParkingSession, MobileBooking
+from ..services.plates import plate_key
+from ..services.spots import claim_spot
 from .admin import get_current_role
 from datetime import datetime, timezone
 import secrets
@@ -38,8 +40,9 @@ async def create_session(payload: CreateSessionRequest, role: str = Depends(get_
     spot = db.query(ParkingSpot).filter(ParkingSpot.label == spot_label, ParkingSpot.type_id == vtype.id).first()
     if not spot:
         raise HTTPException(status_code=404, detail='Spot not found for type')
-    # Use explicit comparison for SQLAlchemy Column
-    if spot.is_occupied is True:
+    # Atomic claim: a concurrent entry for the same spot gets the 409, not a double booking
+    if not claim_spot(db, spot):
+        db.rollback()  # release the row lock now rather than at teardown
         raise HTTPException(status_code=409, detail='Spot already occupied')
     
     # Check if this spot has a mobile booking
@@ -71,8 +74,8 @@ async def create_session(payload: CreateSessionRequest, role: str = Depends(get_
             
             if booking_vehicle:
                 # Normalize plate numbers for comparison
-                booking_plate = booking_vehicle.plate_number.upper().replace(' ', '').replace('-', '')
-                entry_plate = plate.upper().replace(' ', '').replace('-', '')
+                booking_plate = booking_vehicle.plate_key
+                entry_plate = plate_key(plate)
                 
                 print(f"\n🔍 Plate Comparison:")
                 print(f"   Booking Plate: {booking_vehicle.plate_number} (normalized: {booking_plate})")
@@ -83,7 +86,7 @@ async def create_session(payload: CreateSessionRequest, role: str = Depends(get_
                     # MATCH! This is the mobile booking customer
                     print(f"✓ MATCH! Auto-checking in mobile booking {mobile_booking.id}")
                     mobile_booking.is_checked_in = True
-                    mobile_booking.checked_in_at = datetime.now()
+                    mobile_booking.checked_in_at = datetime.now(timezone.utc)
                     
                     # Set booking to 0 (fulfilled) - use integer 0 for TINYINT column
                     spot.booking = 0
@@ -102,13 +105,11 @@ async def create_session(payload: CreateSessionRequest, role: str = Depends(get_
     else:
         print(f"   No mobile booking reservation on this spot")
     
-    vehicle = db.query(Vehicle).filter(Vehicle.plate_number == plate).first()
+    vehicle = db.query(Vehicle).filter(Vehicle.plate_key == plate_key(plate)).first()
     if not vehicle:
         vehicle = Vehicle(plate_number=plate, type_id=vtype.id)
         db.add(vehicle)
         db.flush()
-    # mark spot occupied
-    spot.is_occupied = 1
     qr_token = secrets.token_urlsafe(24)
     session = ParkingSession(
         vehicle_id=vehicle.id,
@@ -0,0 +1,53 @@
+"""
+Internal Router
+Endpoints API processes call on OCR workers and the gate controller
+
+Mounted under /internal by main.py on ocr-worker and gate-controller
+processes only (see services/run_mode.py). Every request must carry
+INTERNAL_RPC_TOKEN in the X-Internal-Token header; keep those processes off
+the public network as well.
+"""
+import hmac
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from pydantic import BaseModel
+
+from ..services.run_mode import INTERNAL_RPC_TOKEN, get_gates, get_ocr
+
+
+def require_internal_token(x_internal_token: str = Header("")):
+    if not INTERNAL_RPC_TOKEN or not hmac.compare_digest(x_internal_token.encode(), INTERNAL_RPC_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Internal token required")
+
+
+ocr_router = APIRouter(dependencies=[Depends(require_internal_token)])
+lanes_router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+
+class LaneCommand(BaseModel):
+    direction: str
+    action: str
+    lane_id: Optional[str] = None
+
+
+@ocr_router.post("/ocr")
+async def recognize(request: Request) -> Dict:
+    """Read the plate in the raw image body; same result as process_vehicle_image"""
+    image_data = await request.body()
+    if not image_data:
+        raise HTTPException(status_code=400, detail="Empty image data received")
+    return await get_ocr().recognize(image_data)
+
+
+@lanes_router.get("/lanes")
+async def lanes_status() -> List[Dict]:
+    return await get_gates().status()
+
+
+@lanes_router.post("/lanes/command")
+async def lane_command(body: LaneCommand) -> Dict:
+    try:
+        return await get_gates().command(body.direction, body.action, body.lane_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e).strip("'\""))
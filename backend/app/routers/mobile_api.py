@@ -1,25 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List
-import qrcode
-import io
-import base64
 from decimal import Decimal
+import base64
 
 from ..db.database import get_db
 from ..db.models import ParkingSpot, VehicleType, FeeSchedule, RFIDVehicle, User, MobileUser, MobileBooking, Vehicle
+from ..services.booking_cache import as_utc, booking_status, get_booking
+from ..services.booking_tokens import (
+    QR_FORMATS, BookingTokenError, is_booking_token, issue_booking_token, qr_cache, verify_booking_token
+)
+from ..services.plates import canonical_plate, plate_key
+from ..services.spots import claim_free_spot
+from ..services.passwords import login_limiter
+from .auth_deps import (
+    ALGORITHM, JWT_SECRET, MOBILE_ROLE, MobilePrincipal, StaffPrincipal, check_login_rate, get_mobile_user,
+    get_staff, hash_new_password, store_upgraded_hash, verify_login
+)
 from pydantic import BaseModel, EmailStr
-from passlib.context import CryptContext
 from jose import jwt
 import os
 
 router = APIRouter(prefix="/mobile", tags=["Mobile App"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-JWT_SECRET = os.getenv("JWT_SECRET", "change_me_secret")
-ALGORITHM = "HS256"
+MOBILE_TOKEN_DAYS = int(os.getenv("MOBILE_TOKEN_DAYS", "30"))
 
 # ============================================
 # MODELS
@@ -53,7 +59,8 @@ class BookingCreate(BaseModel):
 
 class BookingResponse(BaseModel):
     id: str
-    qr_code: str
+    qr_token: str  # What the QR code encodes; the gate can also take it typed in
+    qr_url: str  # SVG image of the QR code (qr.png for a bitmap)
     spot_label: str
     plate_number: str
     start_time: str
@@ -71,10 +78,21 @@ class QRValidateRequest(BaseModel):
 # AUTHENTICATION
 # ============================================
 
+def _mobile_token(username: str, user_id: int) -> str:
+    token_data = {
+        "sub": username,
+        "role": MOBILE_ROLE,
+        "user_id": user_id,
+        "exp": datetime.now(timezone.utc) + timedelta(days=MOBILE_TOKEN_DAYS)
+    }
+    return jwt.encode(token_data, JWT_SECRET, algorithm=ALGORITHM)
+
 @router.post("/register", response_model=TokenResponse)
-async def register(user: MobileUserRegister, db: Session = Depends(get_db)):
+async def register(user: MobileUserRegister, request: Request, db: Session = Depends(get_db)):
     """Register new mobile app user"""
     try:
+        check_login_rate(request, db)
+        
         # Check if username exists
         existing = db.query(MobileUser).filter(MobileUser.username == user.username).first()
         if existing:
@@ -86,7 +104,7 @@ async def register(user: MobileUserRegister, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Email already exists")
         
         # Create mobile user
-        hashed_password = pwd_context.hash(user.password)
+        hashed_password = await hash_new_password(user.password)
         new_user = MobileUser(
             username=user.username,
             email=user.email,
@@ -100,8 +118,7 @@ async def register(user: MobileUserRegister, db: Session = Depends(get_db)):
         db.refresh(new_user)
         
         # Generate token
-        token_data = {"sub": user.username, "role": "Mobile_User", "user_id": new_user.id}
-        token = jwt.encode(token_data, JWT_SECRET, algorithm=ALGORITHM)
+        token = _mobile_token(user.username, new_user.id)
         
         return TokenResponse(
             token=token,
@@ -115,18 +132,23 @@ async def register(user: MobileUserRegister, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/login", response_model=TokenResponse)
-async def login(credentials: MobileUserLogin, db: Session = Depends(get_db)):
+async def login(credentials: MobileUserLogin, request: Request, db: Session = Depends(get_db)):
     """Login mobile app user"""
     try:
+        account = f"mobile:{credentials.username}"
+        ip = check_login_rate(request, db, account)
         user = db.query(MobileUser).filter(MobileUser.username == credentials.username).first()
-        if not user or not pwd_context.verify(credentials.password, user.password_hash):
+        valid, new_hash = await verify_login(credentials.password, user.password_hash) if user else (False, None)
+        if not valid:
+            login_limiter.failed(db, account, ip)
             raise HTTPException(status_code=401, detail="Invalid credentials")
+        login_limiter.succeeded(db, account, ip)
         
         if not user.is_active:
             raise HTTPException(status_code=403, detail="Account is disabled")
         
-        token_data = {"sub": user.username, "role": "Mobile_User", "user_id": user.id}
-        token = jwt.encode(token_data, JWT_SECRET, algorithm=ALGORITHM)
+        store_upgraded_hash(db, user, new_hash)
+        token = _mobile_token(user.username, user.id)
         
         return TokenResponse(
             token=token,
@@ -188,25 +210,23 @@ async def get_availability(db: Session = Depends(get_db)):
 async def create_booking(
     booking: BookingCreate,
     background_tasks: BackgroundTasks,
-    user_id: int,
+    user: MobilePrincipal = Depends(get_mobile_user),
     db: Session = Depends(get_db)
 ):
     """Create new parking booking (valid for 15 minutes)"""
     try:
         print(f"\n=== BOOKING REQUEST ===")
-        print(f"User ID: {user_id}")
+        print(f"User ID: {user.user_id}")
         print(f"Plate: {booking.plate_number}")
         print(f"Vehicle Type ID: {booking.vehicle_type_id}")
         
-        # Find available spot (not occupied AND not already booked)
-        available_spot = db.query(ParkingSpot).filter(
-            ParkingSpot.type_id == booking.vehicle_type_id,
-            ParkingSpot.is_occupied == 0,
-            ParkingSpot.booking == 0
-        ).first()
+        # Reserve a spot (not occupied AND not already booked) atomically: booking=1, not occupied
+        # until the vehicle checks in
+        available_spot = claim_free_spot(db, booking.vehicle_type_id, reserve=True)
         print(f"Found spot: {available_spot.label if available_spot else 'NONE'}")
         
         if not available_spot:
+            db.rollback()  # release any row locks taken while claiming
             # Debug: count total spots for this type
             total_spots = db.query(ParkingSpot).filter(ParkingSpot.type_id == booking.vehicle_type_id).count()
             occupied_spots = db.query(ParkingSpot).filter(
@@ -218,23 +238,10 @@ async def create_booking(
                 detail=f"No available spots for vehicle type {booking.vehicle_type_id}. Total: {total_spots}, Occupied: {occupied_spots}"
             )
         
-        # Get or create vehicle (with normalized plate matching)
-        normalized_plate = booking.plate_number.upper().replace(' ', '').replace('-', '')
-        vehicle = None
-        
-        # Try exact match first
-        vehicle = db.query(Vehicle).filter(Vehicle.plate_number == booking.plate_number).first()
+        # Get or create vehicle (plates are stored canonical, matched on plate_key)
+        vehicle = db.query(Vehicle).filter(Vehicle.plate_key == plate_key(booking.plate_number)).first()
         
-        # If not found, try normalized matching
-        if not vehicle:
-            all_vehicles = db.query(Vehicle).all()
-            for v in all_vehicles:
-                if v.plate_number.upper().replace(' ', '').replace('-', '') == normalized_plate:
-                    vehicle = v
-                    print(f"✓ Found existing vehicle with plate {v.plate_number} (normalized match)")
-                    break
-        
-        # Create new vehicle if still not found
+        # Create new vehicle if not found
         if not vehicle:
             vehicle = Vehicle(
                 plate_number=booking.plate_number,
@@ -259,27 +266,18 @@ async def create_booking(
         # Generate booking ID (using timestamp)
         booking_id = f"BK{int(datetime.now(timezone.utc).timestamp() * 1000)}"
         
-        # Mark spot as RESERVED for booking (booking=1) but NOT occupied yet
-        # Spot becomes occupied only when vehicle actually arrives and checks in
-        available_spot.booking = 1  # Use integer 1 for TINYINT column
-        available_spot.is_occupied = 0  # Not occupied until check-in
         print(f"✓ Reserved spot {available_spot.label} for booking {booking_id} (booking=1, occupied=0)")
         
-        # Generate QR code
-        qr_data = f"BOOKING-{booking_id}-{booking.plate_number}-{available_spot.label}"
-        qr = qrcode.QRCode(version=1, box_size=10, border=4)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        qr_base64 = base64.b64encode(buffer.getvalue()).decode()
+        # Signed QR payload; the image is only rendered when the app asks for it
+        qr_data = issue_booking_token(
+            booking_id, vehicle.plate_key, available_spot.id, available_spot.label,
+            available_spot.vehicle_type.code, expires_at
+        )
         
         # Create booking record
         new_booking = MobileBooking(
             id=booking_id,
-            user_id=user_id,
+            user_id=user.user_id,
             vehicle_id=vehicle.id,
             spot_id=available_spot.id,
             start_time=start_time,
@@ -296,7 +294,8 @@ async def create_booking(
         
         return BookingResponse(
             id=booking_id,
-            qr_code=qr_base64,
+            qr_token=qr_data,
+            qr_url=f"/mobile/bookings/{booking_id}/qr.svg?token={qr_data}",
             spot_label=available_spot.label,
             plate_number=booking.plate_number,
             start_time=start_time.isoformat(),
@@ -346,7 +345,7 @@ async def auto_cancel_booking(booking_id: str, spot_id: int, expires_at: datetim
             
             # Customer HASN'T entered - auto-cancel and free the spot
             booking.is_cancelled = True
-            booking.cancelled_at = datetime.now()
+            booking.cancelled_at = datetime.now(timezone.utc)
             booking.cancellation_reason = "auto-cancelled"
             
             if spot:
@@ -360,18 +359,28 @@ async def auto_cancel_booking(booking_id: str, spot_id: int, expires_at: datetim
     except Exception as e:
         print(f"Error in auto-cancel: {e}")
 
+def _lock_booking(db: Session, booking_id: str, user: MobilePrincipal) -> MobileBooking:
+    """
+    The user's booking row, read afresh and locked until commit so that state changes are decided on it
+
+    Another request, on any worker, may change the booking after it was
+    read, so check-in and cancel decide on the locked row.
+    """
+    booking = db.query(MobileBooking).filter(MobileBooking.id == booking_id).with_for_update().populate_existing().first()
+    if booking is None or booking.user_id != user.user_id:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return booking
+
 @router.post("/bookings/{booking_id}/checkin")
 async def checkin_booking(
     booking_id: str,
     checkin_data: CheckinRequest,
+    user: MobilePrincipal = Depends(get_mobile_user),
     db: Session = Depends(get_db)
 ):
     """Check in to parking spot with booking"""
     try:
-        # Find booking
-        booking = db.query(MobileBooking).filter(MobileBooking.id == booking_id).first()
-        if not booking:
-            raise HTTPException(status_code=404, detail="Booking not found")
+        booking = _lock_booking(db, booking_id, user)
         
         if booking.is_cancelled:
             raise HTTPException(status_code=400, detail="Booking was cancelled")
@@ -384,33 +393,29 @@ async def checkin_booking(
         expires_at = booking.expires_at if booking.expires_at.tzinfo else booking.expires_at.replace(tzinfo=timezone.utc)
         if now > expires_at:
             booking.is_cancelled = True
-            booking.cancelled_at = datetime.now()
+            booking.cancelled_at = datetime.now(timezone.utc)
             booking.cancellation_reason = "expired"
             db.commit()
             raise HTTPException(status_code=400, detail="Booking has expired")
         
-        # Verify plate number matches booking
-        booking_vehicle = db.query(Vehicle).filter(Vehicle.id == booking.vehicle_id).first()
-        if not booking_vehicle:
-            raise HTTPException(status_code=400, detail="Booking vehicle not found")
-        
-        # Normalize plate numbers for comparison (remove spaces, hyphens, uppercase)
-        booking_plate = booking_vehicle.plate_number.upper().replace(' ', '').replace('-', '')
-        entry_plate = checkin_data.plate_number.upper().replace(' ', '').replace('-', '')
+        # Verify plate number matches booking (normalized: no spaces or hyphens, uppercase)
+        record = get_booking(db, booking_id)
+        booking_plate = plate_key(record.plate_number)
+        entry_plate = plate_key(checkin_data.plate_number)
         
         print(f"\n🔍 Manual Check-in Plate Verification:")
-        print(f"   Booking Plate: {booking_vehicle.plate_number} (normalized: {booking_plate})")
+        print(f"   Booking Plate: {record.plate_number} (normalized: {booking_plate})")
         print(f"   Entry Plate: {checkin_data.plate_number} (normalized: {entry_plate})")
         print(f"   Match: {booking_plate == entry_plate}")
         
         if booking_plate != entry_plate:
             raise HTTPException(
                 status_code=400, 
-                detail=f"Plate number mismatch. Booking is for {booking_vehicle.plate_number}, you entered {checkin_data.plate_number}"
+                detail=f"Plate number mismatch. Booking is for {record.plate_number}, you entered {checkin_data.plate_number}"
             )
         
         # Get the parking spot first to check if customer has actually entered
-        spot = db.query(ParkingSpot).filter(ParkingSpot.id == booking.spot_id).first()
+        spot = db.query(ParkingSpot).filter(ParkingSpot.id == booking.spot_id).with_for_update().populate_existing().first()
         if not spot:
             raise HTTPException(status_code=400, detail="Parking spot not found")
         
@@ -426,12 +431,12 @@ async def checkin_booking(
         
         # Customer has entered - now confirm the check-in
         booking.is_checked_in = True
-        booking.checked_in_at = datetime.now()
+        booking.checked_in_at = datetime.now(timezone.utc)
         
         # Clear the booking flag (reservation fulfilled)
         spot.booking = 0
         print(f"✓ Manual check-in confirmed: Spot {spot.label} - is_occupied=1, booking=0")
-        print(f"✓ Plate verified: {booking_vehicle.plate_number}")
+        print(f"✓ Plate verified: {record.plate_number}")
         
         db.commit()
         
@@ -440,7 +445,7 @@ async def checkin_booking(
             "message": "Checked in successfully",
             "booking_id": booking_id,
             "spot_label": spot.label if spot else None,
-            "plate_number": booking_vehicle.plate_number
+            "plate_number": record.plate_number
         }
     except HTTPException:
         raise
@@ -450,13 +455,14 @@ async def checkin_booking(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/bookings/{booking_id}/cancel")
-async def cancel_booking(booking_id: str, db: Session = Depends(get_db)):
+async def cancel_booking(
+    booking_id: str,
+    user: MobilePrincipal = Depends(get_mobile_user),
+    db: Session = Depends(get_db)
+):
     """Manually cancel booking"""
     try:
-        # Find booking
-        booking = db.query(MobileBooking).filter(MobileBooking.id == booking_id).first()
-        if not booking:
-            raise HTTPException(status_code=404, detail="Booking not found")
+        booking = _lock_booking(db, booking_id, user)
         
         if booking.is_cancelled:
             raise HTTPException(status_code=400, detail="Booking already cancelled")
@@ -465,13 +471,13 @@ async def cancel_booking(booking_id: str, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Cannot cancel checked-in booking")
         
         # Check if spot is occupied - if so, customer has already entered
-        spot = db.query(ParkingSpot).filter(ParkingSpot.id == booking.spot_id).first()
+        spot = db.query(ParkingSpot).filter(ParkingSpot.id == booking.spot_id).with_for_update().populate_existing().first()
         if spot and spot.is_occupied == 1:
             raise HTTPException(status_code=400, detail="Cannot cancel - customer has already entered parking")
         
         # Cancel booking
         booking.is_cancelled = True
-        booking.cancelled_at = datetime.now()
+        booking.cancelled_at = datetime.now(timezone.utc)
         booking.cancellation_reason = "manual"
         
         # Free up the spot and clear booking reservation
@@ -492,36 +498,132 @@ async def cancel_booking(booking_id: str, db: Session = Depends(get_db)):
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/bookings/{booking_id}/qr.{fmt}")
+async def get_booking_qr(booking_id: str, fmt: str, token: str):
+    """QR code image (svg or png) of a booking's token, rendered on first request"""
+    if fmt not in QR_FORMATS:
+        raise HTTPException(status_code=404, detail="Unknown QR image format")
+    try:
+        claims = verify_booking_token(token)
+    except BookingTokenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if claims.booking_id != booking_id:
+        raise HTTPException(status_code=400, detail="Token is for another booking")
+
+    max_age = max(int((claims.expires_at - datetime.now(timezone.utc)).total_seconds()), 0)
+    return Response(
+        content=qr_cache.get_image(booking_id, token, fmt),
+        media_type=QR_FORMATS[fmt],
+        headers={"Cache-Control": f"private, max-age={max_age}"}
+    )
+
+def _user_bookings(db: Session, user_id: int):
+    """A user's bookings as compact rows (plate and spot joined in)"""
+    return db.query(
+        MobileBooking.id, Vehicle.plate_number, ParkingSpot.label,
+        MobileBooking.start_time, MobileBooking.expires_at, MobileBooking.checked_in_at,
+        MobileBooking.is_checked_in, MobileBooking.is_cancelled
+    ).join(
+        Vehicle, MobileBooking.vehicle_id == Vehicle.id
+    ).join(
+        ParkingSpot, MobileBooking.spot_id == ParkingSpot.id
+    ).filter(MobileBooking.user_id == user_id)
+
+def _booking_summary(row, now: datetime) -> dict:
+    return {
+        "id": row.id,
+        "plate": row.plate_number,
+        "spot": row.label,
+        "status": booking_status(row.is_cancelled, row.is_checked_in, row.expires_at, now),
+        "start_time": as_utc(row.start_time).isoformat(),
+        "expires_at": as_utc(row.expires_at).isoformat(),
+        "checked_in_at": as_utc(row.checked_in_at).isoformat() if row.checked_in_at else None
+    }
+
+def _history_cursor(row) -> str:
+    """Opaque keyset cursor: the (expires_at, id) of the last booking on the page"""
+    return base64.urlsafe_b64encode(f"{row.expires_at.isoformat()}|{row.id}".encode()).decode()
+
+def _parse_history_cursor(cursor: str):
+    try:
+        expires_at, booking_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(expires_at), booking_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/bookings/active")
-async def get_active_bookings(user_id: int, db: Session = Depends(get_db)):
-    """Get user's active bookings"""
+async def get_active_bookings(user: MobilePrincipal = Depends(get_mobile_user), db: Session = Depends(get_db)):
+    """Get user's active bookings (not cancelled, not checked in, not expired)"""
     try:
-        # In production, fetch from bookings table
+        now = datetime.now(timezone.utc)
+        rows = _user_bookings(db, user.user_id).filter(
+            MobileBooking.is_cancelled == False,
+            MobileBooking.is_checked_in == False,
+            MobileBooking.expires_at > now
+        ).order_by(MobileBooking.expires_at).all()
         return {
-            "active_bookings": []
+            "active_bookings": [_booking_summary(row, now) for row in rows]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/bookings/history")
+async def get_booking_history(
+    user: MobilePrincipal = Depends(get_mobile_user),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get user's bookings, newest first, a page at a time
+
+    Pass the returned next_cursor to get the following page; it is null on
+    the last page.
+    """
+    try:
+        query = _user_bookings(db, user.user_id)
+        if cursor:
+            expires_at, booking_id = _parse_history_cursor(cursor)
+            query = query.filter(
+                (MobileBooking.expires_at < expires_at) |
+                ((MobileBooking.expires_at == expires_at) & (MobileBooking.id < booking_id))
+            )
+        rows = query.order_by(MobileBooking.expires_at.desc(), MobileBooking.id.desc()).limit(limit + 1).all()
+        
+        now = datetime.now(timezone.utc)
+        page = rows[:limit]
+        return {
+            "bookings": [_booking_summary(row, now) for row in page],
+            "next_cursor": _history_cursor(page[-1]) if len(rows) > limit else None
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/bookings/search-by-plate")
-async def search_booking_by_plate(plate_number: str, db: Session = Depends(get_db)):
-    """Search for active booking by plate number (for gate scanner)"""
+async def search_booking_by_plate(
+    plate_number: str,
+    staff: StaffPrincipal = Depends(get_staff),
+    db: Session = Depends(get_db)
+):
+    """
+    Search for active booking by plate number (for gate scanner, staff only)
+
+    Answers like validate-qr for the booking found. The booking's QR token
+    is not returned: it is the customer's credential.
+    """
     try:
         # Normalize plate number (remove spaces, dashes, convert to uppercase)
-        normalized_search = plate_number.upper().replace(' ', '').replace('-', '')
+        normalized_search = plate_key(plate_number)
         print(f"\n=== SEARCHING FOR BOOKING ===")
         print(f"Original plate: {plate_number}")
         print(f"Normalized: {normalized_search}")
         
-        # Find ALL vehicles with matching normalized plates
-        matching_vehicles = []
-        all_vehicles = db.query(Vehicle).all()
-        
-        for v in all_vehicles:
-            normalized_db = v.plate_number.upper().replace(' ', '').replace('-', '')
-            if normalized_db == normalized_search:
-                matching_vehicles.append(v)
-                print(f"✓ Found matching vehicle: ID={v.id}, Plate=[{v.plate_number}]")
+        # plate_key is unique, so this is at most one vehicle
+        matching_vehicles = db.query(Vehicle).filter(Vehicle.plate_key == normalized_search).all()
+        for v in matching_vehicles:
+            print(f"✓ Found matching vehicle: ID={v.id}, Plate=[{v.plate_number}]")
         
         if not matching_vehicles:
             print(f"❌ No vehicles found with plate matching {plate_number}")
@@ -530,7 +632,7 @@ async def search_booking_by_plate(plate_number: str, db: Session = Depends(get_d
         print(f"✓ Found {len(matching_vehicles)} vehicle(s) with matching plates")
         
         # Find active booking among matching vehicles
-        now = datetime.now()
+        now = datetime.now(timezone.utc)
         booking = None
         vehicle = None
         
@@ -563,15 +665,21 @@ async def search_booking_by_plate(plate_number: str, db: Session = Depends(get_d
         
         print(f"✓ Active booking found: {booking.id}")
         
-        # Get spot info
-        spot = db.query(ParkingSpot).filter(ParkingSpot.id == booking.spot_id).first()
-        
+        record = get_booking(db, booking.id)
         return {
+            "valid": True,
+            "message": "Booking found - Please complete entry form",
             "booking_id": booking.id,
-            "qr_code_data": booking.qr_code_data,
             "plate_number": vehicle.plate_number,
-            "spot_label": spot.label if spot else "Unknown",
-            "expires_at": booking.expires_at.isoformat()
+            "spot_label": record.spot_label,
+            "vehicle_type": {
+                "name": record.type_name,
+                "code": record.type_code
+            },
+            "vehicle_id": vehicle.id,
+            "spot_id": record.spot_id,
+            "expires_at": as_utc(booking.expires_at).isoformat(),
+            "is_mobile_booking": True
         }
     except HTTPException:
         raise
@@ -581,15 +689,58 @@ async def search_booking_by_plate(plate_number: str, db: Session = Depends(get_d
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+def _refusal(db: Session, booking_id: str) -> Optional[str]:
+    """Why a booking's QR can no longer be used, from its row (not the cache); None if it can"""
+    row = db.query(
+        MobileBooking.is_cancelled, MobileBooking.is_checked_in, MobileBooking.expires_at
+    ).filter(MobileBooking.id == booking_id).first()
+    if row is None:
+        return "Booking not found"
+    status = booking_status(row.is_cancelled, row.is_checked_in, row.expires_at)
+    return {
+        "cancelled": "Booking was cancelled",
+        "checked_in": "Booking was already used to enter",
+        "expired": "Booking has expired",
+    }.get(status)
+
 @router.post("/validate-qr")
-async def validate_qr(request: QRValidateRequest, db: Session = Depends(get_db)):
-    """Validate booking QR code at entry gate and auto-check-in"""
+async def validate_qr(
+    request: QRValidateRequest,
+    staff: StaffPrincipal = Depends(get_staff),
+    db: Session = Depends(get_db)
+):
+    """Validate booking QR code at entry gate (staff only); returns the booking for the entry form"""
     try:
         from ..db.models import ParkingSession
         
-        qr_data = request.qr_data
-        
-        # Parse QR: "BOOKING-{id}-{plate}-{spot}"
+        qr_data = request.qr_data.strip()
+
+        # Signed booking token: the QR itself carries what the entry form
+        # needs; only the booking's state flags are read
+        if is_booking_token(qr_data):
+            try:
+                claims = verify_booking_token(qr_data)
+            except BookingTokenError as e:
+                print(f"❌ Booking QR rejected: {e}")
+                return {"valid": False, "message": str(e)}
+            refusal = _refusal(db, claims.booking_id)
+            if refusal:
+                print(f"❌ Booking QR rejected: {claims.booking_id}: {refusal}")
+                return {"valid": False, "message": refusal}
+            print(f"✓ Booking QR verified: {claims.booking_id} → {claims.spot_label}")
+            return {
+                "valid": True,
+                "message": "Booking validated - Please complete entry form",
+                "booking_id": claims.booking_id,
+                "plate_number": canonical_plate(claims.plate_key),
+                "spot_label": claims.spot_label,
+                "vehicle_type": {"code": claims.type_code},
+                "spot_id": claims.spot_id,
+                "expires_at": claims.expires_at.isoformat(),
+                "is_mobile_booking": True
+            }
+
+        # QR codes issued before signed tokens: "BOOKING-{id}-{plate}-{spot}"
         parts = qr_data.split('-')
         
         # Handle plates with hyphens (e.g., ABC-1234)
@@ -605,40 +756,32 @@ async def validate_qr(request: QRValidateRequest, db: Session = Depends(get_db))
         print(f"Plate: {plate_number}")
         print(f"Spot: {spot_label}")
         
-        # Find booking
-        booking = db.query(MobileBooking).filter(MobileBooking.id == booking_id).first()
-        if not booking:
-            return {"valid": False, "message": "Booking not found"}
+        refusal = _refusal(db, booking_id)
+        if refusal:
+            return {"valid": False, "message": refusal}
         
-        if booking.is_cancelled:
-            return {"valid": False, "message": "Booking was cancelled"}
+        # Find booking (with its vehicle and spot)
+        booking = get_booking(db, booking_id)
         
         print(f"✓ QR Code validated - Booking found: {booking_id}")
         print(f"   Expires at: {booking.expires_at}")
         print(f"   Is checked in: {booking.is_checked_in}")
         
-        # Get vehicle and spot data to return for form auto-fill
-        vehicle = db.query(Vehicle).filter(Vehicle.id == booking.vehicle_id).first()
-        spot = db.query(ParkingSpot).filter(ParkingSpot.id == booking.spot_id).first()
-        
-        if not vehicle or not spot:
-            return {"valid": False, "message": "Booking data incomplete"}
-        
         # Return booking data for form auto-fill (NO auto check-in)
-        print(f"✓ Returning booking data for form auto-fill: {plate_number} → {spot.label}")
+        print(f"✓ Returning booking data for form auto-fill: {plate_number} → {booking.spot_label}")
         
         return {
             "valid": True,
             "message": "Booking validated - Please complete entry form",
             "booking_id": booking_id,
             "plate_number": plate_number,
-            "spot_label": spot.label,
+            "spot_label": booking.spot_label,
             "vehicle_type": {
-                "name": vehicle.vehicle_type.name,
-                "code": vehicle.vehicle_type.code
+                "name": booking.type_name,
+                "code": booking.type_code
             },
-            "vehicle_id": vehicle.id,
-            "spot_id": spot.id,
+            "vehicle_id": booking.vehicle_id,
+            "spot_id": booking.spot_id,
             "is_mobile_booking": True
         }
     except HTTPException:
@@ -651,21 +794,25 @@ async def validate_qr(request: QRValidateRequest, db: Session = Depends(get_db))
 
 
 @router.get("/check-entry/{booking_id}")
-async def check_entry_status(booking_id: str, db: Session = Depends(get_db)):
+async def check_entry_status(
+    booking_id: str,
+    user: MobilePrincipal = Depends(get_mobile_user),
+    db: Session = Depends(get_db)
+):
     """Check if customer has entered the parking (for mobile app polling)"""
     try:
-        booking = db.query(MobileBooking).filter(MobileBooking.id == booking_id).first()
-        if not booking:
+        # Read fresh on every poll, so a check-in through any worker shows up at once
+        booking = get_booking(db, booking_id)
+        if not booking or booking.user_id != user.user_id:
             raise HTTPException(status_code=404, detail="Booking not found")
         
         # Check if they've checked in
         if booking.is_checked_in:
-            spot = db.query(ParkingSpot).filter(ParkingSpot.id == booking.spot_id).first()
             return {
                 "has_entered": True,
                 "message": "✓ You have entered the parking! Welcome.",
                 "checked_in_at": booking.checked_in_at.isoformat() if booking.checked_in_at else None,
-                "spot_label": spot.label if spot else "Unknown"
+                "spot_label": booking.spot_label
             }
         
         # Still waiting
@@ -1,11 +1,47 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
 from sqlalchemy.orm import Session
 from ..db.database import get_db
 from ..db.models import ParkingSession, Vehicle, VehicleType, ParkingSpot
+from ..services import receipt_printer
 from jinja2 import Template
+from collections import OrderedDict
+from typing import Optional, Tuple
+import hashlib
+import os
+import threading
 
 router = APIRouter()
 
+# Rendered receipts for closed sessions never change, so they are kept in a
+# bounded in-process LRU and served with a strong ETag.
+RECEIPT_CACHE_SIZE = int(os.getenv("RECEIPT_CACHE_SIZE", "2048"))
+CLOSED_CACHE_CONTROL = "public, max-age=86400, immutable"
+ACTIVE_CACHE_CONTROL = "no-cache"
+
+class ReceiptCache:
+    """Thread-safe LRU of rendered receipts: {qr_token: (html, etag)}"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: str, value: Tuple[str, str]):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+receipt_cache = ReceiptCache(RECEIPT_CACHE_SIZE)
+
 TEMPLATE = Template(
     """
     <!doctype html>
@@ -40,26 +76,88 @@ TEMPLATE = Template(
 
 from fastapi.responses import HTMLResponse
 
-@router.get('/receipts/{qr_token}', response_class=HTMLResponse)
-async def get_receipt(qr_token: str, db: Session = Depends(get_db)):
-    session = db.query(ParkingSession).filter(ParkingSession.qr_token == qr_token).first()
-    if not session:
+def _etag_for(html: str) -> str:
+    return '"' + hashlib.sha256(html.encode('utf-8')).hexdigest()[:32] + '"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return any(tag.strip() in (etag, '*') for tag in if_none_match.split(','))
+
+def _receipt_response(html: str, etag: str, cache_control: str, if_none_match: Optional[str]) -> Response:
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=html, headers=headers)
+
+def _load_receipt(db: Session, qr_token: str) -> dict:
+    """Load session with vehicle, type and spot in one round-trip"""
+    row = db.query(
+        ParkingSession,
+        Vehicle.plate_number,
+        VehicleType.name,
+        ParkingSpot.label
+    ).outerjoin(
+        Vehicle, ParkingSession.vehicle_id == Vehicle.id
+    ).outerjoin(
+        VehicleType, Vehicle.type_id == VehicleType.id
+    ).outerjoin(
+        ParkingSpot, ParkingSession.spot_id == ParkingSpot.id
+    ).filter(ParkingSession.qr_token == qr_token).first()
+    if not row:
         raise HTTPException(status_code=404, detail='Receipt not found')
-    vehicle_id = session.vehicle_id
-    vehicle = db.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
-    vtype = db.query(VehicleType).filter(VehicleType.id == vehicle.type_id).first() if vehicle else None
-    spot_id = session.spot_id
-    spot = db.query(ParkingSpot).filter(ParkingSpot.id == spot_id).first()
-    html = TEMPLATE.render(
-        plate=vehicle.plate_number if vehicle else 'Unknown',
-        type_name=vtype.name if vtype else 'Unknown',
-        spot_label=spot.label if spot else 'Unknown',
-        entry_time=session.entry_time,
-        exit_time=session.exit_time,
-        fee_lkr=session.calculated_fee_lkr,
-        qr_token=session.qr_token,
-    )
-    return HTMLResponse(content=html)
+    session, plate, type_name, spot_label = row
+    return {
+        'plate': plate or 'Unknown',
+        'type_name': type_name or 'Unknown',
+        'spot_label': spot_label or 'Unknown',
+        'entry_time': session.entry_time,
+        'exit_time': session.exit_time,
+        'fee_lkr': session.calculated_fee_lkr,
+        'qr_token': session.qr_token,
+        'status': session.status,
+    }
+
+@router.get('/receipts/{qr_token}', response_class=HTMLResponse)
+async def get_receipt(qr_token: str, if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    cached = receipt_cache.get(qr_token)
+    if cached is not None:
+        html, etag = cached
+        return _receipt_response(html, etag, CLOSED_CACHE_CONTROL, if_none_match)
+
+    receipt = _load_receipt(db, qr_token)
+    html = TEMPLATE.render(**{k: v for k, v in receipt.items() if k != 'status'})
+    etag = _etag_for(html)
+
+    # Active sessions still change (exit time, fee), so they render live
+    if receipt['status'] == 'closed':
+        receipt_cache.put(qr_token, (html, etag))
+        return _receipt_response(html, etag, CLOSED_CACHE_CONTROL, if_none_match)
+    return _receipt_response(html, etag, ACTIVE_CACHE_CONTROL, if_none_match)
+
+PRINT_MEDIA_TYPES = {
+    'escpos': 'application/octet-stream',
+    'png': 'image/png',
+}
+
+# The print routes are plain functions: PNG rendering and the disk cache are
+# blocking work, so FastAPI runs them on its threadpool, off the event loop
+def _print_response(qr_token: str, fmt: str, db: Session) -> Response:
+    # Closed tickets are final, so serve them from disk without touching the DB
+    data = receipt_printer.read_cached(qr_token, 'closed', fmt)
+    if data is None:
+        data = receipt_printer.get_ticket(_load_receipt(db, qr_token), fmt)
+    return Response(content=data, media_type=PRINT_MEDIA_TYPES[fmt])
+
+@router.get('/receipts/{qr_token}/escpos')
+def get_receipt_escpos(qr_token: str, db: Session = Depends(get_db)):
+    """Ticket as a raw ESC/POS stream for booth thermal printers"""
+    return _print_response(qr_token, 'escpos', db)
+
+@router.get('/receipts/{qr_token}/ticket.png')
+def get_receipt_png(qr_token: str, db: Session = Depends(get_db)):
+    """Ticket as a 1-bit PNG with the QR token"""
+    return _print_response(qr_token, 'png', db)
 
 from pydantic import BaseModel
 from typing import Dict, Any
@@ -1,34 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, timezone, timedelta
 from pydantic import BaseModel, EmailStr
-import os
 from ..db.database import get_db
 from ..db.models import RFIDAccount, RFIDVehicle, Vehicle, VehicleType
+from ..services.plates import plate_key
+from .auth_deps import get_current_role
 
 router = APIRouter(prefix='/admin/rfid', tags=['RFID Accounts'])
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-JWT_SECRET = os.getenv("JWT_SECRET", "change_me_secret")
-ALGORITHM = "HS256"
-
-async def get_current_role(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
-        role = payload.get("role")
-        if not role:
-            raise HTTPException(status_code=401, detail="Role not found in token")
-        # Check token expiry
-        exp = payload.get("exp")
-        if exp and datetime.now(timezone.utc).timestamp() > exp:
-            raise HTTPException(status_code=401, detail="Token expired")
-        return role
-    except JWTError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
-
 # Pydantic models
 class VehicleRegistration(BaseModel):
     plate_number: str
@@ -120,13 +101,13 @@ async def create_rfid_account(
     for veh_data in account_data.vehicles:
         # Check if vehicle already exists
         vehicle = db.query(Vehicle).filter(
-            Vehicle.plate_number == veh_data.plate_number.upper()
+            Vehicle.plate_key == plate_key(veh_data.plate_number)
         ).first()
         
         if not vehicle:
-            # Create new vehicle
+            # Create new vehicle (stored in canonical form, see models._set_plate_key)
             vehicle = Vehicle(
-                plate_number=veh_data.plate_number.upper(),
+                plate_number=veh_data.plate_number,
                 type_id=veh_data.type_id
             )
             db.add(vehicle)
@@ -363,7 +344,7 @@ async def add_vehicle_to_account(
     
     # Check if vehicle already exists
     vehicle = db.query(Vehicle).filter(
-        Vehicle.plate_number == vehicle_data.plate_number.upper()
+        Vehicle.plate_key == plate_key(vehicle_data.plate_number)
     ).first()
     
     if vehicle:
@@ -377,7 +358,7 @@ async def add_vehicle_to_account(
     else:
         # Create new vehicle
         vehicle = Vehicle(
-            plate_number=vehicle_data.plate_number.upper(),
+            plate_number=vehicle_data.plate_number,
             type_id=vehicle_data.type_id
         )
         db.add(vehicle)
@@ -487,8 +468,8 @@ async def validate_rfid_for_payment(
     } for rv, veh in vehicles]
     
     # Check if the plate number is registered under this RFID account
-    registered_plates = [v['plate_number'].upper() for v in vehicle_list]
-    if plate_number.upper() not in registered_plates:
+    registered_plates = {plate_key(v['plate_number']) for v in vehicle_list}
+    if plate_key(plate_number) not in registered_plates:
         raise HTTPException(
             status_code=400, 
             detail=f'Vehicle {plate_number} is not registered under this RFID account'
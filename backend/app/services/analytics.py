@@ -0,0 +1,206 @@
+"""
+Parking Analytics Service
+Occupancy curves, dwell-time histograms and spot turnover per business day
+
+Each metric is computed in one streaming pass over parking_sessions:
+- Occupancy: sweep-line over entry/exit events. Sessions are streamed in
+  entry order and pending exits are kept in a min-heap, so events are
+  processed in time order without materializing the whole day.
+- Dwell time: running histogram per vehicle type using the fee bands.
+- Turnover: running count of sessions per spot.
+
+Results for closed business days are cached since they can no longer change.
+"""
+import heapq
+from functools import wraps
+from datetime import datetime, date, timedelta, timezone
+from typing import Dict, Tuple, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from ..db.models import ParkingSession, ParkingSpot, Vehicle, VehicleType
+from .business_day import BUSINESS_TZ, business_day_bounds, is_closed_day
+from .fees import BANDS_ORDER
+
+# Rows fetched per round-trip while streaming sessions
+STREAM_BATCH_SIZE = 1000
+
+# Format: {(metric_name, day): result_dict}
+_closed_day_cache: Dict[Tuple[str, date], dict] = {}
+
+
+def _cached_per_day(metric: str):
+    """Cache a per-day metric once its business day has closed"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(db: Session, d: date) -> dict:
+            key = (metric, d)
+            cached = _closed_day_cache.get(key)
+            if cached is not None:
+                return cached
+            result = func(db, d)
+            if is_closed_day(d):
+                _closed_day_cache[key] = result
+            return result
+        return wrapper
+    return decorator
+
+
+def _utc(ts: Optional[datetime]) -> Optional[datetime]:
+    if ts is None:
+        return None
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+class _OccupancySweep:
+    """Accumulates a time-weighted occupancy curve in hourly buckets"""
+
+    def __init__(self, day_start: datetime, day_end: datetime):
+        self.day_start = day_start
+        self.day_end = day_end
+        self.hours = int((day_end - day_start).total_seconds() // 3600)
+        self.occupied_seconds = [0.0] * self.hours
+        self.peak = [0] * self.hours
+        self.arrivals = [0] * self.hours
+        self.departures = [0] * self.hours
+        self.occupancy = 0
+        self.cursor = day_start
+
+    def _hour(self, ts: datetime) -> int:
+        return min(int((ts - self.day_start).total_seconds() // 3600), self.hours - 1)
+
+    def advance(self, ts: datetime):
+        """Move the sweep line to ts, crediting the current occupancy to each hour crossed"""
+        ts = min(max(ts, self.day_start), self.day_end)
+        while self.cursor < ts:
+            hour = self._hour(self.cursor)
+            hour_end = self.day_start + timedelta(hours=hour + 1)
+            step_end = min(ts, hour_end)
+            self.occupied_seconds[hour] += self.occupancy * (step_end - self.cursor).total_seconds()
+            self.peak[hour] = max(self.peak[hour], self.occupancy)
+            self.cursor = step_end
+
+    def enter(self, ts: datetime):
+        self.advance(ts)
+        self.occupancy += 1
+        if ts >= self.day_start:
+            hour = self._hour(ts)
+            self.arrivals[hour] += 1
+            self.peak[hour] = max(self.peak[hour], self.occupancy)
+
+    def leave(self, ts: datetime):
+        self.advance(ts)
+        self.occupancy -= 1
+        if ts < self.day_end:
+            self.departures[self._hour(ts)] += 1
+
+    def result(self) -> list:
+        local_start = self.day_start.astimezone(BUSINESS_TZ)
+        return [{
+            'hour': (local_start + timedelta(hours=h)).hour,
+            'average_occupancy': round(self.occupied_seconds[h] / 3600, 2),
+            'peak_occupancy': self.peak[h],
+            'arrivals': self.arrivals[h],
+            'departures': self.departures[h],
+        } for h in range(self.hours)]
+
+
+@_cached_per_day('occupancy')
+def hourly_occupancy(db: Session, d: date) -> dict:
+    """Hourly occupancy curve for one business day, with the peak hour"""
+    day_start, day_end = business_day_bounds(d)
+    sweep = _OccupancySweep(day_start, day_end)
+
+    rows = db.query(ParkingSession.entry_time, ParkingSession.exit_time).filter(
+        ParkingSession.entry_time < day_end,
+        or_(ParkingSession.exit_time.is_(None), ParkingSession.exit_time >= day_start)
+    ).order_by(ParkingSession.entry_time).yield_per(STREAM_BATCH_SIZE)
+
+    pending_exits = []  # min-heap of exit times for vehicles currently inside
+    for entry_time, exit_time in rows:
+        entry_time = _utc(entry_time)
+        while pending_exits and pending_exits[0] <= entry_time:
+            sweep.leave(heapq.heappop(pending_exits))
+        sweep.enter(entry_time)
+        heapq.heappush(pending_exits, _utc(exit_time) or day_end)
+    while pending_exits:
+        sweep.leave(heapq.heappop(pending_exits))
+    sweep.advance(day_end)
+
+    hourly = sweep.result()
+    peak = max(hourly, key=lambda h: h['peak_occupancy']) if hourly else None
+    return {
+        'date': d.isoformat(),
+        'hourly': hourly,
+        'peak_hour': peak['hour'] if peak and peak['peak_occupancy'] else None,
+        'peak_occupancy': peak['peak_occupancy'] if peak else 0,
+    }
+
+
+@_cached_per_day('dwell')
+def dwell_time_by_type(db: Session, d: date) -> dict:
+    """Dwell-time histogram and averages per vehicle type for sessions closed on a business day"""
+    rows = db.query(
+        VehicleType.code, ParkingSession.entry_time, ParkingSession.exit_time
+    ).join(Vehicle, ParkingSession.vehicle_id == Vehicle.id).join(
+        VehicleType, Vehicle.type_id == VehicleType.id
+    ).filter(
+        ParkingSession.exit_day == d
+    ).yield_per(STREAM_BATCH_SIZE)
+
+    stats: Dict[str, dict] = {}
+    for type_code, entry_time, exit_time in rows:
+        minutes = max((_utc(exit_time) - _utc(entry_time)).total_seconds(), 0) / 60
+        s = stats.get(type_code)
+        if s is None:
+            s = stats[type_code] = {
+                'sessions': 0,
+                'total_minutes': 0.0,
+                'max_minutes': 0.0,
+                'histogram': {name: 0 for name, _, _ in BANDS_ORDER},
+            }
+        s['sessions'] += 1
+        s['total_minutes'] += minutes
+        s['max_minutes'] = max(s['max_minutes'], minutes)
+        seconds = minutes * 60
+        for name, start_s, end_s in BANDS_ORDER:
+            if seconds >= start_s and (end_s is None or seconds < end_s):
+                s['histogram'][name] += 1
+                break
+
+    return {
+        'date': d.isoformat(),
+        'vehicle_types': [{
+            'type_code': code,
+            'sessions': s['sessions'],
+            'average_minutes': round(s['total_minutes'] / s['sessions'], 1),
+            'max_minutes': round(s['max_minutes'], 1),
+            'histogram': s['histogram'],
+        } for code, s in sorted(stats.items())]
+    }
+
+
+@_cached_per_day('turnover')
+def spot_turnover(db: Session, d: date) -> dict:
+    """Number of sessions started per spot on a business day"""
+    spots = {spot_id: label for spot_id, label in db.query(ParkingSpot.id, ParkingSpot.label).all()}
+
+    counts: Dict[int, int] = {}
+    rows = db.query(ParkingSession.spot_id).filter(
+        ParkingSession.entry_day == d
+    ).yield_per(STREAM_BATCH_SIZE)
+    for (spot_id,) in rows:
+        counts[spot_id] = counts.get(spot_id, 0) + 1
+
+    total_sessions = sum(counts.values())
+    return {
+        'date': d.isoformat(),
+        'total_sessions': total_sessions,
+        'average_turnover': round(total_sessions / len(spots), 2) if spots else 0,
+        'spots': [{
+            'spot_id': spot_id,
+            'spot_label': label,
+            'sessions': counts.get(spot_id, 0),
+        } for spot_id, label in sorted(spots.items(), key=lambda item: item[1])]
+    }
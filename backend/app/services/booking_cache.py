@@ -0,0 +1,128 @@
+"""
+Booking Cache Service
+Per-session cache of mobile booking state, keyed by booking id
+
+The app polls /mobile/check-entry every few seconds for each active
+booking, and the gate and check-in endpoints look the same booking up
+again. A record holds what they need in one place: plate, vehicle type,
+spot label, status flags and timestamps, loaded with a single joined query.
+
+Records are kept on the database session, so for one request at most. The
+API runs as several workers and replicas, each seeing only its own writes,
+so nothing read from the database is kept beyond the request that read it:
+a booking cancelled or checked in through one process is what every other
+process reads next. Within a session a record is dropped as soon as that
+booking is flushed, and all of them when the transaction commits or rolls
+back, after which other processes' writes may be visible.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..db.models import MobileBooking, ParkingSpot, Vehicle, VehicleType
+
+# Session.info key of the session's records
+SESSION_KEY = "booking_records"
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """MySQL hands back naive UTC datetimes"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def booking_status(is_cancelled, is_checked_in, expires_at: datetime, now: Optional[datetime] = None) -> str:
+    """cancelled, checked_in, expired or active"""
+    if is_cancelled:
+        return "cancelled"
+    if is_checked_in:
+        return "checked_in"
+    if (now or datetime.now(timezone.utc)) > as_utc(expires_at):
+        return "expired"
+    return "active"
+
+
+@dataclass(frozen=True)
+class BookingRecord:
+    """Denormalized booking: the booking row plus its vehicle, type and spot"""
+    booking_id: str
+    user_id: int
+    vehicle_id: int
+    plate_number: str
+    type_code: str
+    type_name: str
+    spot_id: int
+    spot_label: str
+    start_time: datetime
+    expires_at: datetime
+    is_checked_in: bool
+    checked_in_at: Optional[datetime]
+    is_cancelled: bool
+    cancelled_at: Optional[datetime]
+    cancellation_reason: Optional[str]
+
+    @property
+    def status(self) -> str:
+        return booking_status(self.is_cancelled, self.is_checked_in, self.expires_at)
+
+
+def _state(booking: MobileBooking) -> dict:
+    return {
+        "start_time": as_utc(booking.start_time),
+        "expires_at": as_utc(booking.expires_at),
+        "is_checked_in": bool(booking.is_checked_in),
+        "checked_in_at": as_utc(booking.checked_in_at),
+        "is_cancelled": bool(booking.is_cancelled),
+        "cancelled_at": as_utc(booking.cancelled_at),
+        "cancellation_reason": booking.cancellation_reason,
+    }
+
+
+def _record(booking: MobileBooking, vehicle: Vehicle, vehicle_type: VehicleType, spot: ParkingSpot) -> BookingRecord:
+    return BookingRecord(
+        booking_id=booking.id,
+        user_id=booking.user_id,
+        vehicle_id=vehicle.id,
+        plate_number=vehicle.plate_number,
+        type_code=vehicle_type.code,
+        type_name=vehicle_type.name,
+        spot_id=spot.id,
+        spot_label=spot.label,
+        **_state(booking)
+    )
+
+
+def get_booking(db: Session, booking_id: str) -> Optional[BookingRecord]:
+    """Booking record, loaded with one joined query the first time the session asks"""
+    records = db.info.setdefault(SESSION_KEY, {})
+    if booking_id in records:
+        return records[booking_id]
+    row = db.query(MobileBooking, Vehicle, VehicleType, ParkingSpot).join(
+        Vehicle, MobileBooking.vehicle_id == Vehicle.id
+    ).join(
+        VehicleType, Vehicle.type_id == VehicleType.id
+    ).join(
+        ParkingSpot, MobileBooking.spot_id == ParkingSpot.id
+    ).filter(MobileBooking.id == booking_id).first()
+    record = _record(*row) if row is not None else None
+    records[booking_id] = record
+    return record
+
+
+@event.listens_for(MobileBooking, "after_insert")
+@event.listens_for(MobileBooking, "after_update")
+def _booking_written(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.get(SESSION_KEY, {}).pop(target.id, None)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_records(session):
+    session.info.pop(SESSION_KEY, None)
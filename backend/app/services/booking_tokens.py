@@ -0,0 +1,174 @@
+"""
+Booking Token Service
+Signed booking QR payloads for the gate
+
+A token carries what the entry form needs and an HMAC-SHA256 over it:
+
+    BK1.<payload>.<signature>        (both URL-safe base64, no padding)
+
+The payload is booking id, plate key, spot id, spot label, vehicle type code
+and expiry (unix seconds) joined with "|". The signature is truncated to
+128 bits to keep the QR code small. Tokens are signed with
+BOOKING_TOKEN_SECRET (JWT_SECRET if unset); changing it invalidates every
+outstanding booking QR.
+
+A valid signature proves what was booked, not that the booking can still
+be used: the gate checks the booking row (cancelled, checked in) before it
+accepts a token, so a cancelled or already used QR is refused by every
+worker.
+
+QR images are rendered only when the app asks for them and kept in an LRU
+keyed by booking id.
+"""
+
+import base64
+import hashlib
+import hmac
+import io
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+BOOKING_TOKEN_SECRET = os.getenv("BOOKING_TOKEN_SECRET") or os.getenv("JWT_SECRET", "change_me_secret")
+BOOKING_QR_CACHE_SIZE = int(os.getenv("BOOKING_QR_CACHE_SIZE", "1024"))
+
+TOKEN_PREFIX = "BK1"
+SIGNATURE_BYTES = 16
+QR_FORMATS = {
+    "svg": "image/svg+xml",
+    "png": "image/png",
+}
+
+
+class BookingTokenError(ValueError):
+    """Token is malformed, forged or expired; str() is the gate message"""
+
+
+@dataclass(frozen=True)
+class BookingClaims:
+    """Signed contents of a booking token"""
+    booking_id: str
+    plate_key: str
+    spot_id: int
+    spot_label: str
+    type_code: str
+    expires_at: datetime
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(BOOKING_TOKEN_SECRET.encode(), payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def issue_booking_token(booking_id: str, plate_key: str, spot_id: int, spot_label: str,
+                        type_code: str, expires_at: datetime) -> str:
+    """Create the QR payload for a booking"""
+    fields = [booking_id, plate_key, str(spot_id), spot_label, type_code, str(int(expires_at.timestamp()))]
+    if any("|" in field for field in fields):
+        raise ValueError(f"Booking token fields may not contain '|': {fields}")
+    payload = "|".join(fields).encode("utf-8")
+    return f"{TOKEN_PREFIX}.{_b64encode(payload)}.{_b64encode(_sign(payload))}"
+
+
+def is_booking_token(data: str) -> bool:
+    return bool(data) and data.startswith(TOKEN_PREFIX + ".")
+
+
+def verify_booking_token(token: str, now: Optional[datetime] = None) -> BookingClaims:
+    """
+    Check a scanned token's signature and expiry and return its contents
+
+    The booking itself may since have been cancelled or checked in; callers
+    that admit a vehicle check its row as well.
+
+    Raises:
+        BookingTokenError: Malformed, bad signature or expired
+    """
+    try:
+        prefix, payload_text, signature_text = token.strip().split(".")
+        payload, signature = _b64decode(payload_text), _b64decode(signature_text)
+    except ValueError:
+        raise BookingTokenError("Invalid QR code format")
+    if prefix != TOKEN_PREFIX or not hmac.compare_digest(signature, _sign(payload)):
+        raise BookingTokenError("Invalid QR code signature")
+
+    try:
+        booking_id, key, spot_id, spot_label, type_code, expiry = payload.decode("utf-8").split("|")
+        claims = BookingClaims(booking_id, key, int(spot_id), spot_label, type_code,
+                               datetime.fromtimestamp(int(expiry), tz=timezone.utc))
+    except ValueError:
+        raise BookingTokenError("Invalid QR code format")
+
+    if (now or datetime.now(timezone.utc)) > claims.expires_at:
+        raise BookingTokenError("Booking has expired")
+    return claims
+
+
+def _svg(matrix) -> bytes:
+    """One path of horizontal runs in module units; a few KB for a booking token"""
+    runs = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < len(row):
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < len(row) and row[x]:
+                x += 1
+            runs.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+    size = len(matrix)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/><path d="{"".join(runs)}"/></svg>').encode()
+
+
+def render_qr(token: str, fmt: str) -> bytes:
+    """QR code of a token as SVG (scales cleanly on phones) or a small PNG"""
+    import qrcode
+
+    qr = qrcode.QRCode(border=2, box_size=4, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(token)
+    qr.make(fit=True)
+    if fmt == "svg":
+        return _svg(qr.get_matrix())
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class QRCache:
+    """Thread-safe LRU of rendered booking QR codes: {(booking_id, fmt): (token, image)}"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[Tuple[str, str], Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_image(self, booking_id: str, token: str, fmt: str) -> bytes:
+        """Rendered QR for a booking's token, rendering it on first request"""
+        key = (booking_id, fmt)
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] == token:
+                self._items.move_to_end(key)
+                return item[1]
+        image = render_qr(token, fmt)
+        with self._lock:
+            self._items[key] = (token, image)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return image
+
+
+qr_cache = QRCache(BOOKING_QR_CACHE_SIZE)
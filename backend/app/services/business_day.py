@@ -0,0 +1,46 @@
+"""
+Business Day Service
+Maps UTC timestamps onto the site's local business day
+
+All report bucketing uses the day keys produced here so that a
+Sri Lankan (UTC+5:30) business day is never split across two UTC dates.
+"""
+import os
+from datetime import datetime, date, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+BUSINESS_TIMEZONE = os.getenv("BUSINESS_TIMEZONE", "Asia/Colombo")
+BUSINESS_TZ = ZoneInfo(BUSINESS_TIMEZONE)
+
+
+def to_business_day(ts: Optional[datetime]) -> Optional[date]:
+    """
+    Get the local business day a timestamp falls on
+
+    Naive datetimes are treated as UTC, matching how the API stores them.
+    """
+    if ts is None:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(BUSINESS_TZ).date()
+
+
+def business_today() -> date:
+    """Current local business day"""
+    return datetime.now(BUSINESS_TZ).date()
+
+
+def business_day_bounds(d: date) -> Tuple[datetime, datetime]:
+    """
+    UTC start (inclusive) and end (exclusive) of a local business day
+    """
+    start = datetime(d.year, d.month, d.day, tzinfo=BUSINESS_TZ)
+    end = start + timedelta(days=1)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+def is_closed_day(d: date) -> bool:
+    """True once the local business day has fully ended"""
+    return d < business_today()
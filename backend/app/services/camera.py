@@ -0,0 +1,75 @@
+"""
+Camera Capture Service
+Grabs a single frame from a lane camera for plate recognition
+
+Cameras are configured under "cameras" in config/plc_config.json and
+referenced by id from each lane:
+
+    "cameras": {"camera1": {"rtsp_url": "rtsp://...", "enabled": true}, ...}
+
+A lane camera that is not in that section is opened as a source directly:
+a device index ("0") or a stream URL. OpenCV is imported on first capture,
+so processes that never capture don't load it.
+"""
+
+import logging
+import time
+from typing import Dict, Optional
+
+from .plc_controller import load_plc_config
+
+logger = logging.getLogger(__name__)
+
+# Frames read and dropped before the one that is kept: RTSP streams start
+# with stale or partly decoded frames
+WARMUP_FRAMES = 2
+JPEG_QUALITY = 90
+
+
+class CameraError(Exception):
+    """Camera disabled, unreachable or returned no frame"""
+
+
+def camera_source(camera_id: str, config: Optional[Dict] = None):
+    """OpenCV source for a camera id: its rtsp_url, a device index, or the id itself"""
+    cameras = (config if config is not None else load_plc_config()).get("cameras", {})
+    camera = cameras.get(camera_id)
+    if camera is not None:
+        if not camera.get("enabled", True):
+            raise CameraError(f"Camera {camera_id} is disabled")
+        if not camera.get("rtsp_url"):
+            raise CameraError(f"Camera {camera_id} has no rtsp_url")
+        return camera["rtsp_url"]
+    return int(camera_id) if camera_id.isdigit() else camera_id
+
+
+def capture_frame(camera_id: Optional[str]) -> bytes:
+    """
+    Capture one frame as JPEG bytes (blocking; run it in a thread)
+
+    Raises:
+        CameraError: No camera on the lane, or no frame could be read
+    """
+    if not camera_id:
+        raise CameraError("Lane has no camera")
+    import cv2
+
+    source = camera_source(camera_id)
+    started = time.monotonic()
+    capture = cv2.VideoCapture(source)
+    try:
+        if not capture.isOpened():
+            raise CameraError(f"Could not open camera {camera_id}")
+        for _ in range(WARMUP_FRAMES):
+            capture.grab()
+        ok, frame = capture.read()
+        if not ok or frame is None:
+            raise CameraError(f"Camera {camera_id} returned no frame")
+    finally:
+        capture.release()
+
+    ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        raise CameraError(f"Could not encode frame from camera {camera_id}")
+    logger.info(f"[Camera] {camera_id}: captured {frame.shape[1]}x{frame.shape[0]} in {(time.monotonic() - started) * 1000:.0f} ms")
+    return jpeg.tobytes()
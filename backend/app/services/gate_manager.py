@@ -1,16 +1,20 @@
 """
 Gate Manager Service
 Orchestrates entry/exit workflows with camera and PLC integration
+
+Each lane runs its own state machine (see lane_workflow.py), driven by
+PLC events and OCR results, so lanes are processed in parallel. The
+methods here wait on those state machines for callers that want a
+request/response view of a vehicle passing through.
 """
 
 import logging
-from typing import Optional, Dict
-from datetime import datetime
+from typing import Optional, Dict, List
 import asyncio
 
-from .plc_controller import get_plc_controller
-from .camera import capture_and_recognize
-from .plate_recognition import detect_vehicle_type_from_plate
+from .lanes import ENTRY, EXIT
+from .lane_workflow import (CYCLE, RECOGNIZED, GATE_UP_STATES, EMERGENCY_CLOSED, EMERGENCY_OPEN,
+                            EMERGENCY_STATES, LaneWorkflow, get_lane_workflows)
 
 logger = logging.getLogger(__name__)
 
@@ -22,273 +26,137 @@ class GateManager:
     """
     
     def __init__(self):
-        self.plc = get_plc_controller()
-        self.entry_in_progress = False
-        self.exit_in_progress = False
+        self.workflows = get_lane_workflows()
+        self.lanes = self.workflows.registry
+    
+    async def _workflow(self, lane_id: Optional[str], direction: str) -> LaneWorkflow:
+        workflow = self.workflows.for_lane(lane_id, direction)
+        await self.workflows.start()
+        return workflow
+    
+    async def process_all(self, direction: str) -> List[Dict]:
+        """Wait for the next vehicle on every lane of a direction in parallel"""
+        process = self.process_entry if direction == ENTRY else self.process_exit
+        return await asyncio.gather(*(process(lane.lane_id) for lane in self.lanes.by_direction(direction)))
     
-    async def process_entry(self, camera_name: str = "camera1") -> Dict:
+    async def process_entry(self, lane_id: Optional[str] = None, timeout: float = 120) -> Dict:
         """
-        Process vehicle entry workflow
+        Wait for the next vehicle to complete entry on a lane
         
-        Steps:
-        1. Detect vehicle at entry sensor
-        2. Capture image from camera1
-        3. Recognize license plate
-        4. Detect vehicle type
-        5. Open Gate 1
-        6. Wait for vehicle to pass
-        7. Close Gate 1
+        The lane state machine detects the vehicle, reads the plate from
+        the lane's camera, opens the gate, waits for the vehicle to pass
+        and closes the gate.
         
         Args:
-            camera_name: Camera identifier (default: camera1)
+            lane_id: Entry lane from config (default: first entry lane)
+            timeout: Seconds to wait for a vehicle to complete entry
             
         Returns:
             dict: Entry result with plate, type, and status
         """
-        if self.entry_in_progress:
-            return {
-                "success": False,
-                "error": "Entry already in progress"
-            }
-        
-        self.entry_in_progress = True
-        
         try:
-            logger.info("[Gate Manager] Starting entry process")
-            
-            # Step 1: Check vehicle sensor
-            if not self.plc.is_vehicle_at_entry():
-                logger.info("[Gate Manager] Waiting for vehicle at entry...")
-                # Wait up to 30 seconds for vehicle
-                wait_count = 0
-                while not self.plc.is_vehicle_at_entry() and wait_count < 60:
-                    await asyncio.sleep(0.5)
-                    wait_count += 1
-                
-                if not self.plc.is_vehicle_at_entry():
-                    return {
-                        "success": False,
-                        "error": "No vehicle detected at entry"
-                    }
-            
-            logger.info("[Gate Manager] Vehicle detected at entry")
-            
-            # Step 2 & 3: Capture and recognize plate
-            logger.info(f"[Gate Manager] Capturing image from {camera_name}")
-            ocr_result = capture_and_recognize(camera_name)
-            
-            if not ocr_result or not ocr_result.get("plate_number"):
-                logger.warning("[Gate Manager] Failed to recognize plate")
-                # Still open gate for manual processing
-                plate_number = "MANUAL"
-                vehicle_type = "CAR"
-            else:
-                plate_number = ocr_result["plate_number"]
-                vehicle_type = ocr_result.get("type_code", "CAR")
-            
-            logger.info(f"[Gate Manager] Plate: {plate_number}, Type: {vehicle_type}")
-            
-            # Step 4: Detect vehicle type from plate
-            detected_type = detect_vehicle_type_from_plate(plate_number)
-            if detected_type:
-                vehicle_type = detected_type
-                logger.info(f"[Gate Manager] Auto-detected type: {vehicle_type}")
-            
-            # Step 5: Open Gate 1
-            logger.info("[Gate Manager] Opening entry gate")
-            if not self.plc.open_gate1():
-                return {
-                    "success": False,
-                    "error": "Failed to open entry gate",
-                    "plate_number": plate_number,
-                    "type_code": vehicle_type
-                }
-            
-            # Wait for gate to fully open
-            if not self.plc.wait_for_gate1_open(timeout=15):
-                logger.warning("[Gate Manager] Gate 1 did not fully open in time")
-            
-            # Step 6: Wait for vehicle to pass
-            logger.info("[Gate Manager] Waiting for vehicle to pass...")
-            await asyncio.sleep(5)  # Give vehicle time to pass
-            
-            # Wait until vehicle clears the sensor
-            wait_count = 0
-            while self.plc.is_vehicle_at_entry() and wait_count < 30:
-                await asyncio.sleep(0.5)
-                wait_count += 1
-            
-            # Step 7: Close Gate 1
-            logger.info("[Gate Manager] Closing entry gate")
-            self.plc.close_gate1()
-            
-            logger.info("[Gate Manager] Entry process completed successfully")
-            
-            return {
-                "success": True,
-                "plate_number": plate_number,
-                "type_code": vehicle_type,
-                "entry_time": datetime.now().isoformat(),
-                "message": "Vehicle entry processed successfully"
-            }
-            
-        except Exception as e:
-            logger.error(f"[Gate Manager] Entry process error: {str(e)}")
-            # Ensure gate is closed on error
-            self.plc.close_gate1()
+            workflow = await self._workflow(lane_id, ENTRY)
+        except KeyError as e:
+            return {"success": False, "error": str(e)}
+        
+        result = await workflow.wait_for(CYCLE, timeout)
+        if result is None:
             return {
                 "success": False,
-                "error": str(e)
+                "lane_id": workflow.lane.lane_id,
+                "error": "No vehicle processed at entry"
             }
-        finally:
-            self.entry_in_progress = False
+        return result
     
-    async def process_exit(self, camera_name: str = "camera2") -> Dict:
+    async def process_exit(self, lane_id: Optional[str] = None, timeout: float = 30) -> Dict:
         """
-        Process vehicle exit workflow
+        Wait for the next vehicle at an exit lane to be recognized
         
-        Steps:
-        1. Detect vehicle at exit sensor
-        2. Capture image from camera2
-        3. Recognize license plate
-        4. Calculate parking fee
-        5. Wait for payment confirmation
-        6. Open Gate 2
-        7. Wait for vehicle to pass
-        8. Close Gate 2
+        The gate stays down until open_exit_gate_after_payment() is called.
         
         Args:
-            camera_name: Camera identifier (default: camera2)
+            lane_id: Exit lane from config (default: first exit lane)
+            timeout: Seconds to wait for a vehicle
             
         Returns:
-            dict: Exit result with plate, fee, and status
+            dict: Exit result with plate and status
         """
-        if self.exit_in_progress:
-            return {
-                "success": False,
-                "error": "Exit already in progress"
-            }
-        
-        self.exit_in_progress = True
-        
         try:
-            logger.info("[Gate Manager] Starting exit process")
-            
-            # Step 1: Check vehicle sensor
-            if not self.plc.is_vehicle_at_exit():
-                logger.info("[Gate Manager] Waiting for vehicle at exit...")
-                # Wait up to 30 seconds for vehicle
-                wait_count = 0
-                while not self.plc.is_vehicle_at_exit() and wait_count < 60:
-                    await asyncio.sleep(0.5)
-                    wait_count += 1
-                
-                if not self.plc.is_vehicle_at_exit():
-                    return {
-                        "success": False,
-                        "error": "No vehicle detected at exit"
-                    }
-            
-            logger.info("[Gate Manager] Vehicle detected at exit")
-            
-            # Step 2 & 3: Capture and recognize plate
-            logger.info(f"[Gate Manager] Capturing image from {camera_name}")
-            ocr_result = capture_and_recognize(camera_name)
-            
-            if not ocr_result or not ocr_result.get("plate_number"):
-                logger.warning("[Gate Manager] Failed to recognize plate")
-                plate_number = "MANUAL"
-            else:
-                plate_number = ocr_result["plate_number"]
-            
-            logger.info(f"[Gate Manager] Exit plate: {plate_number}")
-            
-            # Note: Fee calculation and payment handled by controller
-            # This just handles the physical gate operation
-            
-            return {
-                "success": True,
-                "plate_number": plate_number,
-                "message": "Ready for payment and gate opening"
-            }
-            
-        except Exception as e:
-            logger.error(f"[Gate Manager] Exit process error: {str(e)}")
+            workflow = await self._workflow(lane_id, EXIT)
+        except KeyError as e:
+            return {"success": False, "error": str(e)}
+        
+        result = await workflow.wait_for(RECOGNIZED, timeout)
+        if result is None:
             return {
                 "success": False,
-                "error": str(e)
+                "lane_id": workflow.lane.lane_id,
+                "error": "No vehicle detected at exit"
             }
-        finally:
-            self.exit_in_progress = False
+        if result.get("success"):
+            result["message"] = "Ready for payment and gate opening"
+        return result
     
-    async def open_exit_gate_after_payment(self) -> Dict:
+    async def open_exit_gate_after_payment(self, lane_id: Optional[str] = None) -> Dict:
         """
         Open exit gate after payment is confirmed
         
+        The lane closes the gate by itself once the vehicle has passed.
+        
+        Args:
+            lane_id: Exit lane from config (default: first exit lane)
+        
         Returns:
             dict: Gate operation result
         """
         try:
-            logger.info("[Gate Manager] Opening exit gate after payment")
-            
-            # Open Gate 2
-            if not self.plc.open_gate2():
-                return {
-                    "success": False,
-                    "error": "Failed to open exit gate"
-                }
-            
-            # Wait for gate to fully open
-            if not self.plc.wait_for_gate2_open(timeout=15):
-                logger.warning("[Gate Manager] Gate 2 did not fully open in time")
-            
-            # Wait for vehicle to pass
-            logger.info("[Gate Manager] Waiting for vehicle to pass...")
-            await asyncio.sleep(5)
-            
-            # Wait until vehicle clears the sensor
-            wait_count = 0
-            while self.plc.is_vehicle_at_exit() and wait_count < 30:
-                await asyncio.sleep(0.5)
-                wait_count += 1
-            
-            # Close Gate 2
-            logger.info("[Gate Manager] Closing exit gate")
-            self.plc.close_gate2()
-            
-            logger.info("[Gate Manager] Exit gate operation completed")
-            
-            return {
-                "success": True,
-                "message": "Exit gate operated successfully"
-            }
-            
-        except Exception as e:
-            logger.error(f"[Gate Manager] Exit gate operation error: {str(e)}")
-            # Ensure gate is closed on error
-            self.plc.close_gate2()
+            workflow = await self._workflow(lane_id, EXIT)
+        except KeyError as e:
+            return {"success": False, "error": str(e)}
+        
+        logger.info(f"[Gate Manager] Releasing {workflow.lane.name} after payment")
+        status = await workflow.command("release")
+        if status["state"] not in GATE_UP_STATES:
             return {
                 "success": False,
-                "error": str(e)
+                "lane_id": workflow.lane.lane_id,
+                "state": status["state"],
+                "error": "Failed to open exit gate"
             }
+        return {
+            "success": True,
+            "lane_id": workflow.lane.lane_id,
+            "state": status["state"],
+            "message": "Exit gate opened"
+        }
     
-    def emergency_open_all_gates(self) -> Dict:
+    async def _emergency_all(self, action: str) -> Dict[str, str]:
+        """Send an emergency command to every lane workflow; lane_id -> resulting state"""
+        await self.workflows.start()
+        states = {}
+        for workflow in self.workflows.workflows.values():
+            status = await workflow.command(action)
+            states[workflow.lane.lane_id] = status["state"]
+        return states
+
+    async def emergency_open_all_gates(self) -> Dict:
         """
         Emergency: Open all gates (power failure, evacuation, etc.)
-        
+
+        Each lane is put in its emergency_open state, so it holds the barrier
+        up and ignores vehicles until resume_all_gates().
+
         Returns:
             dict: Operation result
         """
         logger.critical("[Gate Manager] EMERGENCY: Opening all gates")
         
         try:
-            gate1_result = self.plc.open_gate1()
-            gate2_result = self.plc.open_gate2()
+            states = await self._emergency_all("emergency_open")
             
             return {
-                "success": gate1_result and gate2_result,
-                "gate1_opened": gate1_result,
-                "gate2_opened": gate2_result,
+                "success": all(state == EMERGENCY_OPEN for state in states.values()),
+                "opened": states,
                 "message": "Emergency gate opening executed"
             }
         except Exception as e:
@@ -298,23 +166,23 @@ class GateManager:
                 "error": str(e)
             }
     
-    def emergency_close_all_gates(self) -> Dict:
+    async def emergency_close_all_gates(self) -> Dict:
         """
         Emergency: Close all gates (security threat, etc.)
-        
+
+        Each lane is put in its emergency_closed state until resume_all_gates().
+
         Returns:
             dict: Operation result
         """
         logger.critical("[Gate Manager] EMERGENCY: Closing all gates")
         
         try:
-            gate1_result = self.plc.close_gate1()
-            gate2_result = self.plc.close_gate2()
+            states = await self._emergency_all("emergency_close")
             
             return {
-                "success": gate1_result and gate2_result,
-                "gate1_closed": gate1_result,
-                "gate2_closed": gate2_result,
+                "success": all(state == EMERGENCY_CLOSED for state in states.values()),
+                "closed": states,
                 "message": "Emergency gate closing executed"
             }
         except Exception as e:
@@ -323,15 +191,43 @@ class GateManager:
                 "success": False,
                 "error": str(e)
             }
+
+    async def resume_all_gates(self) -> Dict:
+        """
+        End an emergency: open lanes close their barrier, closed lanes go idle
+
+        Returns:
+            dict: Operation result
+        """
+        logger.warning("[Gate Manager] Emergency cleared: resuming normal operation")
+
+        try:
+            await self.workflows.start()
+            states = {}
+            for workflow in self.workflows.workflows.values():
+                if workflow.state in EMERGENCY_STATES:
+                    states[workflow.lane.lane_id] = (await workflow.command("resume"))["state"]
+            return {
+                "success": True,
+                "resumed": states,
+                "message": "Normal gate operation resumed"
+            }
+        except Exception as e:
+            logger.error(f"[Gate Manager] Resume error: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
     
     def get_gate_status(self) -> Dict:
         """
-        Get current status of all gates and sensors
+        Get current status of all lanes
         
         Returns:
-            dict: Complete system status
+            dict: Lane states and sensor inputs
         """
-        return self.plc.get_system_status()
+        states = {w["lane_id"]: w for w in self.workflows.status()}
+        return {"lanes": [{**lane, **states[lane["lane_id"]]} for lane in self.lanes.status()]}
 
 
 # Global gate manager instance
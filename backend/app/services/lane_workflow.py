@@ -0,0 +1,587 @@
+"""
+Lane Workflow Service
+Per-lane gate state machine driven by PLC events and OCR results
+
+States:
+    idle -> vehicle_present -> recognizing -> opening -> open
+         -> vehicle_cleared -> closing -> idle
+    any  -> emergency_open / emergency_closed -> (resume) closing / idle
+
+The emergency states are entered by the emergency_open and
+emergency_close commands from any state. The barrier is held where it was
+put and PLC and OCR events are ignored until "resume".
+
+Each lane runs one asyncio task that consumes its own event queue (PLC
+edges routed from the poller, OCR results, timers and operator commands),
+so lanes never block each other and a lane never handles two events at
+once.
+
+OCR is pipelined: a vehicle that arrives while the gate is still closing
+for the previous one is recognized straight away, and once the gate
+reports closed the lane moves on with the plate already read. On entry
+lanes a vehicle that reaches the sensor while the barrier is still up will
+drive through, so the gate is held (vehicle_cleared -> open) and that
+vehicle is recognized as well; the barrier is never lowered onto an
+occupied sensor.
+
+Exit lanes stop in vehicle_present after OCR until release() is called
+(payment confirmed); entry lanes open as soon as the plate is read. Exit
+barriers close as soon as the paid vehicle clears, so the next vehicle
+waits and pays. One that still follows through (behind a paid vehicle, or
+under a barrier the safety loop reopened) is a tailgate: it is published
+as a failed last_result with "tailgate": True and kept in status()["alerts"].
+"""
+
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .lanes import ENTRY, Lane, get_lane_registry
+from .plates import parse_plate
+
+logger = logging.getLogger(__name__)
+
+IDLE = "idle"
+VEHICLE_PRESENT = "vehicle_present"
+RECOGNIZING = "recognizing"
+OPENING = "opening"
+OPEN = "open"
+VEHICLE_CLEARED = "vehicle_cleared"
+CLOSING = "closing"
+EMERGENCY_OPEN = "emergency_open"
+EMERGENCY_CLOSED = "emergency_closed"
+EMERGENCY_STATES = {EMERGENCY_OPEN, EMERGENCY_CLOSED}
+
+TRANSITIONS = {
+    IDLE: {VEHICLE_PRESENT, OPENING},
+    VEHICLE_PRESENT: {RECOGNIZING, OPENING, IDLE},
+    RECOGNIZING: {VEHICLE_PRESENT, OPENING, IDLE},
+    OPENING: {OPEN, IDLE},
+    OPEN: {VEHICLE_CLEARED, CLOSING},
+    VEHICLE_CLEARED: {CLOSING, OPEN},
+    CLOSING: {IDLE, OPEN},
+    EMERGENCY_OPEN: {CLOSING},
+    EMERGENCY_CLOSED: {IDLE},
+}
+# An emergency overrides whatever the lane is doing
+for _targets in TRANSITIONS.values():
+    _targets.update(EMERGENCY_STATES)
+
+# States in which the barrier is (or is going) up
+GATE_UP_STATES = {OPENING, OPEN, VEHICLE_CLEARED, EMERGENCY_OPEN}
+
+# Waiter milestones
+RECOGNIZED = "recognized"
+CYCLE = "cycle"
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+async def recognize_plate(lane: Lane) -> Dict:
+    """
+    Capture from the lane's camera and read the plate (in this process or on
+    an OCR worker, see run_mode.get_ocr)
+
+    Returns:
+        dict: {"plate_number": str or None, "type_code": str}; no plate
+        (the operator enters it) if the camera or OCR worker is unavailable
+    """
+    from .camera import CameraError, capture_frame
+    from .run_mode import RPCError, get_ocr
+
+    try:
+        image = await asyncio.to_thread(capture_frame, lane.camera)
+        ocr_result = await get_ocr().recognize(image)
+    except (CameraError, RPCError) as e:
+        logger.error(f"[Lane {lane.lane_id}] Capture failed: {str(e)}")
+        return {"plate_number": None, "type_code": "CAR"}
+    if ocr_result.get("error"):
+        logger.info(f"[Lane {lane.lane_id}] No plate read: {ocr_result['error']}")
+
+    plate_number = ocr_result.get("plate")
+    type_code = ocr_result.get("type_code") or "CAR"
+    parsed = parse_plate(plate_number)
+    if parsed:
+        plate_number, type_code = parsed.canonical, parsed.type_code
+    return {"plate_number": plate_number, "type_code": type_code}
+
+
+class LaneWorkflow:
+    """
+    State machine for one lane
+
+    Args:
+        lane: Lane from the registry
+        recognize: Coroutine returning {"plate_number", "type_code"} for the lane
+        close_delay: Seconds to hold the gate after the vehicle clears the sensor
+        clear_timeout: Seconds to wait for the vehicle to pass before closing anyway
+        history_size: Transitions kept for status()
+    """
+
+    def __init__(self, lane: Lane, recognize: Callable[[Lane], Awaitable[Dict]] = recognize_plate,
+                 close_delay: float = 2.0, clear_timeout: float = 20, history_size: int = 50):
+        self.lane = lane
+        self.recognize = recognize
+        self.close_delay = close_delay
+        self.clear_timeout = clear_timeout
+
+        self.state = IDLE
+        self.updated_at = datetime.now(timezone.utc)
+        self.history = deque(maxlen=history_size)
+        self.vehicle: Optional[Dict] = None  # plate/type of the vehicle being served
+        self.last_result: Optional[Dict] = None
+        self.alerts = deque(maxlen=history_size)  # tailgates, for staff
+
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._recognition: Optional[asyncio.Task] = None
+        self._pending: Optional[asyncio.Task] = None  # pipelined OCR for the next vehicle
+        self._tailgate: Optional[Dict] = None  # alert for the vehicle following through an exit
+        self._waiters: Dict[str, List[asyncio.Future]] = {RECOGNIZED: [], CYCLE: []}
+
+    # Lifecycle
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name=f"lane-{self.lane.lane_id}")
+
+    async def stop(self):
+        self._cancel_timer()
+        for task in (self._recognition, self._pending, self._task):
+            if task and not task.done():
+                task.cancel()
+        if self._task:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # Inputs
+
+    def post(self, kind: str, value=None):
+        """Queue an event (PLC edge name, 'ocr', 'timer') for the lane task"""
+        self._events.put_nowait((kind, value, None))
+
+    async def command(self, action: str) -> Dict:
+        """
+        Operator command: 'open', 'close', 'release' (exit payment confirmed),
+        'emergency_open', 'emergency_close' or 'resume'
+
+        Returns:
+            dict: Lane status after the command was handled
+        """
+        self.start()
+        reply = asyncio.get_running_loop().create_future()
+        self._events.put_nowait(("command", action, reply))
+        await reply
+        return self.status()
+
+    async def wait_for(self, milestone: str, timeout: float) -> Optional[Dict]:
+        """Wait for the next RECOGNIZED plate or completed CYCLE; None on timeout"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[milestone].append(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if future in self._waiters[milestone]:
+                self._waiters[milestone].remove(future)
+
+    def status(self) -> Dict:
+        return {
+            "lane_id": self.lane.lane_id,
+            "direction": self.lane.direction,
+            "state": self.state,
+            "gate_up": self.state in GATE_UP_STATES,
+            "vehicle": self.vehicle,
+            "next_vehicle_recognizing": self._pending is not None,
+            "updated_at": self.updated_at.isoformat(),
+            "last_result": self.last_result,
+            "history": list(self.history)[-10:],
+            "alerts": list(self.alerts)[-10:],
+        }
+
+    # State machine
+
+    def _transition(self, new_state: str, reason: str):
+        if new_state not in TRANSITIONS[self.state]:
+            raise InvalidTransition(f"{self.state} -> {new_state} ({reason})")
+        logger.info(f"[Lane {self.lane.lane_id}] {self.state} -> {new_state}: {reason}")
+        self._cancel_timer()
+        self.history.append({"from": self.state, "to": new_state, "reason": reason,
+                             "at": datetime.now(timezone.utc).isoformat()})
+        self.state = new_state
+        self.updated_at = datetime.now(timezone.utc)
+
+    def _set_timer(self, delay: float, name: str):
+        self._cancel_timer()
+        self._timer = asyncio.get_running_loop().call_later(delay, self.post, "timer", (name, self.state))
+
+    def _cancel_timer(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _resolve(self, milestone: str, result: Dict):
+        waiters, self._waiters[milestone] = self._waiters[milestone], []
+        for future in waiters:
+            if not future.done():
+                future.set_result(result)
+
+    def _start_recognition(self) -> asyncio.Task:
+        async def run():
+            result = await self.recognize(self.lane)
+            self.post("ocr", task)
+            return result
+        task = asyncio.create_task(run(), name=f"lane-{self.lane.lane_id}-ocr")
+        return task
+
+    async def _run(self):
+        while True:
+            kind, value, reply = await self._events.get()
+            try:
+                async with self.lane.lock:
+                    await self._handle(kind, value)
+            except InvalidTransition as e:
+                logger.warning(f"[Lane {self.lane.lane_id}] Ignored {kind} {value}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Lane {self.lane.lane_id}] Error handling {kind}: {str(e)}")
+            finally:
+                if reply is not None and not reply.done():
+                    reply.set_result(self.state)
+
+    async def _handle(self, kind: str, value):
+        if self.state in EMERGENCY_STATES and kind != "command":
+            return
+
+        if kind == "vehicle_arrived":
+            if self.state == IDLE:
+                self._begin_vehicle(self._start_recognition(), "vehicle at sensor")
+            elif self.state in (OPEN, VEHICLE_CLEARED):
+                # Barrier is up, so this vehicle will drive through: read its plate
+                if self.lane.direction == ENTRY:
+                    if self.state == VEHICLE_CLEARED:
+                        self._transition(OPEN, "next vehicle in gate path")
+                elif self.vehicle is not None:
+                    # Exit opened for a paid vehicle that has not cleared yet (exits close
+                    # on clearing, so they never wait in vehicle_cleared)
+                    self._flag_tailgate("followed a paid vehicle through the exit gate")
+                if self.vehicle is not None:
+                    self._complete_vehicle({"success": True, "message": "Vehicle processed"})
+                self._cancel_recognition()
+                self._recognition = self._start_recognition()
+            elif self.state == CLOSING and self._pending is None:
+                # Next vehicle is already waiting: read its plate while the gate comes down
+                logger.info(f"[Lane {self.lane.lane_id}] Next vehicle arrived, recognizing while closing")
+                self._pending = self._start_recognition()
+
+        elif kind == "vehicle_left":
+            if self.state == OPEN:
+                self._transition(VEHICLE_CLEARED, "vehicle passed")
+                if self.vehicle is not None:
+                    self._complete_vehicle({"success": True, "message": "Vehicle processed"})
+                if self.lane.direction == ENTRY:
+                    self._set_timer(self.close_delay, "close")
+                else:
+                    # Lower the exit barrier before the next vehicle can follow unpaid
+                    await self._close("vehicle passed exit")
+            elif self.state in (VEHICLE_PRESENT, RECOGNIZING):
+                self._cancel_recognition()
+                self._finish({"success": False, "error": "Vehicle left before the gate opened"}, "vehicle left")
+            elif self._pending is not None:
+                self._pending.cancel()
+                self._pending = None
+
+        elif kind == "gate_opened":
+            if self.state == OPENING:
+                self._gate_up("gate fully open")
+            elif self.state == CLOSING:
+                # PLC safety loop reversed the barrier onto a vehicle: let it through and read its plate
+                logger.warning(f"[Lane {self.lane.lane_id}] {self.lane.name} reopened while closing")
+                self._transition(OPEN, "safety reversal")
+                if self._pending is not None:
+                    if self.lane.direction != ENTRY:
+                        self._flag_tailgate("forced through the closing exit gate")
+                    self._cancel_recognition()
+                    self._recognition, self._pending = self._pending, None
+                    if self._recognition.done():
+                        self.post("ocr", self._recognition)
+
+        elif kind == "gate_closed":
+            if self.state == CLOSING:
+                self._gate_down("gate fully closed")
+
+        elif kind == "ocr":
+            task = value
+            if task is self._recognition:
+                self._recognition = None
+                try:
+                    result = task.result()
+                except Exception as e:
+                    logger.exception(f"[Lane {self.lane.lane_id}] Recognition failed: {str(e)}")
+                    result = {}
+                await self._on_recognized(result)
+
+        elif kind == "timer":
+            name, armed_in = value
+            if armed_in != self.state:
+                return
+            if name == "open_timeout":
+                logger.warning(f"[Lane {self.lane.lane_id}] {self.lane.name} did not fully open in time")
+                self._gate_up("open timeout")
+            elif name == "close":
+                await self._close("close delay elapsed")
+            elif name == "clear_timeout":
+                logger.warning(f"[Lane {self.lane.lane_id}] Vehicle still at sensor, closing anyway")
+                await self._close("vehicle did not clear")
+            elif name == "close_timeout":
+                logger.warning(f"[Lane {self.lane.lane_id}] {self.lane.name} did not fully close in time")
+                self._gate_down("close timeout")
+
+        elif kind == "command":
+            await self._on_command(value)
+
+    async def _on_command(self, action: str):
+        if action in ("emergency_open", "emergency_close"):
+            await self._emergency(action == "emergency_open")
+            return
+        if self.state in EMERGENCY_STATES:
+            if action != "resume":
+                raise InvalidTransition(f"{action} during {self.state}; resume first")
+            if self.state == EMERGENCY_OPEN:
+                await self._close("emergency cleared")
+            else:
+                self._transition(IDLE, "emergency cleared")
+            return
+        if action == "open":
+            self._cancel_recognition()
+            await self._open("manual open")
+        elif action == "close":
+            if self.state == OPENING:
+                self._gate_up("manual close")
+            await self._close("manual close")
+        elif action == "release":
+            if self.state not in (VEHICLE_PRESENT, RECOGNIZING):
+                raise InvalidTransition(f"nothing to release in {self.state}")
+            self._cancel_recognition()
+            await self._open("released")
+        else:
+            raise ValueError(f"Unknown lane command: {action}")
+
+    async def _emergency(self, open_gate: bool):
+        """Hold the barrier open or closed regardless of the current state"""
+        self._cancel_recognition()
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        if self._tailgate is not None:
+            self._report_tailgate()
+        if self.vehicle is not None or self.state in (VEHICLE_PRESENT, RECOGNIZING):
+            self._complete_vehicle({"success": False, "error": "Emergency override"})
+        command = self.lane.open_gate if open_gate else self.lane.close_gate
+        if not await asyncio.to_thread(command):
+            logger.error(f"[Lane {self.lane.lane_id}] Emergency {'open' if open_gate else 'close'} command failed")
+        self._transition(EMERGENCY_OPEN if open_gate else EMERGENCY_CLOSED,
+                         "emergency open" if open_gate else "emergency close")
+
+    def _begin_vehicle(self, recognition: asyncio.Task, reason: str):
+        if self._tailgate is not None:
+            # The tailgater's plate was never read
+            self._report_tailgate()
+        self._transition(VEHICLE_PRESENT, reason)
+        self._transition(RECOGNIZING, "capturing plate")
+        self.vehicle = None
+        self._recognition = recognition
+        if recognition.done():
+            # Pipelined OCR finished while the gate was closing
+            self.post("ocr", recognition)
+
+    async def _on_recognized(self, result: Dict):
+        self.vehicle = {
+            "plate_number": result.get("plate_number") or "MANUAL",
+            "type_code": result.get("type_code") or "CAR",
+            "recognized_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if self._tailgate is not None:
+            self._report_tailgate()
+            return
+        self._resolve(RECOGNIZED, {"success": True, "lane_id": self.lane.lane_id, **self.vehicle})
+        if self.state != RECOGNIZING:
+            # Vehicle that followed through the open gate
+            if self.state != OPEN:
+                self._complete_vehicle({"success": True, "message": "Vehicle passed through open gate"})
+            return
+        if self.lane.direction == ENTRY:
+            await self._open("plate recognized")
+        else:
+            # Exit: wait for payment before release()
+            self._transition(VEHICLE_PRESENT, "awaiting payment")
+
+    async def _open(self, reason: str):
+        self._transition(OPENING, reason)
+        if not await asyncio.to_thread(self.lane.open_gate):
+            self._finish({"success": False, "error": f"Failed to open {self.lane.name}"}, "open command failed")
+            return
+        if self.lane.enabled:
+            self._set_timer(self.lane.timeout_seconds, "open_timeout")
+        else:
+            self._gate_up("no gate feedback")
+
+    def _gate_up(self, reason: str):
+        self._transition(OPEN, reason)
+        if self.vehicle is not None:
+            self._set_timer(self.clear_timeout, "clear_timeout")
+
+    async def _close(self, reason: str):
+        self._transition(CLOSING, reason)
+        await asyncio.to_thread(self.lane.close_gate)
+        if self.lane.enabled:
+            self._set_timer(self.lane.timeout_seconds, "close_timeout")
+        else:
+            self._gate_down("no gate feedback")
+
+    def _gate_down(self, reason: str):
+        if self.vehicle is not None:
+            self._finish({"success": True, "message": "Vehicle processed"}, reason)
+        else:
+            self._transition(IDLE, reason)
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            self._begin_vehicle(pending, "next vehicle waiting")
+
+    def _complete_vehicle(self, result: Dict):
+        """Publish the outcome for the current vehicle"""
+        self.last_result = {
+            "lane_id": self.lane.lane_id,
+            **(self.vehicle or {}),
+            **result,
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.vehicle = None
+        self._resolve(CYCLE, self.last_result)
+        if not result.get("success"):
+            self._resolve(RECOGNIZED, self.last_result)
+
+    def _flag_tailgate(self, reason: str):
+        """Record a vehicle leaving through the exit unpaid; its plate is added once read"""
+        logger.warning(f"[Lane {self.lane.lane_id}] Tailgate: vehicle {reason}")
+        self._tailgate = {
+            "type": "tailgate",
+            "lane_id": self.lane.lane_id,
+            "reason": reason,
+            "plate_number": None,
+            "detected_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.alerts.append(self._tailgate)
+
+    def _report_tailgate(self):
+        """Publish the tailgate as the lane's last result, with the plate if it was read"""
+        alert, self._tailgate = self._tailgate, None
+        if self.vehicle is not None:
+            alert["plate_number"] = self.vehicle["plate_number"]
+        self._complete_vehicle({"success": False, "tailgate": True,
+                                "error": "Vehicle left through the exit gate without paying"})
+
+    def _finish(self, result: Dict, reason: str):
+        """Close out the current vehicle and return to idle"""
+        self._complete_vehicle(result)
+        self._transition(IDLE, reason)
+
+    def _cancel_recognition(self):
+        if self._recognition is not None:
+            self._recognition.cancel()
+            self._recognition = None
+
+
+class LaneWorkflows:
+    """Workflows for every configured lane plus the PLC event routing"""
+
+    def __init__(self, registry=None, recognize: Callable[[Lane], Awaitable[Dict]] = recognize_plate):
+        self.registry = registry or get_lane_registry()
+        self.workflows: Dict[str, LaneWorkflow] = {
+            lane_id: LaneWorkflow(lane, recognize) for lane_id, lane in self.registry.lanes.items()
+        }
+        self._routers: List[asyncio.Task] = []
+        self._started = False
+
+    def get(self, lane_id: str) -> LaneWorkflow:
+        if lane_id not in self.workflows:
+            raise KeyError(f"Unknown lane: {lane_id}")
+        return self.workflows[lane_id]
+
+    def for_lane(self, lane_id: Optional[str], direction: str) -> LaneWorkflow:
+        """Workflow by id, or the first lane of a direction"""
+        lane = self.registry.default_lane(direction) if lane_id is None else self.registry.get(lane_id)
+        if lane.direction != direction:
+            raise KeyError(f"Lane {lane.lane_id} is not an {direction} lane")
+        return self.workflows[lane.lane_id]
+
+    async def start(self):
+        """Start every lane task and route PLC events from each enabled PLC's poller"""
+        if self._started:
+            return
+        self._started = True
+        for workflow in self.workflows.values():
+            workflow.start()
+        for plc_name, lanes in self.registry.by_plc().items():
+            if not lanes[0].enabled:
+                continue
+            poller = lanes[0].poller
+            await poller.start()
+            self._routers.append(asyncio.create_task(self._route(poller.subscribe()), name=f"lane-router-{plc_name}"))
+
+    async def _route(self, queue: asyncio.Queue):
+        while True:
+            event = await queue.get()
+            lane_id, _, name = event.name.partition(".")
+            workflow = self.workflows.get(lane_id)
+            if workflow is not None and name:
+                workflow.post(name)
+
+    async def stop(self):
+        for task in self._routers:
+            task.cancel()
+        self._routers = []
+        self._started = False
+        for workflow in self.workflows.values():
+            await workflow.stop()
+
+    def status(self) -> List[Dict]:
+        return [workflow.status() for workflow in self.workflows.values()]
+
+
+# Global lane workflows
+_lane_workflows: Optional[LaneWorkflows] = None
+
+
+def get_lane_workflows() -> LaneWorkflows:
+    """
+    Get or create the workflows for all configured lanes
+
+    Returns:
+        LaneWorkflows: Global lane workflows (await start() to begin)
+    """
+    global _lane_workflows
+    if _lane_workflows is None:
+        _lane_workflows = LaneWorkflows()
+    return _lane_workflows
+
+
+async def shutdown_lane_workflows():
+    """Stop lane tasks if they were started"""
+    if _lane_workflows is not None:
+        await _lane_workflows.stop()
@@ -0,0 +1,216 @@
+"""
+Lane Topology Service
+Loads entry/exit lanes from config/plc_config.json
+
+Every entry under "gates" is one lane. A lane names the PLC it is wired
+to (default: the top-level "plc" section, others are declared under
+"plcs" with their own host/port/unit_id), its coil/input/register
+addresses, and the camera that reads plates for it:
+
+    "plcs": {"north": {"host": "192.168.1.111", "port": 502, "unit_id": 2}},
+    "gates": {
+        "entry": {"direction": "entry", "camera": "camera1", ...},
+        "entry_north": {"direction": "entry", "plc": "north", "camera": "camera3", ...}
+    }
+
+Each lane has its own lock, so workflows on different lanes run in
+parallel while a single lane handles one vehicle at a time.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .plc_controller import DEFAULT_PLC, PLCController, get_plc_controller, load_plc_config, plc_settings
+from .plc_poller import PLCPoller, get_plc_poller
+
+logger = logging.getLogger(__name__)
+
+ENTRY = "entry"
+EXIT = "exit"
+
+# Lanes used when the config has no "gates" section (the documented two-gate memory map)
+DEFAULT_GATES = {
+    "entry": {
+        "name": "Entry Gate (Gate 1)", "direction": ENTRY, "camera": "camera1",
+        "open_address": 0, "close_address": 2, "open_status_address": 10,
+        "closed_status_address": 12, "vehicle_sensor_address": 14, "traffic_light_address": 20,
+    },
+    "exit": {
+        "name": "Exit Gate (Gate 2)", "direction": EXIT, "camera": "camera2",
+        "open_address": 1, "close_address": 3, "open_status_address": 11,
+        "closed_status_address": 13, "vehicle_sensor_address": 15, "traffic_light_address": 21,
+    },
+}
+
+
+@dataclass
+class Lane:
+    """One gate with its sensor, traffic light and camera"""
+    lane_id: str
+    direction: str
+    name: str
+    plc_name: str
+    camera: Optional[str]
+    open_coil: int
+    close_coil: int
+    open_status: int
+    closed_status: int
+    vehicle_sensor: int
+    traffic_light: Optional[int] = None
+    timeout_seconds: float = 15
+    auto_close_delay: float = 5
+    enabled: bool = True  # False: no PLC wired, gate commands only update lane state
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    @property
+    def plc(self) -> PLCController:
+        return get_plc_controller(self.plc_name)
+
+    @property
+    def poller(self) -> PLCPoller:
+        return get_plc_poller(self.plc_name)
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    def open_gate(self) -> bool:
+        if not self.enabled:
+            return True
+        return self.plc.open_gate(self.open_coil, self.traffic_light, self.name)
+
+    def close_gate(self) -> bool:
+        if not self.enabled:
+            return True
+        return self.plc.close_gate(self.close_coil, self.traffic_light, self.name)
+
+    def edge_names(self) -> Dict[int, tuple]:
+        """Poller event names for this lane's inputs"""
+        return {
+            self.open_status: (f"{self.lane_id}.gate_opened", None),
+            self.closed_status: (f"{self.lane_id}.gate_closed", None),
+            self.vehicle_sensor: (f"{self.lane_id}.vehicle_arrived", f"{self.lane_id}.vehicle_left"),
+        }
+
+    def status(self) -> Dict:
+        """Lane settings and inputs from the PLC status snapshot"""
+        status = {
+            "lane_id": self.lane_id,
+            "name": self.name,
+            "direction": self.direction,
+            "plc": self.plc_name,
+            "plc_enabled": self.enabled,
+            "camera": self.camera,
+            "busy": self.busy,
+        }
+        if self.enabled:
+            plc = self.plc
+            status.update({
+                "fully_open": plc.read_input(self.open_status),
+                "fully_closed": plc.read_input(self.closed_status),
+                "vehicle_present": plc.read_input(self.vehicle_sensor),
+            })
+        return status
+
+
+def _lane_from_config(lane_id: str, gate: Dict, plcs: Dict[str, Dict]) -> Lane:
+    direction = gate.get("direction", lane_id if lane_id in (ENTRY, EXIT) else None)
+    if direction not in (ENTRY, EXIT):
+        raise ValueError(f"Lane {lane_id}: direction must be 'entry' or 'exit'")
+    plc_name = gate.get("plc", DEFAULT_PLC)
+    if plc_name not in plcs:
+        raise ValueError(f"Lane {lane_id}: unknown PLC '{plc_name}'")
+    return Lane(
+        lane_id=lane_id,
+        direction=direction,
+        name=gate.get("name", lane_id),
+        plc_name=plc_name,
+        camera=gate.get("camera"),
+        open_coil=gate["open_address"],
+        close_coil=gate["close_address"],
+        open_status=gate["open_status_address"],
+        closed_status=gate["closed_status_address"],
+        vehicle_sensor=gate["vehicle_sensor_address"],
+        traffic_light=gate.get("traffic_light_address"),
+        timeout_seconds=gate.get("timeout_seconds", 15),
+        auto_close_delay=gate.get("auto_close_delay", 5),
+        enabled=plcs[plc_name].get("enabled", True),
+    )
+
+
+class LaneRegistry:
+    """All configured lanes, indexed by id and direction"""
+
+    def __init__(self, lanes: List[Lane]):
+        self.lanes: Dict[str, Lane] = {}
+        for lane in lanes:
+            if lane.lane_id in self.lanes:
+                raise ValueError(f"Duplicate lane id: {lane.lane_id}")
+            self.lanes[lane.lane_id] = lane
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "LaneRegistry":
+        plcs = plc_settings(config)
+        gates = config.get("gates") or DEFAULT_GATES
+        return cls([_lane_from_config(lane_id, gate, plcs) for lane_id, gate in gates.items()])
+
+    def get(self, lane_id: str) -> Lane:
+        lane = self.lanes.get(lane_id)
+        if lane is None:
+            raise KeyError(f"Unknown lane: {lane_id}")
+        return lane
+
+    def by_direction(self, direction: str) -> List[Lane]:
+        return [lane for lane in self.lanes.values() if lane.direction == direction]
+
+    def default_lane(self, direction: str) -> Lane:
+        lanes = self.by_direction(direction)
+        if not lanes:
+            raise KeyError(f"No {direction} lanes configured")
+        return lanes[0]
+
+    def by_plc(self) -> Dict[str, List[Lane]]:
+        grouped: Dict[str, List[Lane]] = {}
+        for lane in self.lanes.values():
+            grouped.setdefault(lane.plc_name, []).append(lane)
+        return grouped
+
+    def bind_plcs(self):
+        """Size each enabled PLC's block reads to its lanes and name the poller events"""
+        for plc_name, lanes in self.by_plc().items():
+            if not lanes[0].enabled:
+                continue
+            plc = get_plc_controller(plc_name)
+            plc.watch_addresses(
+                inputs=[a for lane in lanes for a in (lane.open_status, lane.closed_status, lane.vehicle_sensor)],
+                coils=[a for lane in lanes for a in (lane.open_coil, lane.close_coil)],
+                registers=[lane.traffic_light for lane in lanes if lane.traffic_light is not None],
+            )
+            poller = get_plc_poller(plc_name)
+            for lane in lanes:
+                poller.edge_names.update(lane.edge_names())
+
+    def status(self) -> List[Dict]:
+        return [lane.status() for lane in self.lanes.values()]
+
+
+# Global lane registry
+_lane_registry: Optional[LaneRegistry] = None
+
+
+def get_lane_registry() -> LaneRegistry:
+    """
+    Get or create the lane registry from config/plc_config.json
+
+    Returns:
+        LaneRegistry: Global lane registry with its PLCs bound
+    """
+    global _lane_registry
+    if _lane_registry is None:
+        registry = LaneRegistry.from_config(load_plc_config())
+        registry.bind_plcs()
+        logger.info(f"[Lanes] Loaded {len(registry.lanes)} lanes: {', '.join(registry.lanes)}")
+        _lane_registry = registry
+    return _lane_registry
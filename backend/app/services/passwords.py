@@ -0,0 +1,326 @@
+"""
+Password Service
+bcrypt hashing on a bounded thread pool, and login rate limiting
+
+bcrypt is deliberately slow (100-300 ms of CPU per hash or check). Run on
+the event loop it stalls every other request of the worker, gate traffic
+included, for the whole login. Hashes and checks therefore run on their own
+pool of PASSWORD_WORKERS threads (bcrypt releases the GIL, so they run in
+parallel with the loop). At most PASSWORD_QUEUE_LIMIT more may wait for a
+thread; beyond that PasswordBusyError is raised at once instead of queueing
+work nobody will wait for.
+
+LoginRateLimiter is checked before any hash is computed:
+    LOGIN_MAX_FAILURES    failed logins per username and client IP per
+                          LOGIN_FAILURE_WINDOW s
+    LOGIN_IP_ATTEMPTS     login/register attempts per client IP per LOGIN_IP_WINDOW s
+Failures lock a username out only for the address they came from, so
+someone guessing at an account cannot lock its owner out everywhere. A
+successful login clears the failures of that username and address.
+Attempts and failures are rows of login_attempts, counted in SQL, so the
+limits are the same whichever API worker or replica a request reaches.
+Attempts that arrive together may each pass a limit they reach together.
+
+bcrypt cost is set at startup by configure_password_cost:
+    BCRYPT_ROUNDS    fixed cost; stored hashes of any other cost are
+                     re-hashed at their next login
+    (unset)          the cost measured on this host: the highest that hashes
+                     within BCRYPT_TARGET_MS (pick_bcrypt_rounds). It is
+                     measured once, by the first API process to start, and
+                     kept in app_settings, so every process and restart
+                     after that uses the same cost without timing anything.
+                     Until the measurement is done that first process uses
+                     DEFAULT_BCRYPT_ROUNDS. Weaker stored hashes are
+                     re-hashed at login, stronger ones are kept
+Delete the bcrypt_rounds setting (or run scripts/bcrypt_cost.py --store) to
+measure again after moving hosts. Logins use verify_and_update, which
+returns the new hash to store.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..db.models import AppSetting, LoginAttempt
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS")
+DEFAULT_BCRYPT_ROUNDS = 12
+BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+BCRYPT_ROUNDS_SETTING = "bcrypt_rounds"
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_FAILURE_WINDOW = int(os.getenv("LOGIN_FAILURE_WINDOW", "300"))
+LOGIN_IP_ATTEMPTS = int(os.getenv("LOGIN_IP_ATTEMPTS", "60"))
+LOGIN_IP_WINDOW = int(os.getenv("LOGIN_IP_WINDOW", "60"))
+
+# Seconds between deletions of login_attempts rows past every window
+LIMITER_SWEEP_INTERVAL = 60
+
+# passlib defaults until configure_password_cost runs
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordBusyError(RuntimeError):
+    """Every password thread is busy and the wait queue is full"""
+
+
+class PasswordPool:
+    """Runs password hashes on a fixed number of threads, with a bounded queue"""
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._lock = threading.Lock()
+        self._pending = 0  # Submitted and not finished, running or queued
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self._rejected += 1
+                raise PasswordBusyError("Too many logins in progress, try again shortly")
+            self._pending += 1
+        submitted = time.monotonic()
+
+        def job():
+            waited = time.monotonic() - submitted
+            with self._lock:
+                self._running += 1
+                self._wait_total += waited
+                self._max_wait = max(self._max_wait, waited)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._completed += 1
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(1000 * self._wait_total / started, 1) if started else 0.0,
+                "max_wait_ms": round(1000 * self._max_wait, 1),
+            }
+
+
+password_pool = PasswordPool(PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT)
+
+
+async def hash_password(password: str) -> str:
+    return await password_pool.run(pwd_context.hash, password)
+
+
+async def verify_and_update(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """Check a password; the second value is a new hash if the stored one has outdated settings"""
+    return await password_pool.run(pwd_context.verify_and_update, password, password_hash)
+
+
+def bcrypt_rounds() -> int:
+    return pwd_context.handler("bcrypt").default_rounds
+
+
+def _bcrypt_ms(rounds: int) -> float:
+    handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+    start = time.perf_counter()
+    handler.hash("benchmark")
+    return (time.perf_counter() - start) * 1000
+
+
+def pick_bcrypt_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 16) -> int:
+    """Highest cost between min_rounds and max_rounds that hashes within target_ms on this host"""
+    base_ms = min(_bcrypt_ms(min_rounds) for _ in range(2))
+    rounds = min_rounds
+    # Each extra round doubles the work
+    while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+        rounds += 1
+    if rounds > min_rounds and _bcrypt_ms(rounds) > target_ms:
+        rounds -= 1
+    return rounds
+
+
+def _use_rounds(rounds: int, max_rounds: int = 31):
+    global pwd_context
+    pwd_context = CryptContext(
+        schemes=["bcrypt"], deprecated="auto",
+        bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=max_rounds
+    )
+    logger.info(f"[Passwords] bcrypt cost {rounds}")
+
+
+def stored_bcrypt_rounds(db) -> Optional[int]:
+    setting = db.get(AppSetting, BCRYPT_ROUNDS_SETTING)
+    return int(setting.value) if setting else None
+
+
+def store_bcrypt_rounds(db, rounds: int, replace: bool = False) -> int:
+    """
+    Save the cost for every API process
+
+    Without `replace` a cost another process stored first is kept.
+
+    Returns:
+        int: The cost now stored
+    """
+    if replace:
+        db.merge(AppSetting(key=BCRYPT_ROUNDS_SETTING, value=str(rounds)))
+    else:
+        db.add(AppSetting(key=BCRYPT_ROUNDS_SETTING, value=str(rounds)))
+    try:
+        db.commit()
+        return rounds
+    except IntegrityError:
+        db.rollback()
+        return stored_bcrypt_rounds(db)
+
+
+def calibrate_password_cost(session_factory) -> int:
+    """Measure the cost for this host, store it unless another process got there first, and use the stored one"""
+    measured = pick_bcrypt_rounds(BCRYPT_TARGET_MS)
+    with session_factory() as db:
+        rounds = store_bcrypt_rounds(db, measured)
+    logger.info(f"[Passwords] measured bcrypt cost {measured} for {BCRYPT_TARGET_MS:g} ms, stored cost is {rounds}")
+    _use_rounds(rounds)
+    return rounds
+
+
+def _calibrate_in_background(session_factory):
+    try:
+        calibrate_password_cost(session_factory)
+    except Exception as e:
+        logger.error(f"[Passwords] Could not measure the bcrypt cost, keeping {bcrypt_rounds()}: {e}")
+
+
+def configure_password_cost(session_factory=None, background: bool = True) -> int:
+    """
+    Set the bcrypt cost for this process (see module docstring)
+
+    With nothing stored yet the cost is measured on a background thread, so
+    startup does not wait for it, or before returning if `background` is False.
+
+    Returns:
+        int: The cost in use when it returns
+    """
+    if BCRYPT_ROUNDS:
+        rounds = int(BCRYPT_ROUNDS)
+        _use_rounds(rounds, max_rounds=rounds)
+        return rounds
+    if session_factory is None:
+        from ..db.database import SessionLocal
+        session_factory = SessionLocal
+    try:
+        with session_factory() as db:
+            stored = stored_bcrypt_rounds(db)
+    except SQLAlchemyError as e:
+        logger.warning(f"[Passwords] Could not read the stored bcrypt cost ({e}); apply "
+                       f"migrations/005_app_settings.sql. Using cost {DEFAULT_BCRYPT_ROUNDS}")
+        _use_rounds(DEFAULT_BCRYPT_ROUNDS)
+        return DEFAULT_BCRYPT_ROUNDS
+    if stored:
+        _use_rounds(stored)
+        return stored
+
+    if not background:
+        return calibrate_password_cost(session_factory)
+    logger.info(f"[Passwords] No bcrypt cost stored yet; using {DEFAULT_BCRYPT_ROUNDS} while this host is measured")
+    _use_rounds(DEFAULT_BCRYPT_ROUNDS)
+    threading.Thread(target=_calibrate_in_background, args=(session_factory,),
+                     name="bcrypt-cost", daemon=True).start()
+    return DEFAULT_BCRYPT_ROUNDS
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class LoginRateLimiter:
+    """Sliding-window counts of failed logins per (username, IP) and attempts per IP, in login_attempts"""
+
+    def __init__(self, max_failures: int, failure_window: int, ip_attempts: int, ip_window: int):
+        self.max_failures = max_failures
+        self.failure_window = failure_window
+        self.ip_attempts = ip_attempts
+        self.ip_window = ip_window
+        self._swept: Optional[datetime] = None
+
+    @staticmethod
+    def _retry_after(db: Session, ip: str, account: Optional[str], limit: int, window: int, now: datetime) -> int:
+        """0 if fewer than `limit` rows of (ip, account) fall in the window, else seconds until one leaves it"""
+        count, oldest = db.query(func.count(LoginAttempt.id), func.min(LoginAttempt.attempted_at)).filter(
+            LoginAttempt.ip == ip,
+            LoginAttempt.account == account,
+            LoginAttempt.attempted_at > now - timedelta(seconds=window)
+        ).one()
+        if count < limit:
+            return 0
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        return int((oldest + timedelta(seconds=window) - now).total_seconds()) + 1
+
+    def _sweep(self, db: Session, now: datetime):
+        if self._swept is not None and now - self._swept < timedelta(seconds=LIMITER_SWEEP_INTERVAL):
+            return
+        self._swept = now
+        cutoff = now - timedelta(seconds=max(self.failure_window, self.ip_window))
+        db.query(LoginAttempt).filter(LoginAttempt.attempted_at <= cutoff).delete(synchronize_session=False)
+
+    def check(self, db: Session, ip: str, username: Optional[str] = None) -> int:
+        """
+        Count an attempt from `ip` unless it is over a limit
+
+        Returns:
+            int: 0 if the attempt may go ahead, else seconds until it may be retried
+        """
+        now = _utcnow()
+        self._sweep(db, now)
+        retry_after = 0
+        if username is not None:
+            retry_after = self._retry_after(db, ip, username, self.max_failures, self.failure_window, now)
+        if not retry_after:
+            retry_after = self._retry_after(db, ip, None, self.ip_attempts, self.ip_window, now)
+        if not retry_after:
+            db.add(LoginAttempt(ip=ip, account=None, attempted_at=now))
+        db.commit()
+        return retry_after
+
+    def failed(self, db: Session, username: str, ip: str):
+        db.add(LoginAttempt(ip=ip, account=username, attempted_at=_utcnow()))
+        db.commit()
+
+    def succeeded(self, db: Session, username: str, ip: str):
+        db.query(LoginAttempt).filter(
+            LoginAttempt.ip == ip, LoginAttempt.account == username
+        ).delete(synchronize_session=False)
+        db.commit()
+
+
+login_limiter = LoginRateLimiter(LOGIN_MAX_FAILURES, LOGIN_FAILURE_WINDOW, LOGIN_IP_ATTEMPTS, LOGIN_IP_WINDOW)
@@ -2,14 +2,17 @@
 License Plate Recognition Service
 Uses EasyOCR for actual license plate detection
 Supports Sri Lankan plate formats: KN-1062, ABC-1234, WP-CAB-1234, etc.
+
+OpenCV and NumPy are imported by the functions that decode images, so
+processes that never run OCR (API-only replicas) don't load them.
 """
-import re
-from typing import Optional, Dict
-import base64
-from io import BytesIO
-from PIL import Image
-import numpy as np
-import cv2
+import time
+from typing import TYPE_CHECKING, Optional, Dict
+
+if TYPE_CHECKING:
+    import numpy as np
+
+from .plates import DEFAULT_TYPE, find_plate, is_canonical_plate, parse_plate
 
 # Global EasyOCR reader (initialized on first use to avoid startup delay)
 _reader = None
@@ -27,13 +30,16 @@ def get_ocr_reader():
             _reader = False
     return _reader
 
-def preprocess_plate_image(image_data: bytes) -> np.ndarray:
+def preprocess_plate_image(image_data: bytes) -> "np.ndarray":
     """
     Preprocess image for better OCR accuracy
     - Convert to grayscale
     - Apply adaptive thresholding
     - Denoise
     """
+    import cv2
+    import numpy as np
+    
     # Convert bytes to numpy array
     nparr = np.frombuffer(image_data, np.uint8)
     image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
@@ -52,16 +58,22 @@ def preprocess_plate_image(image_data: bytes) -> np.ndarray:
     
     return thresh
 
-def extract_plate_from_image(image_data: bytes) -> Optional[str]:
+def extract_plate_from_image(image_data: bytes, timings: Optional[Dict] = None) -> Optional[str]:
     """
     Extract license plate number from vehicle image using EasyOCR.
     It tries multiple preprocessing methods and ranks the results to find the best plate.
+
+    If `timings` is given, each pass records its preprocess_ms, ocr_ms and
+    the texts it read under the pass name (used by benchmarks/ocr_accuracy.py).
     """
     reader = get_ocr_reader()
     if reader is False:
         print("OCR not available, using fallback")
         return None
 
+    import cv2
+    import numpy as np
+
     try:
         print("[OCR] Starting plate detection with multi-pass strategy...")
         
@@ -81,7 +93,9 @@ def extract_plate_from_image(image_data: bytes) -> Optional[str]:
         
         for method_name, preprocess_func in preprocessing_methods:
             try:
+                started = time.perf_counter()
                 processed_image = preprocess_func()
+                preprocessed = time.perf_counter()
                 # Optimized: add batch_size and text detection parameters for speed
                 results = reader.readtext(
                     processed_image, 
@@ -91,6 +105,12 @@ def extract_plate_from_image(image_data: bytes) -> Optional[str]:
                     text_threshold=0.7,
                     low_text=0.4
                 )
+                if timings is not None:
+                    timings[method_name] = {
+                        "preprocess_ms": (preprocessed - started) * 1000,
+                        "ocr_ms": (time.perf_counter() - preprocessed) * 1000,
+                        "texts": [text[1] for text in results],
+                    }
                 
                 if results:
                     detected_texts = [text[1].upper().strip() for text in results]
@@ -135,61 +155,17 @@ def extract_plate_from_image(image_data: bytes) -> Optional[str]:
 def detect_vehicle_type_from_plate(plate: str) -> str:
     """
     Detect vehicle type from license plate prefix
-    Based on Sri Lankan vehicle registration system:
+    Based on Sri Lankan vehicle registration system (see plates.SERIES_TYPES):
     - Car (C): Prefix C (e.g., CAA, CBA) or old K, G, H, J
     - Bike (B): Prefix B (e.g., BAA, BAC) or old M, T, U, V, W, X
     - Three-Wheeler (A): Prefix A (e.g., AAA, ABC) or old Q, Y (mapped to BIKE type)
-    - Dual Purpose/Cab (P): Prefix P (e.g., PAA, PBE) or old J, P (mapped to VAN type)
-    - Bus (N): Prefix N (e.g., NA, NB) or old N (mapped to HEAVY type)
-    - Lorry (L): Prefix L (e.g., LAA) or old L (mapped to HEAVY type)
+    - Dual Purpose/Cab (P): Prefix P (e.g., PAA, PBE) (mapped to VAN type)
+    - Bus (N) and Lorry (L): mapped to HEAVY type
     
     Database has: CAR, BIKE, HEAVY, VAN
-    Mapping: Three-Wheeler->BIKE, Cab->VAN, Bus/Lorry->HEAVY
     """
-    plate_upper = plate.upper()
-    
-    # Extract the main letter prefix
-    # For format ABC-1234 or WP-ABC-1234
-    parts = plate_upper.split('-')
-    
-    # Get the main letter part (last letter group before numbers)
-    if len(parts) == 3:
-        # Provincial format: WP-CAB-1234 -> use 'CAB'
-        main_letters = parts[1]
-    elif len(parts) == 2:
-        # Standard format: ABC-1234 -> use 'ABC'
-        main_letters = parts[0]
-    else:
-        return "CAR"  # Default fallback
-    
-    # Check first letter of main letters group
-    first_letter = main_letters[0] if main_letters else ''
-    
-    # New system (first letter determines type)
-    if first_letter == 'C':
-        return "CAR"
-    elif first_letter == 'B':
-        return "BIKE"
-    elif first_letter == 'A':
-        return "BIKE"  # Three-Wheeler mapped to BIKE
-    elif first_letter == 'P':
-        return "VAN"   # Cab/Dual Purpose mapped to VAN
-    elif first_letter == 'N':
-        return "HEAVY"  # Bus
-    elif first_letter == 'L':
-        return "HEAVY"  # Lorry
-    # Old system prefixes
-    elif first_letter in ['K', 'G', 'H']:
-        return "CAR"
-    elif first_letter in ['M', 'T', 'U', 'V', 'W', 'X']:
-        return "BIKE"
-    elif first_letter in ['Q', 'Y']:
-        return "BIKE"  # Three-Wheeler old prefix mapped to BIKE
-    elif first_letter == 'J':
-        # J can be either Car or Cab - default to CAR
-        return "CAR"
-    else:
-        return "CAR"  # Default fallback
+    parsed = parse_plate(plate)
+    return parsed.type_code if parsed else DEFAULT_TYPE
 
 def detect_vehicle_type(image_data: bytes) -> Optional[str]:
     """
@@ -200,6 +176,9 @@ def detect_vehicle_type(image_data: bytes) -> Optional[str]:
     """
     # Basic heuristic: analyze image dimensions
     try:
+        import cv2
+        import numpy as np
+        
         nparr = np.frombuffer(image_data, np.uint8)
         image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         height, width = image.shape[:2]
@@ -223,85 +202,42 @@ def extract_plate_pattern(text: str) -> Optional[str]:
     - Provincial plates: WP-CAB-1234, CP-ABC-5678
     - Old format: KN-1062, AB-1234, ABC-1234
     - New format: CAB-1234, ABC-5678
+    Separators may be dashes, spaces or missing; the result is canonical (dashes)
     """
-    # Remove extra whitespace and convert to uppercase
-    text = text.upper().strip()
-    text = re.sub(r'\s+', ' ', text)  # Normalize spaces
-    
-    # Pattern matching for Sri Lankan license plate formats
-    patterns = [
-        # Provincial format: WP-CAB-1234, CP-ABC-5678 (2 letters, 3 letters, 4 digits)
-        r'([A-Z]{2})[-\s]?([A-Z]{3})[-\s]?(\d{4})',
-        
-        # Standard format: ABC-1234, CAB-5678 (3 letters, 4 digits)
-        r'([A-Z]{3})[-\s]?(\d{4})',
-        
-        # Old short format: KN-1062, AB-1234 (2 letters, 4 digits)
-        r'([A-Z]{2})[-\s]?(\d{4})',
-        
-        # Without separator: WP CAB 1234, WPCAB1234
-        r'([A-Z]{2})\s?([A-Z]{3})\s?(\d{4})',
-        
-        # Without separator: ABC1234, CAB5678
-        r'([A-Z]{3})(\d{4})',
-        
-        # Without separator: KN1062, AB1234
-        r'([A-Z]{2})(\d{4})'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            groups = match.groups()
-            
-            # Format based on number of groups
-            if len(groups) == 3:
-                # Provincial format: WP-CAB-1234
-                return f"{groups[0]}-{groups[1]}-{groups[2]}"
-            elif len(groups) == 2:
-                # Standard format: ABC-1234 or KN-1062
-                return f"{groups[0]}-{groups[1]}"
-    
-    return None
+    parsed = find_plate(text)
+    return parsed.canonical if parsed else None
 
 def validate_plate_format(plate: str) -> bool:
     """
     Validate if plate matches Sri Lankan format
     Accepts: WP-CAB-1234, ABC-1234, KN-1062
     """
-    patterns = [
-        r'^[A-Z]{2}-[A-Z]{3}-\d{4}$',  # Provincial: WP-CAB-1234
-        r'^[A-Z]{3}-\d{4}$',            # Standard: ABC-1234
-        r'^[A-Z]{2}-\d{4}$'             # Old short: KN-1062
-    ]
-    
-    plate_upper = plate.upper()
-    return any(re.match(pattern, plate_upper) for pattern in patterns)
+    return is_canonical_plate(plate)
 
 def get_next_available_spot(db, type_code: str) -> Optional[str]:
     """
     Find next available parking spot for given vehicle type
     Returns spot label or None if no spots available
     """
-    from ..db.models import ParkingSpot, VehicleType
+    from ..db.models import VehicleType
+    from .spots import suggest_spot
     
     # Get vehicle type
     vtype = db.query(VehicleType).filter(VehicleType.code == type_code).first()
     if not vtype:
         return None
     
-    # Find first available spot for this type
-    spot = db.query(ParkingSpot).filter(
-        ParkingSpot.type_id == vtype.id,
-        ParkingSpot.is_occupied == False
-    ).first()
+    # Suggest the spot the assignment strategy picks; entry claims it atomically
+    spot = suggest_spot(db, vtype.id)
     
     return spot.label if spot else None
 
-def process_vehicle_image(image_data: bytes) -> Dict[str, str]:
+def process_vehicle_image(image_data: bytes, timings: Optional[Dict] = None) -> Dict[str, str]:
     """
     Complete pipeline: Extract plate, detect type from plate prefix, find spot
     Returns dict with plate, type_code, and error if any
+
+    `timings` is passed to extract_plate_from_image for per-pass latency
     """
     result = {
         'plate': None,
@@ -311,7 +247,7 @@ def process_vehicle_image(image_data: bytes) -> Dict[str, str]:
     
     try:
         # Extract plate number
-        plate = extract_plate_from_image(image_data)
+        plate = extract_plate_from_image(image_data, timings)
         if not plate:
             result['error'] = "Could not detect license plate"
             return result
@@ -0,0 +1,113 @@
+"""
+Plate Parsing Service
+One parser for Sri Lankan number plates, shared by OCR, entry, bookings and RFID
+
+Formats:
+    WP-CAB-1234   provincial: province, 3-letter series, number
+    CAB-1234      3-letter series, number
+    KN-1062       old 2-letter series, number
+
+Separators are optional when parsing OCR text ("WP CAB 1234", "CAB1234").
+Every plate has a canonical form with dashes (WP-CAB-1234) and a key with
+only letters and digits (WPCAB1234) that is used to compare plates typed,
+read or stored in different ways.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# Province/series/number alternatives, longest format first so that at any
+# position "WP CAB 1234" is read as a provincial plate, not CAB-1234
+_PLATE_IN_TEXT = re.compile(
+    r"(?P<p_province>[A-Z]{2})[-\s]?(?P<p_series>[A-Z]{3})[-\s]?(?P<p_number>\d{4})"
+    r"|(?P<s_series>[A-Z]{3})[-\s]?(?P<s_number>\d{4})"
+    r"|(?P<o_series>[A-Z]{2})[-\s]?(?P<o_number>\d{4})"
+)
+
+# Canonical forms only
+_CANONICAL_PLATE = re.compile(r"[A-Z]{2}-[A-Z]{3}-\d{4}|[A-Z]{2,3}-\d{4}")
+
+_NOT_ALPHANUMERIC = re.compile(r"[^A-Z0-9]")
+_WHITESPACE = re.compile(r"\s+")
+
+# First letter of the series -> vehicle type code in the database
+# (CAR, BIKE, HEAVY, VAN). New series: C car, B bike, A three-wheeler,
+# P cab/dual purpose, N bus, L lorry; old series use K/G/H/J for cars and
+# M/T/U/V/W/X/Q/Y for bikes and three-wheelers.
+SERIES_TYPES = {
+    "C": "CAR", "K": "CAR", "G": "CAR", "H": "CAR", "J": "CAR",
+    "B": "BIKE", "A": "BIKE",
+    "M": "BIKE", "T": "BIKE", "U": "BIKE", "V": "BIKE", "W": "BIKE", "X": "BIKE",
+    "Q": "BIKE", "Y": "BIKE",
+    "P": "VAN",
+    "N": "HEAVY", "L": "HEAVY",
+}
+DEFAULT_TYPE = "CAR"
+
+
+@dataclass(frozen=True)
+class ParsedPlate:
+    """A plate split into its parts"""
+    province: Optional[str]
+    series: str
+    number: str
+
+    @property
+    def canonical(self) -> str:
+        """Display/storage form: WP-CAB-1234, CAB-1234, KN-1062"""
+        if self.province:
+            return f"{self.province}-{self.series}-{self.number}"
+        return f"{self.series}-{self.number}"
+
+    @property
+    def key(self) -> str:
+        """Comparison key: WPCAB1234"""
+        return f"{self.province or ''}{self.series}{self.number}"
+
+    @property
+    def type_code(self) -> str:
+        return SERIES_TYPES.get(self.series[0], DEFAULT_TYPE)
+
+
+def _from_match(match: re.Match) -> ParsedPlate:
+    groups = match.groupdict()
+    if groups["p_series"]:
+        return ParsedPlate(groups["p_province"], groups["p_series"], groups["p_number"])
+    if groups["s_series"]:
+        return ParsedPlate(None, groups["s_series"], groups["s_number"])
+    return ParsedPlate(None, groups["o_series"], groups["o_number"])
+
+
+def find_plate(text: str) -> Optional[ParsedPlate]:
+    """First plate inside free text such as an OCR fragment"""
+    if not text:
+        return None
+    match = _PLATE_IN_TEXT.search(_WHITESPACE.sub(" ", text.upper().strip()))
+    return _from_match(match) if match else None
+
+
+def parse_plate(plate: str) -> Optional[ParsedPlate]:
+    """Parse a whole plate in any separator style; None if it is not a plate"""
+    if not plate:
+        return None
+    match = _PLATE_IN_TEXT.fullmatch(_WHITESPACE.sub(" ", plate.upper().strip()))
+    return _from_match(match) if match else None
+
+
+def is_canonical_plate(plate: str) -> bool:
+    """True for WP-CAB-1234, CAB-1234, KN-1062 (any case)"""
+    return bool(plate) and _CANONICAL_PLATE.fullmatch(plate.upper()) is not None
+
+
+def canonical_plate(plate: str) -> str:
+    """Canonical form of a recognized plate; other input is just trimmed and upper-cased"""
+    parsed = parse_plate(plate)
+    if parsed:
+        return parsed.canonical
+    return _WHITESPACE.sub(" ", (plate or "").upper().strip())
+
+
+def plate_key(plate: str) -> str:
+    """Letters and digits only, upper case; equal keys mean the same plate"""
+    return _NOT_ALPHANUMERIC.sub("", (plate or "").upper())
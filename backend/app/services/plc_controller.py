@@ -3,14 +3,51 @@ PLC Controller Service
 Handles communication with PLC system for gate control via Modbus TCP/IP
 """
 
+import json
 import logging
-from typing import Optional, Dict
-from pymodbus.client import ModbusTcpClient
-from pymodbus.exceptions import ModbusException
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List
 import time
+from .plc_supervisor import ConnectionSupervisor
 
 logger = logging.getLogger(__name__)
 
+PLC_CONFIG_PATH = os.getenv(
+    "PLC_CONFIG_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "..", "config", "plc_config.json")
+)
+
+
+def load_plc_config() -> Dict:
+    """Read config/plc_config.json, or {} if it is missing or invalid"""
+    try:
+        with open(PLC_CONFIG_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"[PLC] Could not load {PLC_CONFIG_PATH}: {str(e)}")
+        return {}
+
+
+@dataclass
+class PLCStatusSnapshot:
+    """Decoded discrete-input block read in a single Modbus request"""
+    inputs: List[bool]
+    input_start: int
+    read_at: float = field(default_factory=time.monotonic)
+    
+    def input(self, address: int) -> bool:
+        """Value of a discrete input by absolute address"""
+        offset = address - self.input_start
+        if offset < 0 or offset >= len(self.inputs):
+            raise KeyError(f"Input {address} is outside the snapshot block")
+        return bool(self.inputs[offset])
+    
+    def age(self) -> float:
+        """Seconds since the block was read"""
+        return time.monotonic() - self.read_at
+
 
 class PLCController:
     """
@@ -31,7 +68,10 @@ class PLCController:
     - Holding 21: Exit Traffic Light (0=Red, 1=Green)
     """
     
-    def __init__(self, host: str = "192.168.1.110", port: int = 502, unit_id: int = 1):
+    def __init__(self, host: str = "192.168.1.110", port: int = 502, unit_id: int = 1,
+                 status_max_age: float = 0.2, timeout: float = 1,
+                 heartbeat_interval: float = 5, failure_threshold: int = 3,
+                 backoff_initial: float = 1, backoff_max: float = 30):
         """
         Initialize PLC connection
         
@@ -39,12 +79,32 @@ class PLCController:
             host: PLC IP address
             port: Modbus TCP port (default 502)
             unit_id: Modbus unit/slave ID (default 1)
+            status_max_age: Seconds a status snapshot is reused by the is_* accessors
+            timeout: Socket timeout per request in seconds
+            heartbeat_interval: Seconds between link probes (safety.heartbeat_interval_seconds)
+            failure_threshold: Consecutive failures before requests fail fast
+            backoff_initial: First reconnect delay in seconds, doubled on each failure
+            backoff_max: Largest reconnect delay in seconds
         """
         self.host = host
         self.port = port
         self.unit_id = unit_id
-        self.client: Optional[ModbusTcpClient] = None
-        self.connected = False
+        self.timeout = timeout
+        self.client = None  # pymodbus ModbusTcpClient, created on connect()
+        self.status_max_age = status_max_age
+        self._snapshot: Optional[PLCStatusSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+        # The sync client is not thread-safe; lanes, the heartbeat and API threads share it
+        self._io_lock = threading.Lock()
+        self.supervisor = ConnectionSupervisor(
+            connect=self._open_client,
+            disconnect=self._close_client,
+            probe=self._heartbeat,
+            heartbeat_interval=heartbeat_interval,
+            failure_threshold=failure_threshold,
+            backoff_initial=backoff_initial,
+            backoff_max=backoff_max
+        )
         
         # PLC Memory Addresses
         self.GATE1_OPEN_COIL = 0
@@ -62,54 +122,90 @@ class PLCController:
         
         self.ENTRY_TRAFFIC_LIGHT = 20
         self.EXIT_TRAFFIC_LIGHT = 21
+        
+        # Contiguous blocks read in one request each
+        self.COIL_BLOCK_START = 0
+        self.COIL_BLOCK_COUNT = 4
+        self.INPUT_BLOCK_START = 10
+        self.INPUT_BLOCK_COUNT = 6
+        self.HOLDING_BLOCK_START = 20
+        self.HOLDING_BLOCK_COUNT = 2
+    
+    @property
+    def connected(self) -> bool:
+        return self.supervisor.connected
     
     def connect(self) -> bool:
         """
         Connect to PLC
         
         Returns:
-            bool: True if connection successful
+            bool: True if connection successful (False while backing off)
         """
-        try:
+        return self.supervisor.ensure_connected()
+    
+    def disconnect(self):
+        """Disconnect from PLC"""
+        self.supervisor.stop_heartbeat()
+        if self.client:
+            self.supervisor.mark_disconnected()
+            logger.info("[PLC] Disconnected from PLC")
+    
+    def _open_client(self) -> bool:
+        # pymodbus is an optional hardware dependency (requirements_hardware.txt)
+        from pymodbus.client import ModbusTcpClient
+        
+        if self.client is None:
+            # Reconnects and retries are handled by the supervisor. retries=1 is still
+            # needed: pymodbus uses it to finish reading a frame split across TCP reads.
             self.client = ModbusTcpClient(
                 host=self.host,
                 port=self.port,
-                timeout=3,
-                retries=3,
-                retry_on_empty=True
+                timeout=self.timeout,
+                retries=1
             )
-            self.connected = self.client.connect()
-            
-            if self.connected:
-                logger.info(f"[PLC] Connected to PLC at {self.host}:{self.port}")
-            else:
-                logger.error(f"[PLC] Failed to connect to PLC at {self.host}:{self.port}")
-            
-            return self.connected
-        except Exception as e:
-            logger.error(f"[PLC] Connection error: {str(e)}")
-            self.connected = False
-            return False
+        connected = self.client.connect()
+        
+        if connected:
+            logger.info(f"[PLC] Connected to PLC at {self.host}:{self.port}")
+        else:
+            logger.error(f"[PLC] Failed to connect to PLC at {self.host}:{self.port}")
+        return connected
     
-    def disconnect(self):
-        """Disconnect from PLC"""
+    def _close_client(self):
         if self.client:
             self.client.close()
-            self.connected = False
-            logger.info("[PLC] Disconnected from PLC")
     
     def _ensure_connected(self) -> bool:
-        """Ensure PLC connection is active"""
-        if not self.connected:
-            return self.connect()
-        return True
+        """Ensure PLC connection is active; fails fast while the PLC is known to be down"""
+        return self.supervisor.ensure_connected()
+    
+    def _request(self, operation: str, request, probe: bool = False):
+        """Run a client call through the supervisor; None if the PLC is unreachable"""
+        with self._io_lock:
+            return self.supervisor.call(operation, request, probe)
+    
+    def _heartbeat(self) -> bool:
+        # A 1-bit read keeps the socket warm and notices drops between gate events
+        result = self._request("heartbeat", lambda: self.client.read_discrete_inputs(self.INPUT_BLOCK_START, 1, self.unit_id),
+                               probe=True)
+        return result is not None and not result.isError()
+    
+    def get_link_status(self) -> Dict:
+        """Connection health, circuit state and request metrics"""
+        return {"host": self.host, "port": self.port, **self.supervisor.status()}
     
     # Gate Control Methods
     
-    def open_gate1(self) -> bool:
+    def open_gate(self, open_coil: int, light_register: Optional[int] = None, label: str = "gate") -> bool:
         """
-        Open entry gate (Gate 1)
+        Open a gate by pulsing its open coil
         
+        Args:
+            open_coil: Coil address of the open command
+            light_register: Traffic light holding register to set green
+            label: Gate name for logging
+            
         Returns:
             bool: True if command sent successfully
         """
@@ -117,29 +213,38 @@ class PLCController:
             if not self._ensure_connected():
                 return False
             
-            logger.info("[PLC] Opening Gate 1 (Entry)")
+            logger.info(f"[PLC] Opening {label}")
             
             # Set open coil to True
-            result = self.client.write_coil(self.GATE1_OPEN_COIL, True, self.unit_id)
+            result = self._request("write_coil", lambda: self.client.write_coil(open_coil, True, self.unit_id))
             
-            if result.isError():
-                logger.error(f"[PLC] Failed to open Gate 1: {result}")
+            if result is None or result.isError():
+                logger.error(f"[PLC] Failed to open {label}: {result}")
                 return False
             
+            # Gate is about to move; don't serve stale positions
+            self.invalidate_status()
+            
             # Set traffic light to green
-            self.set_entry_light_green()
+            if light_register is not None:
+                self.set_light(light_register, 1)
             
-            logger.info("[PLC] Gate 1 open command sent")
+            logger.info(f"[PLC] {label} open command sent")
             return True
             
         except Exception as e:
-            logger.error(f"[PLC] Error opening Gate 1: {str(e)}")
+            logger.error(f"[PLC] Error opening {label}: {str(e)}")
             return False
     
-    def close_gate1(self) -> bool:
+    def close_gate(self, close_coil: int, light_register: Optional[int] = None, label: str = "gate") -> bool:
         """
-        Close entry gate (Gate 1)
+        Close a gate by pulsing its close coil
         
+        Args:
+            close_coil: Coil address of the close command
+            light_register: Traffic light holding register to set red
+            label: Gate name for logging
+            
         Returns:
             bool: True if command sent successfully
         """
@@ -147,248 +252,207 @@ class PLCController:
             if not self._ensure_connected():
                 return False
             
-            logger.info("[PLC] Closing Gate 1 (Entry)")
+            logger.info(f"[PLC] Closing {label}")
             
             # Set close coil to True
-            result = self.client.write_coil(self.GATE1_CLOSE_COIL, True, self.unit_id)
+            result = self._request("write_coil", lambda: self.client.write_coil(close_coil, True, self.unit_id))
             
-            if result.isError():
-                logger.error(f"[PLC] Failed to close Gate 1: {result}")
+            if result is None or result.isError():
+                logger.error(f"[PLC] Failed to close {label}: {result}")
                 return False
             
+            # Gate is about to move; don't serve stale positions
+            self.invalidate_status()
+            
             # Set traffic light to red
-            self.set_entry_light_red()
+            if light_register is not None:
+                self.set_light(light_register, 0)
             
-            logger.info("[PLC] Gate 1 close command sent")
+            logger.info(f"[PLC] {label} close command sent")
             return True
             
         except Exception as e:
-            logger.error(f"[PLC] Error closing Gate 1: {str(e)}")
+            logger.error(f"[PLC] Error closing {label}: {str(e)}")
             return False
     
+    def open_gate1(self) -> bool:
+        """Open entry gate (Gate 1)"""
+        return self.open_gate(self.GATE1_OPEN_COIL, self.ENTRY_TRAFFIC_LIGHT, "Gate 1 (Entry)")
+    
+    def close_gate1(self) -> bool:
+        """Close entry gate (Gate 1)"""
+        return self.close_gate(self.GATE1_CLOSE_COIL, self.ENTRY_TRAFFIC_LIGHT, "Gate 1 (Entry)")
+    
     def open_gate2(self) -> bool:
+        """Open exit gate (Gate 2)"""
+        return self.open_gate(self.GATE2_OPEN_COIL, self.EXIT_TRAFFIC_LIGHT, "Gate 2 (Exit)")
+    
+    def close_gate2(self) -> bool:
+        """Close exit gate (Gate 2)"""
+        return self.close_gate(self.GATE2_CLOSE_COIL, self.EXIT_TRAFFIC_LIGHT, "Gate 2 (Exit)")
+    
+    # Status Snapshot
+    
+    def read_status(self, max_age: Optional[float] = None) -> Optional["PLCStatusSnapshot"]:
         """
-        Open exit gate (Gate 2)
+        Get a status snapshot of all gate and sensor inputs
+        
+        The whole discrete-input block is read in a single request and
+        reused until it is older than max_age.
         
+        Args:
+            max_age: Maximum snapshot age in seconds (default: status_max_age)
+            
         Returns:
-            bool: True if command sent successfully
+            PLCStatusSnapshot, or None if the PLC could not be read
         """
-        try:
-            if not self._ensure_connected():
-                return False
-            
-            logger.info("[PLC] Opening Gate 2 (Exit)")
-            
-            # Set open coil to True
-            result = self.client.write_coil(self.GATE2_OPEN_COIL, True, self.unit_id)
-            
-            if result.isError():
-                logger.error(f"[PLC] Failed to open Gate 2: {result}")
-                return False
-            
-            # Set traffic light to green
-            self.set_exit_light_green()
-            
-            logger.info("[PLC] Gate 2 open command sent")
-            return True
-            
-        except Exception as e:
-            logger.error(f"[PLC] Error opening Gate 2: {str(e)}")
-            return False
+        if max_age is None:
+            max_age = self.status_max_age
+        
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.age() <= max_age:
+                return snapshot
+            
+            try:
+                if not self._ensure_connected():
+                    return None
+                
+                result = self._request("read_discrete_inputs", lambda: self.client.read_discrete_inputs(self.INPUT_BLOCK_START, self.INPUT_BLOCK_COUNT, self.unit_id))
+                
+                if result is None or result.isError():
+                    logger.error(f"[PLC] Failed to read input block: {result}")
+                    return None
+                
+                self._snapshot = PLCStatusSnapshot(
+                    inputs=list(result.bits[:self.INPUT_BLOCK_COUNT]),
+                    input_start=self.INPUT_BLOCK_START,
+                    read_at=time.monotonic()
+                )
+                return self._snapshot
+                
+            except Exception as e:
+                logger.error(f"[PLC] Error reading input block: {str(e)}")
+                return None
     
-    def close_gate2(self) -> bool:
+    def read_outputs(self) -> Optional[Dict]:
         """
-        Close exit gate (Gate 2)
+        Read the command coil block and traffic light register block
         
         Returns:
-            bool: True if command sent successfully
+            dict: {"coils": [...], "registers": [...]} or None on failure
         """
         try:
             if not self._ensure_connected():
-                return False
+                return None
             
-            logger.info("[PLC] Closing Gate 2 (Exit)")
+            coils = self._request("read_coils", lambda: self.client.read_coils(self.COIL_BLOCK_START, self.COIL_BLOCK_COUNT, self.unit_id))
+            registers = self._request("read_holding_registers", lambda: self.client.read_holding_registers(self.HOLDING_BLOCK_START, self.HOLDING_BLOCK_COUNT, self.unit_id))
             
-            # Set close coil to True
-            result = self.client.write_coil(self.GATE2_CLOSE_COIL, True, self.unit_id)
-            
-            if result.isError():
-                logger.error(f"[PLC] Failed to close Gate 2: {result}")
-                return False
+            if coils is None or registers is None or coils.isError() or registers.isError():
+                logger.error(f"[PLC] Failed to read output blocks: {coils} / {registers}")
+                return None
             
-            # Set traffic light to red
-            self.set_exit_light_red()
-            
-            logger.info("[PLC] Gate 2 close command sent")
-            return True
+            return {
+                "coils": list(coils.bits[:self.COIL_BLOCK_COUNT]),
+                "registers": list(registers.registers[:self.HOLDING_BLOCK_COUNT]),
+            }
             
         except Exception as e:
-            logger.error(f"[PLC] Error closing Gate 2: {str(e)}")
+            logger.error(f"[PLC] Error reading output blocks: {str(e)}")
+            return None
+    
+    def invalidate_status(self):
+        """Drop the cached snapshot so the next read goes to the PLC"""
+        self._snapshot = None
+    
+    def apply_snapshot(self, snapshot: "PLCStatusSnapshot"):
+        """Store a snapshot read elsewhere (e.g. by the background poller)"""
+        self._snapshot = snapshot
+    
+    def read_input(self, address: int) -> bool:
+        """Value of a discrete input from the status snapshot (False if unreadable)"""
+        snapshot = self.read_status()
+        if snapshot is None:
             return False
+        return snapshot.input(address)
+    
+    def watch_addresses(self, inputs: List[int] = (), coils: List[int] = (), registers: List[int] = ()):
+        """
+        Size the block reads to the addresses actually wired to this PLC
+        
+        Used when lanes from config map gates outside the default memory map.
+        Call before the poller starts.
+        """
+        def span(start: int, count: int, addresses) -> tuple:
+            addresses = list(addresses)
+            if not addresses:
+                return start, count
+            return min(addresses), max(addresses) - min(addresses) + 1
+        
+        self.INPUT_BLOCK_START, self.INPUT_BLOCK_COUNT = span(self.INPUT_BLOCK_START, self.INPUT_BLOCK_COUNT, inputs)
+        self.COIL_BLOCK_START, self.COIL_BLOCK_COUNT = span(self.COIL_BLOCK_START, self.COIL_BLOCK_COUNT, coils)
+        self.HOLDING_BLOCK_START, self.HOLDING_BLOCK_COUNT = span(self.HOLDING_BLOCK_START, self.HOLDING_BLOCK_COUNT, registers)
+        self.invalidate_status()
     
     # Status Check Methods
     
     def is_gate1_fully_open(self) -> bool:
         """Check if Gate 1 is fully open"""
-        try:
-            if not self._ensure_connected():
-                return False
-            
-            result = self.client.read_discrete_inputs(self.GATE1_OPEN_STATUS, 1, self.unit_id)
-            
-            if result.isError():
-                logger.error(f"[PLC] Failed to read Gate 1 open status: {result}")
-                return False
-            
-            return result.bits[0]
-            
-        except Exception as e:
-            logger.error(f"[PLC] Error reading Gate 1 status: {str(e)}")
-            return False
+        return self.read_input(self.GATE1_OPEN_STATUS)
     
     def is_gate1_fully_closed(self) -> bool:
         """Check if Gate 1 is fully closed"""
-        try:
-            if not self._ensure_connected():
-                return False
-            
-            result = self.client.read_discrete_inputs(self.GATE1_CLOSED_STATUS, 1, self.unit_id)
-            
-            if result.isError():
-                logger.error(f"[PLC] Failed to read Gate 1 closed status: {result}")
-                return False
-            
-            return result.bits[0]
-            
-        except Exception as e:
-            logger.error(f"[PLC] Error reading Gate 1 status: {str(e)}")
-            return False
+        return self.read_input(self.GATE1_CLOSED_STATUS)
     
     def is_gate2_fully_open(self) -> bool:
         """Check if Gate 2 is fully open"""
-        try:
-            if not self._ensure_connected():
-                return False
-            
-            result = self.client.read_discrete_inputs(self.GATE2_OPEN_STATUS, 1, self.unit_id)
-            
-            if result.isError():
-                logger.error(f"[PLC] Failed to read Gate 2 open status: {result}")
-                return False
-            
-            return result.bits[0]
-            
-        except Exception as e:
-            logger.error(f"[PLC] Error reading Gate 2 status: {str(e)}")
-            return False
+        return self.read_input(self.GATE2_OPEN_STATUS)
     
     def is_gate2_fully_closed(self) -> bool:
         """Check if Gate 2 is fully closed"""
-        try:
-            if not self._ensure_connected():
-                return False
-            
-            result = self.client.read_discrete_inputs(self.GATE2_CLOSED_STATUS, 1, self.unit_id)
-            
-            if result.isError():
-                logger.error(f"[PLC] Failed to read Gate 2 closed status: {result}")
-                return False
-            
-            return result.bits[0]
-            
-        except Exception as e:
-            logger.error(f"[PLC] Error reading Gate 2 status: {str(e)}")
-            return False
+        return self.read_input(self.GATE2_CLOSED_STATUS)
     
     # Vehicle Detection Methods
     
     def is_vehicle_at_entry(self) -> bool:
         """Check if vehicle is detected at entry sensor"""
-        try:
-            if not self._ensure_connected():
-                return False
-            
-            result = self.client.read_discrete_inputs(self.VEHICLE_AT_ENTRY, 1, self.unit_id)
-            
-            if result.isError():
-                return False
-            
-            return result.bits[0]
-            
-        except Exception as e:
-            logger.error(f"[PLC] Error reading entry sensor: {str(e)}")
-            return False
+        return self.read_input(self.VEHICLE_AT_ENTRY)
     
     def is_vehicle_at_exit(self) -> bool:
         """Check if vehicle is detected at exit sensor"""
-        try:
-            if not self._ensure_connected():
-                return False
-            
-            result = self.client.read_discrete_inputs(self.VEHICLE_AT_EXIT, 1, self.unit_id)
-            
-            if result.isError():
-                return False
-            
-            return result.bits[0]
-            
-        except Exception as e:
-            logger.error(f"[PLC] Error reading exit sensor: {str(e)}")
-            return False
+        return self.read_input(self.VEHICLE_AT_EXIT)
     
     # Traffic Light Control
     
-    def set_entry_light_green(self) -> bool:
-        """Set entry traffic light to green"""
+    def set_light(self, register: int, value: int) -> bool:
+        """Set a traffic light register (0=Red, 1=Green)"""
         try:
             if not self._ensure_connected():
                 return False
             
-            result = self.client.write_register(self.ENTRY_TRAFFIC_LIGHT, 1, self.unit_id)
-            return not result.isError()
+            result = self._request("write_register", lambda: self.client.write_register(register, value, self.unit_id))
+            return result is not None and not result.isError()
             
         except Exception as e:
-            logger.error(f"[PLC] Error setting entry light: {str(e)}")
+            logger.error(f"[PLC] Error setting traffic light {register}: {str(e)}")
             return False
     
+    def set_entry_light_green(self) -> bool:
+        """Set entry traffic light to green"""
+        return self.set_light(self.ENTRY_TRAFFIC_LIGHT, 1)
+    
     def set_entry_light_red(self) -> bool:
         """Set entry traffic light to red"""
-        try:
-            if not self._ensure_connected():
-                return False
-            
-            result = self.client.write_register(self.ENTRY_TRAFFIC_LIGHT, 0, self.unit_id)
-            return not result.isError()
-            
-        except Exception as e:
-            logger.error(f"[PLC] Error setting entry light: {str(e)}")
-            return False
+        return self.set_light(self.ENTRY_TRAFFIC_LIGHT, 0)
     
     def set_exit_light_green(self) -> bool:
         """Set exit traffic light to green"""
-        try:
-            if not self._ensure_connected():
-                return False
-            
-            result = self.client.write_register(self.EXIT_TRAFFIC_LIGHT, 1, self.unit_id)
-            return not result.isError()
-            
-        except Exception as e:
-            logger.error(f"[PLC] Error setting exit light: {str(e)}")
-            return False
+        return self.set_light(self.EXIT_TRAFFIC_LIGHT, 1)
     
     def set_exit_light_red(self) -> bool:
         """Set exit traffic light to red"""
-        try:
-            if not self._ensure_connected():
-                return False
-            
-            result = self.client.write_register(self.EXIT_TRAFFIC_LIGHT, 0, self.unit_id)
-            return not result.isError()
-            
-        except Exception as e:
-            logger.error(f"[PLC] Error setting exit light: {str(e)}")
-            return False
+        return self.set_light(self.EXIT_TRAFFIC_LIGHT, 0)
     
     # High-level Gate Operations
     
@@ -396,6 +460,9 @@ class PLCController:
         """
         Wait for Gate 1 to fully open
         
+        Blocking; intended for scripts. Async code should await
+        PLCPoller.wait_for_input instead.
+        
         Args:
             timeout: Maximum wait time in seconds
             
@@ -416,6 +483,9 @@ class PLCController:
         """
         Wait for Gate 2 to fully open
         
+        Blocking; intended for scripts. Async code should await
+        PLCPoller.wait_for_input instead.
+        
         Args:
             timeout: Maximum wait time in seconds
             
@@ -436,39 +506,79 @@ class PLCController:
         """
         Get comprehensive system status
         
+        Served from a single input-block read.
+        
         Returns:
             dict: System status information
         """
+        snapshot = self.read_status()
+        
+        def bit(address: int) -> bool:
+            return snapshot.input(address) if snapshot else False
+        
         return {
             "plc_connected": self.connected,
+            "snapshot_age_ms": round(snapshot.age() * 1000, 1) if snapshot else None,
             "gate1": {
-                "fully_open": self.is_gate1_fully_open(),
-                "fully_closed": self.is_gate1_fully_closed(),
+                "fully_open": bit(self.GATE1_OPEN_STATUS),
+                "fully_closed": bit(self.GATE1_CLOSED_STATUS),
             },
             "gate2": {
-                "fully_open": self.is_gate2_fully_open(),
-                "fully_closed": self.is_gate2_fully_closed(),
+                "fully_open": bit(self.GATE2_OPEN_STATUS),
+                "fully_closed": bit(self.GATE2_CLOSED_STATUS),
             },
             "sensors": {
-                "vehicle_at_entry": self.is_vehicle_at_entry(),
-                "vehicle_at_exit": self.is_vehicle_at_exit(),
+                "vehicle_at_entry": bit(self.VEHICLE_AT_ENTRY),
+                "vehicle_at_exit": bit(self.VEHICLE_AT_EXIT),
             }
         }
 
 
-# Global PLC controller instance
-_plc_controller: Optional[PLCController] = None
+# Global PLC controller instances, keyed by PLC name from config
+# ("default" is the top-level "plc" section, others come from "plcs")
+DEFAULT_PLC = "default"
+_plc_controllers: Dict[str, PLCController] = {}
 
 
-def get_plc_controller() -> PLCController:
+def plc_settings(config: Dict) -> Dict[str, Dict]:
+    """Connection settings for every PLC in the config"""
+    plcs = {DEFAULT_PLC: config.get("plc", {})}
+    plcs.update(config.get("plcs", {}))
+    return plcs
+
+
+def get_plc_controller(name: str = DEFAULT_PLC) -> PLCController:
     """
-    Get or create global PLC controller instance
+    Get or create a global PLC controller instance
+    
+    Args:
+        name: PLC name from config (default: the top-level "plc" section)
     
     Returns:
         PLCController: Global PLC controller
     """
-    global _plc_controller
-    if _plc_controller is None:
-        _plc_controller = PLCController()
-        _plc_controller.connect()
-    return _plc_controller
+    controller = _plc_controllers.get(name)
+    if controller is None:
+        config = load_plc_config()
+        settings = plc_settings(config)
+        if name not in settings:
+            raise KeyError(f"Unknown PLC: {name}")
+        plc = settings[name]
+        safety = config.get("safety", {})
+        controller = PLCController(
+            host=plc.get("host", "192.168.1.110"),
+            port=plc.get("port", 502),
+            unit_id=plc.get("unit_id", 1),
+            heartbeat_interval=safety.get("heartbeat_interval_seconds", 5)
+        )
+        _plc_controllers[name] = controller
+        controller.connect()
+        controller.supervisor.start_heartbeat()
+    return controller
+
+
+def get_plc_link_status() -> Optional[Dict]:
+    """Link status of every created controller, or None if none were created"""
+    if not _plc_controllers:
+        return None
+    return {name: plc.get_link_status() for name, plc in _plc_controllers.items()}
@@ -0,0 +1,253 @@
+"""
+PLC Poller Service
+Scans the PLC input block in the background and publishes edge events
+
+A single asyncio task owns the async Modbus connection and reads the
+discrete-input block at a fixed rate. Changes are published as PLCEvent
+objects to subscriber queues, and gate workflows can await a specific
+input level instead of sleeping in polling loops.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from .plc_controller import DEFAULT_PLC, PLCController, PLCStatusSnapshot, get_plc_controller
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PLCEvent:
+    """Edge on a PLC discrete input"""
+    name: str
+    address: int
+    value: bool
+    timestamp: float = field(default_factory=time.time)
+
+
+def default_edge_names(plc: PLCController) -> Dict[int, Tuple[Optional[str], Optional[str]]]:
+    """
+    Event names for the documented memory map
+
+    Returns:
+        {address: (rising_edge_name, falling_edge_name)}
+    """
+    return {
+        plc.GATE1_OPEN_STATUS: ("gate1_opened", None),
+        plc.GATE2_OPEN_STATUS: ("gate2_opened", None),
+        plc.GATE1_CLOSED_STATUS: ("gate1_closed", None),
+        plc.GATE2_CLOSED_STATUS: ("gate2_closed", None),
+        plc.VEHICLE_AT_ENTRY: ("vehicle_arrived_entry", "vehicle_left_entry"),
+        plc.VEHICLE_AT_EXIT: ("vehicle_arrived_exit", "vehicle_left_exit"),
+    }
+
+
+class PLCPoller:
+    """
+    Background scanner for the PLC discrete-input block
+
+    Usage:
+        poller = get_plc_poller()
+        await poller.start()
+        await poller.wait_for_input(plc.VEHICLE_AT_ENTRY, True, timeout=30)
+    """
+
+    def __init__(self, plc: PLCController, scan_interval: float = 0.05,
+                 subscriber_queue_size: int = 100):
+        """
+        Args:
+            plc: Controller whose connection settings and address map are used.
+                 Each scan also refreshes its status snapshot.
+            scan_interval: Seconds between input block reads
+            subscriber_queue_size: Events buffered per subscriber before the
+                                   oldest are dropped
+        """
+        self.plc = plc
+        self.scan_interval = scan_interval
+        self.subscriber_queue_size = subscriber_queue_size
+        self.edge_names = default_edge_names(plc)
+
+        self.client = None
+        self.bits: Optional[List[bool]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._changed = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the scan loop (no-op if already running)"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name="plc-poller")
+        logger.info(f"[PLC Poller] Started, scanning every {self.scan_interval * 1000:.0f}ms")
+
+    async def stop(self):
+        """Stop the scan loop and close the connection"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.client:
+            self.client.close()
+            self.client = None
+        logger.info("[PLC Poller] Stopped")
+
+    # Subscriptions
+
+    def subscribe(self) -> asyncio.Queue:
+        """Get a queue that receives every PLCEvent from now on"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def input(self, address: int) -> Optional[bool]:
+        """Last scanned value of an input, or None before the first scan"""
+        if self.bits is None:
+            return None
+        return self.bits[address - self.plc.INPUT_BLOCK_START]
+
+    async def wait_for_input(self, address: int, value: bool, timeout: float) -> bool:
+        """
+        Wait until an input reaches a level
+
+        Level-triggered, so it returns immediately if the input already
+        has the requested value.
+
+        Returns:
+            bool: True if the level was reached within timeout
+        """
+        deadline = time.monotonic() + timeout
+        while self.input(address) is not value:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            changed = self._changed
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return self.input(address) is value
+        return True
+
+    # Scan loop
+
+    async def _connect(self) -> bool:
+        from pymodbus.client import AsyncModbusTcpClient
+
+        if self.client is None:
+            self.client = AsyncModbusTcpClient(
+                host=self.plc.host,
+                port=self.plc.port,
+                timeout=1,
+                retries=0
+            )
+        if not self.client.connected:
+            await self.client.connect()
+        return self.client.connected
+
+    async def _scan(self) -> Optional[List[bool]]:
+        # Share link health with the controller: back off while its circuit is open
+        supervisor = self.plc.supervisor
+        if not supervisor.allow_request(probe=True):
+            return None
+        started = time.monotonic()
+        try:
+            if not await self._connect():
+                supervisor.record_failure("poller connect failed")
+                return None
+            result = await self.client.read_discrete_inputs(
+                self.plc.INPUT_BLOCK_START, self.plc.INPUT_BLOCK_COUNT, slave=self.plc.unit_id
+            )
+        except Exception as e:
+            supervisor.record_failure(str(e))
+            raise
+        if result.isError():
+            supervisor.record_failure(str(result))
+            logger.error(f"[PLC Poller] Failed to read input block: {result}")
+            return None
+        supervisor.record_success((time.monotonic() - started) * 1000)
+        return [bool(b) for b in result.bits[:self.plc.INPUT_BLOCK_COUNT]]
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                bits = await self._scan()
+                if bits is not None:
+                    self._apply(bits)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[PLC Poller] Scan error: {str(e)}")
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(max(self.scan_interval - elapsed, 0))
+
+    def _apply(self, bits: List[bool]):
+        previous = self.bits
+        self.bits = bits
+        self.plc.apply_snapshot(PLCStatusSnapshot(inputs=bits, input_start=self.plc.INPUT_BLOCK_START))
+
+        if previous is None or previous == bits:
+            if previous is None:
+                self._notify_changed()
+            return
+
+        for offset, (old, new) in enumerate(zip(previous, bits)):
+            if old == new:
+                continue
+            address = self.plc.INPUT_BLOCK_START + offset
+            rising, falling = self.edge_names.get(address, (None, None))
+            name = rising if new else falling
+            if name:
+                self._publish(PLCEvent(name=name, address=address, value=new))
+        self._notify_changed()
+
+    def _notify_changed(self):
+        # Wake current waiters and arm a fresh event for the next change
+        changed = self._changed
+        self._changed = asyncio.Event()
+        changed.set()
+
+    def _publish(self, event: PLCEvent):
+        logger.info(f"[PLC Poller] {event.name}")
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+# Global PLC poller instances, one per PLC name
+_plc_pollers: Dict[str, PLCPoller] = {}
+
+
+def get_plc_poller(name: str = DEFAULT_PLC) -> PLCPoller:
+    """
+    Get or create the global poller for a PLC
+    
+    Args:
+        name: PLC name from config (default: the top-level "plc" section)
+    
+    Returns:
+        PLCPoller: Global PLC poller (call start() before awaiting inputs)
+    """
+    poller = _plc_pollers.get(name)
+    if poller is None:
+        poller = _plc_pollers[name] = PLCPoller(get_plc_controller(name))
+    return poller
+
+
+async def shutdown_plc_poller():
+    """Stop every poller that was started"""
+    for poller in _plc_pollers.values():
+        await poller.stop()
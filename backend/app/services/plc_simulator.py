@@ -0,0 +1,287 @@
+"""
+PLC Simulator Service
+Modbus TCP server that behaves like the gate PLC, for load and integration tests
+
+The simulator serves the same memory map as the site PLC (coils for open/
+close commands, discrete inputs for gate limit switches and vehicle
+sensors, holding registers for traffic lights) and moves the gates in
+simulated time:
+
+- Gate motion: an open/close coil starts the barrier moving; the limit
+  switch input turns on after `travel_time` seconds. Coils are cleared once
+  the command is taken, like a latching PLC program.
+- Vehicles: arrive() queues a vehicle at a lane. The head of the queue pulls
+  up to the sensor, waits for the gate to be fully open, then takes
+  `pass_time` seconds to drive through. The next vehicle pulls up `headway`
+  seconds later.
+- Safety loop: a close command while a vehicle is passing reverses the
+  barrier back up (counted in `safety_reversals`).
+
+Each vehicle records when it arrived, reached the sensor, saw the gate
+open and cleared the lane, so a harness can compute throughput and
+latency (see scripts/simulate_lanes.py).
+
+Requires pymodbus (requirements_hardware.txt).
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .lanes import Lane
+
+logger = logging.getLogger(__name__)
+
+# pymodbus function codes used to address each table
+FC_COILS = 1
+FC_DISCRETE_INPUTS = 2
+FC_HOLDING_REGISTERS = 3
+
+
+@dataclass
+class SimVehicle:
+    """One simulated vehicle and its timeline (time.monotonic seconds)"""
+    vehicle_id: int
+    lane_id: str
+    plate_number: str
+    arrived_at: float
+    at_sensor_at: Optional[float] = None
+    gate_open_at: Optional[float] = None
+    cleared_at: Optional[float] = None
+
+    @property
+    def wait_time(self) -> Optional[float]:
+        """Queueing before reaching the sensor"""
+        return None if self.at_sensor_at is None else self.at_sensor_at - self.arrived_at
+
+    @property
+    def service_time(self) -> Optional[float]:
+        """Sensor to gate fully open (OCR, decision, gate travel)"""
+        return None if self.gate_open_at is None else self.gate_open_at - self.at_sensor_at
+
+    @property
+    def total_time(self) -> Optional[float]:
+        return None if self.cleared_at is None else self.cleared_at - self.arrived_at
+
+
+@dataclass
+class SimulatedLane:
+    """Barrier and vehicle sensor physics for one lane"""
+    lane: Lane
+    travel_time: float
+    pass_time: float
+    headway: float
+    position: float = 0.0  # 0 = fully closed, 1 = fully open
+    motion: int = 0        # +1 opening, -1 closing
+    queue: deque = field(default_factory=deque)
+    current: Optional[SimVehicle] = None
+    passing_until: Optional[float] = None
+    next_pull_up_at: float = 0.0
+    completed: List[SimVehicle] = field(default_factory=list)
+    gate_cycles: int = 0
+    safety_reversals: int = 0  # safety loop reopened the barrier onto a passing vehicle
+
+
+class PLCSimulator:
+    """
+    Simulated PLC for the lanes wired to one controller
+
+    Usage:
+        sim = PLCSimulator(registry.lanes.values(), port=5020)
+        await sim.start()
+        sim.arrive("entry")
+        ...
+        await sim.stop()
+    """
+
+    def __init__(self, lanes, host: str = "127.0.0.1", port: int = 5020, unit_id: int = 1,
+                 travel_time: float = 3.0, pass_time: float = 2.0, headway: float = 1.0,
+                 tick: float = 0.02):
+        """
+        Args:
+            lanes: Lanes served by this PLC
+            host: Address to listen on
+            port: Modbus TCP port
+            unit_id: Modbus unit/slave ID the lanes' controller uses
+            travel_time: Seconds for a barrier to go fully open or fully closed
+            pass_time: Seconds a vehicle occupies the sensor once the gate is open
+            headway: Seconds between one vehicle clearing and the next pulling up
+            tick: Simulation step in seconds
+        """
+        self.host = host
+        self.port = port
+        self.unit_id = unit_id
+        self.tick = tick
+        self.lanes: Dict[str, SimulatedLane] = {
+            lane.lane_id: SimulatedLane(lane, travel_time, pass_time, headway) for lane in lanes
+        }
+        self._next_vehicle_id = 1
+        self._server = None
+        self._tasks: List[asyncio.Task] = []
+        self.context = None
+
+    # Modbus server
+
+    def _build_context(self):
+        from pymodbus.datastore import ModbusSequentialDataBlock, ModbusServerContext, ModbusSlaveContext
+
+        addresses = [a for sim in self.lanes.values() for a in (
+            sim.lane.open_coil, sim.lane.close_coil, sim.lane.open_status, sim.lane.closed_status,
+            sim.lane.vehicle_sensor, sim.lane.traffic_light or 0)]
+        size = max(addresses, default=0) + 1
+        slave = ModbusSlaveContext(
+            di=ModbusSequentialDataBlock(0, [0] * size),
+            co=ModbusSequentialDataBlock(0, [0] * size),
+            hr=ModbusSequentialDataBlock(0, [0] * size),
+            ir=ModbusSequentialDataBlock(0, [0] * size),
+            zero_mode=True
+        )
+        return ModbusServerContext(slaves={self.unit_id: slave}, single=False)
+
+    def _get(self, fc: int, address: int) -> int:
+        return self.context[self.unit_id].getValues(fc, address, 1)[0]
+
+    def _set(self, fc: int, address: int, value):
+        self.context[self.unit_id].setValues(fc, address, [value])
+
+    async def start(self):
+        """Start the Modbus server and the physics loop"""
+        from pymodbus.server import ModbusTcpServer
+
+        self.context = self._build_context()
+        for sim in self.lanes.values():
+            self._set(FC_DISCRETE_INPUTS, sim.lane.closed_status, True)
+        self._server = ModbusTcpServer(self.context, address=(self.host, self.port))
+        self._tasks = [
+            asyncio.create_task(self._server.serve_forever(), name=f"plc-sim-{self.port}"),
+            asyncio.create_task(self._run(), name=f"plc-sim-physics-{self.port}"),
+        ]
+        # Give the listener a moment to bind before clients connect
+        await asyncio.sleep(0.1)
+        logger.info(f"[PLC Simulator] Serving {len(self.lanes)} lanes on {self.host}:{self.port} unit {self.unit_id}")
+
+    async def stop(self):
+        if self._server is not None:
+            await self._server.shutdown()
+            self._server = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # Vehicles
+
+    def arrive(self, lane_id: str, plate_number: Optional[str] = None) -> SimVehicle:
+        """Queue a vehicle at a lane"""
+        vehicle_id = self._next_vehicle_id
+        self._next_vehicle_id += 1
+        vehicle = SimVehicle(
+            vehicle_id=vehicle_id,
+            lane_id=lane_id,
+            plate_number=plate_number or f"WP-CAB-{vehicle_id % 10000:04d}",
+            arrived_at=time.monotonic()
+        )
+        self.lanes[lane_id].queue.append(vehicle)
+        return vehicle
+
+    def vehicle_at_sensor(self, lane_id: str) -> Optional[SimVehicle]:
+        """Vehicle currently on the lane sensor (what the lane camera would see)"""
+        return self.lanes[lane_id].current
+
+    # Physics
+
+    async def _run(self):
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(self.tick)
+            now = time.monotonic()
+            for sim in self.lanes.values():
+                self._step(sim, now, now - last)
+            last = now
+
+    def _step(self, sim: SimulatedLane, now: float, dt: float):
+        lane = sim.lane
+
+        # Take latched commands
+        if self._get(FC_COILS, lane.open_coil):
+            self._set(FC_COILS, lane.open_coil, False)
+            if sim.motion != 1 and sim.position < 1:
+                sim.gate_cycles += 1
+            sim.motion = 1
+        if self._get(FC_COILS, lane.close_coil):
+            self._set(FC_COILS, lane.close_coil, False)
+            sim.motion = -1
+
+        # Move the barrier
+        if sim.motion:
+            sim.position = min(max(sim.position + sim.motion * dt / sim.travel_time, 0.0), 1.0)
+            if sim.position in (0.0, 1.0):
+                sim.motion = 0
+        fully_open = sim.position >= 1.0
+        self._set(FC_DISCRETE_INPUTS, lane.open_status, fully_open)
+        self._set(FC_DISCRETE_INPUTS, lane.closed_status, sim.position <= 0.0)
+
+        # Vehicles
+        if sim.current is None and sim.queue and now >= sim.next_pull_up_at:
+            sim.current = sim.queue.popleft()
+            sim.current.at_sensor_at = now
+            self._set(FC_DISCRETE_INPUTS, lane.vehicle_sensor, True)
+
+        vehicle = sim.current
+        if vehicle is None:
+            return
+        if sim.passing_until is None:
+            # Drivers only go once the barrier is fully up and not already coming down
+            if fully_open and sim.motion != -1:
+                vehicle.gate_open_at = now
+                sim.passing_until = now + sim.pass_time
+        else:
+            if sim.motion == -1:
+                sim.safety_reversals += 1
+                logger.warning(f"[PLC Simulator] {lane.lane_id}: barrier closing on vehicle {vehicle.plate_number}, reversing")
+                sim.motion = 1
+            if now >= sim.passing_until:
+                vehicle.cleared_at = now
+                sim.completed.append(vehicle)
+                sim.current = None
+                sim.passing_until = None
+                sim.next_pull_up_at = now + sim.headway
+                self._set(FC_DISCRETE_INPUTS, lane.vehicle_sensor, False)
+
+    def stats(self) -> Dict:
+        return {
+            lane_id: {
+                "completed": len(sim.completed),
+                "queued": len(sim.queue) + (1 if sim.current else 0),
+                "gate_cycles": sim.gate_cycles,
+                "safety_reversals": sim.safety_reversals,
+            }
+            for lane_id, sim in self.lanes.items()
+        }
+
+
+def arrival_times(rate_per_minute: float, duration: float, poisson: bool = True,
+                  seed: Optional[int] = None) -> List[float]:
+    """
+    Arrival offsets (seconds from start) for a traffic pattern
+
+    Args:
+        rate_per_minute: Mean vehicles per minute
+        duration: Length of the pattern in seconds
+        poisson: Exponential gaps (random traffic) instead of even spacing
+        seed: Random seed for repeatable runs
+    """
+    if rate_per_minute <= 0:
+        return []
+    rng = random.Random(seed)
+    mean_gap = 60.0 / rate_per_minute
+    times, t = [], 0.0
+    while True:
+        t += rng.expovariate(1 / mean_gap) if poisson else mean_gap
+        if t >= duration:
+            return times
+        times.append(t)
@@ -0,0 +1,270 @@
+"""
+PLC Connection Supervisor
+Heartbeat, exponential backoff and circuit breaking for the Modbus link
+
+While the PLC is reachable every request goes straight through. After
+`failure_threshold` consecutive link failures the circuit opens and
+requests fail immediately instead of waiting on socket timeouts. Once the
+backoff delay has passed a single trial request (or heartbeat) is let
+through; success closes the circuit, failure re-opens it with a doubled
+delay up to `backoff_max`.
+
+The "rejected" metric counts real requests (gate commands, reads) turned
+away by the open circuit. Probes (the heartbeat and the poller's block
+scans) pass probe=True: they are held back the same way but not counted,
+so the metric does not just measure polling frequency.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class PLCMetrics:
+    """Counters and latency histogram for PLC traffic"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.reconnects = 0
+        self.reconnect_failures = 0
+        self.circuit_opens = 0
+        self.heartbeats = 0
+        self.latency_count = 0
+        self.latency_total_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.latency_last_ms = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def observe_latency(self, latency_ms: float):
+        with self._lock:
+            self.latency_count += 1
+            self.latency_total_ms += latency_ms
+            self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+            self.latency_last_ms = latency_ms
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if latency_ms <= bound:
+                    self.latency_buckets[i] += 1
+                    break
+            else:
+                self.latency_buckets[-1] += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            buckets = {f"le_{bound}ms": count for bound, count in zip(LATENCY_BUCKETS_MS, self.latency_buckets)}
+            buckets["le_inf"] = self.latency_buckets[-1]
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "reconnects": self.reconnects,
+                "reconnect_failures": self.reconnect_failures,
+                "circuit_opens": self.circuit_opens,
+                "heartbeats": self.heartbeats,
+                "latency_ms": {
+                    "count": self.latency_count,
+                    "avg": round(self.latency_total_ms / self.latency_count, 2) if self.latency_count else None,
+                    "max": round(self.latency_max_ms, 2),
+                    "last": round(self.latency_last_ms, 2),
+                    "buckets": buckets,
+                },
+            }
+
+
+class ConnectionSupervisor:
+    """
+    Tracks link health for one PLC connection
+
+    Args:
+        connect: Opens the connection, returns True on success
+        disconnect: Drops the connection so the next call reconnects
+        probe: Cheap request used by the heartbeat, returns True if the PLC answered
+        heartbeat_interval: Seconds between heartbeat probes
+        failure_threshold: Consecutive failures before the circuit opens
+        backoff_initial: First open-circuit delay in seconds
+        backoff_max: Largest open-circuit delay in seconds
+        max_retries: Extra attempts (after a reconnect) for a failed request
+    """
+
+    def __init__(self, connect: Callable[[], bool], disconnect: Callable[[], None],
+                 probe: Optional[Callable[[], bool]] = None,
+                 heartbeat_interval: float = 5, failure_threshold: int = 3,
+                 backoff_initial: float = 1, backoff_max: float = 30, max_retries: int = 1):
+        self._connect = connect
+        self._disconnect = disconnect
+        self._probe = probe
+        self.heartbeat_interval = heartbeat_interval
+        self.failure_threshold = failure_threshold
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.max_retries = max_retries
+
+        self.metrics = PLCMetrics()
+        self.state = CLOSED
+        self.connected = False
+        self.consecutive_failures = 0
+        self.backoff = backoff_initial
+        self.retry_at = 0.0
+        self._lock = threading.RLock()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # Circuit state
+
+    def allow_request(self, probe: bool = False) -> bool:
+        """False while the circuit is open and the backoff delay has not passed"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() < self.retry_at:
+                    if not probe:
+                        self.metrics.incr("rejected")
+                    return False
+                self.state = HALF_OPEN
+                logger.info("[PLC Supervisor] Circuit half-open, trying PLC again")
+            return True
+
+    def record_success(self, latency_ms: Optional[float] = None):
+        with self._lock:
+            self.metrics.incr("requests")
+            if latency_ms is not None:
+                self.metrics.observe_latency(latency_ms)
+            if self.state != CLOSED:
+                logger.info("[PLC Supervisor] PLC reachable again, circuit closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.backoff = self.backoff_initial
+
+    def record_failure(self, error: Optional[str] = None):
+        with self._lock:
+            self.metrics.incr("requests")
+            self.metrics.incr("failures")
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._open_circuit(error)
+
+    def _open_circuit(self, error: Optional[str]):
+        if self.state != OPEN:
+            self.metrics.incr("circuit_opens")
+        self.state = OPEN
+        self.retry_at = time.monotonic() + self.backoff
+        logger.warning(f"[PLC Supervisor] Circuit open for {self.backoff:.1f}s: {error}")
+        self.backoff = min(self.backoff * 2, self.backoff_max)
+
+    # Connection
+
+    def ensure_connected(self, probe: bool = False) -> bool:
+        """Connect if needed; fails fast while the circuit is open"""
+        with self._lock:
+            if not self.allow_request(probe):
+                return False
+            if self.connected:
+                return True
+            self.metrics.incr("reconnects")
+            try:
+                self.connected = bool(self._connect())
+            except Exception as e:
+                logger.error(f"[PLC Supervisor] Connect error: {str(e)}")
+                self.connected = False
+            if not self.connected:
+                self.metrics.incr("reconnect_failures")
+                self.record_failure("connect failed")
+            return self.connected
+
+    def mark_disconnected(self):
+        with self._lock:
+            if self.connected:
+                try:
+                    self._disconnect()
+                except Exception:
+                    pass
+            self.connected = False
+
+    def call(self, operation: str, request: Callable, probe: bool = False):
+        """
+        Run a Modbus request with reconnect, retry and circuit breaking
+
+        Protocol-level exception responses mean the link is healthy and are
+        returned as-is. Transport errors count as link failures.
+
+        Returns:
+            The pymodbus response, or None if the PLC is unreachable
+        """
+        for attempt in range(self.max_retries + 1):
+            if not self.ensure_connected(probe):
+                return None
+            started = time.monotonic()
+            try:
+                result = request()
+            except Exception as e:
+                result = None
+                error = str(e)
+            else:
+                error = None if not result.isError() or _is_exception_response(result) else str(result)
+            latency_ms = (time.monotonic() - started) * 1000
+
+            if error is None:
+                self.record_success(latency_ms)
+                return result
+
+            logger.error(f"[PLC Supervisor] {operation} failed: {error}")
+            self.mark_disconnected()
+            self.record_failure(error)
+            if attempt < self.max_retries and self.state != OPEN:
+                self.metrics.incr("retries")
+                continue
+            break
+        return None
+
+    # Heartbeat
+
+    def start_heartbeat(self):
+        """Probe the PLC every heartbeat_interval seconds in a daemon thread"""
+        if self._probe is None or (self._heartbeat_thread and self._heartbeat_thread.is_alive()):
+            return
+        self._stop.clear()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="plc-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def stop_heartbeat(self):
+        self._stop.set()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            self.metrics.incr("heartbeats")
+            try:
+                self._probe()
+            except Exception as e:
+                logger.error(f"[PLC Supervisor] Heartbeat error: {str(e)}")
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "connected": self.connected,
+                "circuit": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "retry_in_seconds": round(max(self.retry_at - time.monotonic(), 0), 2) if self.state == OPEN else 0,
+                "metrics": self.metrics.snapshot(),
+            }
+
+
+def _is_exception_response(result) -> bool:
+    """PLC answered with a Modbus exception code (bad address etc.), link is fine"""
+    return getattr(result, "exception_code", None) is not None
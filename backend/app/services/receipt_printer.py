@@ -0,0 +1,233 @@
+"""
+Receipt Printer Service
+Renders parking tickets for booth printers and caches them on disk
+
+Formats:
+- escpos: raw ESC/POS byte stream for 58/80mm thermal printers. The QR
+  code is sent as a native printer QR command, which keeps the stream to
+  a few hundred bytes.
+- png: 1-bit ticket image (384px wide, 58mm @ 203dpi) with the qr_token
+  rendered by the qrcode library, for printers without ESC/POS support.
+
+A ticket is rendered once per session state (active entry ticket, closed
+receipt) and then served straight from the cache directory.
+
+The cache is bounded: rendering the closed receipt deletes the session's
+active renders, and once RECEIPT_PRINT_CACHE_FILES tickets are cached the
+least recently served are deleted (they are re-rendered on demand). Tickets
+are 0.3-1.5 KB, so the default 20000 files stays under about 30 MB.
+"""
+import io
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from .business_day import BUSINESS_TZ
+
+RECEIPT_PRINT_DIR = os.getenv("RECEIPT_PRINT_DIR", "uploads/receipts")
+RECEIPT_PRINT_CACHE_FILES = int(os.getenv("RECEIPT_PRINT_CACHE_FILES", "20000"))
+# Writes between cache sweeps; the directory may briefly exceed the limit by this many
+SWEEP_EVERY = 100
+TICKET_WIDTH_PX = 384
+TICKET_TITLE = "Parking Receipt"
+
+FORMATS = {
+    'escpos': 'bin',
+    'png': 'png',
+}
+
+# qr_token is URL-safe base64 (secrets.token_urlsafe)
+_SAFE_TOKEN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# ESC/POS control sequences
+ESC = b'\x1b'
+GS = b'\x1d'
+INIT = ESC + b'@'
+ALIGN_LEFT = ESC + b'a\x00'
+ALIGN_CENTER = ESC + b'a\x01'
+BOLD_ON = ESC + b'E\x01'
+BOLD_OFF = ESC + b'E\x00'
+DOUBLE_ON = GS + b'!\x11'
+DOUBLE_OFF = GS + b'!\x00'
+FEED_AND_CUT = GS + b'V\x42\x03'
+
+
+def _format_time(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(BUSINESS_TZ).strftime('%Y-%m-%d %H:%M')
+    return str(value)
+
+
+def _ticket_lines(receipt: Dict) -> list:
+    """Label/value pairs printed on every ticket format"""
+    lines = [
+        ('Plate', receipt.get('plate') or 'Unknown'),
+        ('Type', receipt.get('type_name') or 'Unknown'),
+        ('Spot', receipt.get('spot_label') or 'Unknown'),
+        ('Entry', _format_time(receipt.get('entry_time'))),
+    ]
+    if receipt.get('exit_time'):
+        lines.append(('Exit', _format_time(receipt['exit_time'])))
+    if receipt.get('fee_lkr') is not None:
+        lines.append(('Fee (LKR)', str(receipt['fee_lkr'])))
+    return lines
+
+
+def _escpos_qr(data: str, module_size: int = 6) -> bytes:
+    """Native QR code commands (GS ( k, model 2, error correction M)"""
+    payload = data.encode('ascii')
+    store_len = len(payload) + 3
+    return b''.join([
+        GS + b'(k\x04\x00\x31\x41\x32\x00',                  # model 2
+        GS + b'(k\x03\x00\x31\x43' + bytes([module_size]),   # module size
+        GS + b'(k\x03\x00\x31\x45\x31',                      # error correction M
+        GS + b'(k' + bytes([store_len % 256, store_len // 256]) + b'\x31\x50\x30' + payload,
+        GS + b'(k\x03\x00\x31\x51\x30',                      # print
+    ])
+
+
+def render_escpos(receipt: Dict) -> bytes:
+    """Render a ticket as an ESC/POS byte stream"""
+    out = [INIT, ALIGN_CENTER, DOUBLE_ON, TICKET_TITLE.encode('ascii'), b'\n', DOUBLE_OFF, b'\n', ALIGN_LEFT]
+    for label, value in _ticket_lines(receipt):
+        out += [BOLD_ON, f"{label}: ".encode('ascii'), BOLD_OFF,
+                str(value).encode('ascii', 'replace'), b'\n']
+    out += [b'\n', ALIGN_CENTER, _escpos_qr(receipt['qr_token']), b'\n',
+            receipt['qr_token'].encode('ascii'), b'\n', FEED_AND_CUT]
+    return b''.join(out)
+
+
+def render_png(receipt: Dict) -> bytes:
+    """Render a ticket as a 1-bit PNG sized for a 58mm thermal printer"""
+    import qrcode
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.load_default()
+    line_height = 18
+    margin = 12
+
+    qr = qrcode.QRCode(border=1, box_size=6, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(receipt['qr_token'])
+    qr.make(fit=True)
+    qr_img = qr.make_image(fill_color="black", back_color="white").get_image().convert('1')
+    if qr_img.width > TICKET_WIDTH_PX - 2 * margin:
+        side = TICKET_WIDTH_PX - 2 * margin
+        qr_img = qr_img.resize((side, side), Image.NEAREST)
+
+    lines = _ticket_lines(receipt)
+    height = margin + line_height * (len(lines) + 2) + qr_img.height + line_height + margin
+    img = Image.new('1', (TICKET_WIDTH_PX, height), 1)
+    draw = ImageDraw.Draw(img)
+
+    y = margin
+    title_width = draw.textlength(TICKET_TITLE, font=font)
+    draw.text(((TICKET_WIDTH_PX - title_width) / 2, y), TICKET_TITLE, font=font, fill=0)
+    y += line_height * 2
+    for label, value in lines:
+        draw.text((margin, y), f"{label}: {value}", font=font, fill=0)
+        y += line_height
+
+    img.paste(qr_img, ((TICKET_WIDTH_PX - qr_img.width) // 2, y))
+    y += qr_img.height
+    token_width = draw.textlength(receipt['qr_token'], font=font)
+    draw.text(((TICKET_WIDTH_PX - token_width) / 2, y + 2), receipt['qr_token'], font=font, fill=0)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    'escpos': render_escpos,
+    'png': render_png,
+}
+
+
+def cache_path(qr_token: str, state: str, fmt: str) -> str:
+    """Location of the cached ticket for a session state ('active' or 'closed')"""
+    if not _SAFE_TOKEN.match(qr_token):
+        raise ValueError(f"Invalid qr_token: {qr_token!r}")
+    return os.path.join(RECEIPT_PRINT_DIR, f"{qr_token}-{state}.{FORMATS[fmt]}")
+
+
+def read_cached(qr_token: str, state: str, fmt: str) -> Optional[bytes]:
+    """Return a previously rendered ticket, or None if it has not been rendered yet"""
+    try:
+        path = cache_path(qr_token, state, fmt)
+        with open(path, 'rb') as f:
+            data = f.read()
+        # mtime is the last time served: the sweep evicts the oldest first
+        os.utime(path)
+        return data
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+_writes_since_sweep = 0
+_sweep_lock = threading.Lock()
+
+
+def sweep_cache(max_files: int = RECEIPT_PRINT_CACHE_FILES) -> int:
+    """Delete the least recently served tickets beyond max_files; returns how many were deleted"""
+    try:
+        entries = [entry for entry in os.scandir(RECEIPT_PRINT_DIR) if entry.is_file()]
+    except FileNotFoundError:
+        return 0
+    if len(entries) <= max_files:
+        return 0
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    deleted = 0
+    for entry in entries[:len(entries) - max_files]:
+        try:
+            os.remove(entry.path)
+            deleted += 1
+        except FileNotFoundError:
+            pass
+    return deleted
+
+
+def _after_write():
+    global _writes_since_sweep
+    with _sweep_lock:
+        _writes_since_sweep += 1
+        if _writes_since_sweep < SWEEP_EVERY:
+            return
+        _writes_since_sweep = 0
+    sweep_cache()
+
+
+def get_ticket(receipt: Dict, fmt: str) -> bytes:
+    """
+    Get a rendered ticket, rendering and caching it on first use
+
+    Args:
+        receipt: Receipt fields (plate, type_name, spot_label, entry_time,
+                 exit_time, fee_lkr, qr_token, status)
+        fmt: 'escpos' or 'png'
+    """
+    state = 'closed' if receipt.get('status') == 'closed' else 'active'
+    cached = read_cached(receipt['qr_token'], state, fmt)
+    if cached is not None:
+        return cached
+
+    data = RENDERERS[fmt](receipt)
+    path = cache_path(receipt['qr_token'], state, fmt)
+    os.makedirs(RECEIPT_PRINT_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    if state == 'closed':
+        # The entry ticket of a closed session is never printed again
+        for active_fmt in FORMATS:
+            try:
+                os.remove(cache_path(receipt['qr_token'], 'active', active_fmt))
+            except FileNotFoundError:
+                pass
+    _after_write()
+    return data
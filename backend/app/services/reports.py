@@ -0,0 +1,143 @@
+"""
+Report Aggregation Service
+Builds daily/monthly revenue summaries from grouped queries
+
+Days are local business days (see business_day.py), read from the
+precomputed day keys on payments/parking_sessions so range scans use
+plain indexed date comparisons.
+"""
+from calendar import monthrange
+from datetime import datetime, date
+from typing import Dict, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..db.models import Payment, ParkingSession
+from .business_day import is_closed_day
+
+# Summaries for months that have fully ended can no longer change,
+# so they are kept for the lifetime of the process.
+# Format: {(year, month): summary_dict}
+_closed_month_cache: Dict[Tuple[int, int], dict] = {}
+
+
+def _as_date(value) -> date:
+    """Normalize a day key that may come back as a string on SQLite"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def payment_totals_by_day(db: Session, first: date, last: date) -> Dict[date, Dict[str, Dict[str, float]]]:
+    """
+    Sum payments per business day and method in a single GROUP BY query
+
+    Args:
+        first: First business day (inclusive)
+        last: Last business day (inclusive)
+
+    Returns:
+        {day: {method: {'amount': float, 'count': int}}}
+    """
+    rows = db.query(
+        Payment.business_day,
+        Payment.method,
+        func.coalesce(func.sum(Payment.amount_lkr), 0),
+        func.count(Payment.id),
+    ).filter(
+        Payment.business_day >= first,
+        Payment.business_day <= last
+    ).group_by(Payment.business_day, Payment.method).all()
+
+    totals: Dict[date, Dict[str, Dict[str, float]]] = {}
+    for day, method, amount, count in rows:
+        totals.setdefault(_as_date(day), {})[method] = {'amount': float(amount), 'count': int(count)}
+    return totals
+
+
+def session_counts_by_day(db: Session, first: date, last: date) -> Dict[date, int]:
+    """Count sessions closed per business day in a single GROUP BY query"""
+    rows = db.query(ParkingSession.exit_day, func.count(ParkingSession.id)).filter(
+        ParkingSession.exit_day >= first,
+        ParkingSession.exit_day <= last
+    ).group_by(ParkingSession.exit_day).all()
+    return {_as_date(day): int(count) for day, count in rows}
+
+
+def _sum_method(by_method: Dict[str, Dict[str, float]], method: str, key: str = 'amount'):
+    entry = by_method.get(method)
+    return entry[key] if entry else 0
+
+
+def daily_summary(db: Session, d: date) -> dict:
+    """Revenue and session totals for one business day"""
+    by_method = payment_totals_by_day(db, d, d).get(d, {})
+    sessions_count = session_counts_by_day(db, d, d).get(d, 0)
+
+    return {
+        'date': d.isoformat(),
+        'total_lkr': float(sum(m['amount'] for m in by_method.values())),
+        'cash_lkr': float(_sum_method(by_method, 'cash')),
+        'card_lkr': float(_sum_method(by_method, 'card')),
+        'rfid_lkr': 0.0,  # RFID users pay monthly, not per session
+        'rfid_sessions': int(_sum_method(by_method, 'rfid', 'count')),
+        'sessions': int(sessions_count)
+    }
+
+
+def monthly_summary(db: Session, year: int, month: int) -> dict:
+    """
+    Revenue and session totals for a month with a per-day breakdown
+
+    Uses two grouped queries regardless of month length. Results for
+    months that have already ended are cached permanently.
+    """
+    cached = _closed_month_cache.get((year, month))
+    if cached is not None:
+        return cached
+
+    first_day = date(year, month, 1)
+    last_day_num = monthrange(year, month)[1]
+    last_day = date(year, month, last_day_num)
+
+    payments = payment_totals_by_day(db, first_day, last_day)
+    sessions = session_counts_by_day(db, first_day, last_day)
+
+    total_lkr = 0.0
+    cash_lkr = 0.0
+    card_lkr = 0.0
+    rfid_sessions = 0
+    daily_data = []
+    for day in range(1, last_day_num + 1):
+        d = date(year, month, day)
+        by_method = payments.get(d, {})
+        day_total = sum(m['amount'] for m in by_method.values())
+        total_lkr += day_total
+        cash_lkr += _sum_method(by_method, 'cash')
+        card_lkr += _sum_method(by_method, 'card')
+        rfid_sessions += int(_sum_method(by_method, 'rfid', 'count'))
+        daily_data.append({
+            'day': day,
+            'revenue': float(day_total),
+            'sessions': int(sessions.get(d, 0))
+        })
+
+    sessions_count = sum(sessions.values())
+    summary = {
+        'year': year,
+        'month': month,
+        'month_name': first_day.strftime('%B'),
+        'total_revenue': float(total_lkr),
+        'cash_revenue': float(cash_lkr),
+        'card_revenue': float(card_lkr),
+        'rfid_sessions': int(rfid_sessions),
+        'total_sessions': int(sessions_count),
+        'daily_data': daily_data,
+        'average_daily_revenue': float(total_lkr) / last_day_num if last_day_num > 0 else 0,
+        'average_daily_sessions': int(sessions_count) / last_day_num if last_day_num > 0 else 0
+    }
+
+    if is_closed_day(last_day):
+        _closed_month_cache[(year, month)] = summary
+    return summary
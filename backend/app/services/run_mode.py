@@ -0,0 +1,216 @@
+"""
+Run Mode Service
+Which parts of the system this process runs, and how it reaches the rest
+
+APP_MODE picks what a process does:
+    all              everything in one process (default; small sites)
+    api              public HTTP API only; OCR and gate commands go to the
+                     processes below. Stateless: run as many uvicorn
+                     workers (WEB_CONCURRENCY) and replicas as load needs,
+                     as booking state, login rate limits and the bcrypt
+                     cost are read from the database on each request
+    ocr-worker       reads plates for API processes; scale with camera load
+    gate-controller  owns the PLC connections and lane state machines; run
+                     exactly one per site
+
+Processes talk over plain HTTP on the internal network (routers/internal.py),
+authenticated with INTERNAL_RPC_TOKEN. It has no default: ocr-worker and
+gate-controller processes, and api processes that call them, refuse to
+start without it.
+    OCR_WORKER_URL       comma-separated OCR workers, tried in turn; unset
+                         means an api or gate-controller process reads
+                         plates itself
+    GATE_CONTROLLER_URL  the gate controller; unset means an api process
+                         answers gate commands with 503 instead of opening
+                         PLC connections of its own
+
+Only ocr-worker and gate-controller processes serve the internal
+endpoints; `all` calls the same code in-process and exposes nothing extra.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MODE_ALL = "all"
+MODE_API = "api"
+MODE_OCR_WORKER = "ocr-worker"
+MODE_GATE_CONTROLLER = "gate-controller"
+MODES = (MODE_ALL, MODE_API, MODE_OCR_WORKER, MODE_GATE_CONTROLLER)
+
+APP_MODE = os.getenv("APP_MODE", MODE_ALL)
+if APP_MODE not in MODES:
+    raise ValueError(f"APP_MODE must be one of {', '.join(MODES)}, not '{APP_MODE}'")
+
+OCR_WORKER_URLS = [url.strip().rstrip("/") for url in os.getenv("OCR_WORKER_URL", "").split(",") if url.strip()]
+GATE_CONTROLLER_URL = os.getenv("GATE_CONTROLLER_URL", "").rstrip("/")
+INTERNAL_RPC_TOKEN = os.getenv("INTERNAL_RPC_TOKEN", "")
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "30"))
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "1"))
+
+INTERNAL_TOKEN_HEADER = "X-Internal-Token"
+
+if not INTERNAL_RPC_TOKEN and (APP_MODE in (MODE_OCR_WORKER, MODE_GATE_CONTROLLER)
+                               or (APP_MODE == MODE_API and (OCR_WORKER_URLS or GATE_CONTROLLER_URL))):
+    raise ValueError(f"INTERNAL_RPC_TOKEN must be set for APP_MODE={APP_MODE} with internal calls")
+
+
+def serves_api() -> bool:
+    return APP_MODE in (MODE_ALL, MODE_API)
+
+
+def owns_gates() -> bool:
+    """This process talks to the PLCs and runs the lane state machines"""
+    return APP_MODE in (MODE_ALL, MODE_GATE_CONTROLLER)
+
+
+def runs_ocr() -> bool:
+    """This process reads plates itself"""
+    return APP_MODE in (MODE_ALL, MODE_OCR_WORKER) or not OCR_WORKER_URLS
+
+
+class RPCError(Exception):
+    """Another process could not be reached or failed; str() says which"""
+
+
+class _Remote:
+    """HTTP client for the internal endpoints of other processes"""
+
+    def __init__(self, urls: List[str], name: str):
+        self.urls = urls
+        self.name = name
+        self._next = itertools.cycle(range(len(urls))) if urls else None
+        self._client = None
+
+    def _http(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=RPC_TIMEOUT, headers={INTERNAL_TOKEN_HEADER: INTERNAL_RPC_TOKEN})
+        return self._client
+
+    async def call(self, method: str, path: str, **kwargs):
+        """Send to the next URL, moving on to the others if it can't be reached"""
+        import httpx
+
+        if not self.urls:
+            raise RPCError(f"No {self.name} configured")
+        start = next(self._next)
+        for i in range(len(self.urls)):
+            url = self.urls[(start + i) % len(self.urls)]
+            try:
+                return await self._http().request(method, url + path, **kwargs)
+            except httpx.HTTPError as e:
+                logger.warning(f"[RPC] {self.name} at {url} failed: {e}")
+        raise RPCError(f"{self.name} unavailable")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LocalOCR:
+    """Reads plates in this process, OCR_CONCURRENCY images at a time, off the event loop"""
+
+    def __init__(self):
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def recognize(self, image_data: bytes) -> Dict:
+        from .plate_recognition import process_vehicle_image
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(OCR_CONCURRENCY)
+        async with self._slots:
+            return await asyncio.to_thread(process_vehicle_image, image_data)
+
+
+class RemoteOCR(_Remote):
+    def __init__(self, urls: List[str]):
+        super().__init__(urls, "OCR worker")
+
+    async def recognize(self, image_data: bytes) -> Dict:
+        response = await self.call("POST", "/internal/ocr", content=image_data,
+                                   headers={"Content-Type": "application/octet-stream"})
+        if response.status_code != 200:
+            raise RPCError(f"OCR worker returned {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+
+class LocalGates:
+    """Lane workflows of this process"""
+
+    async def command(self, direction: str, action: str, lane_id: Optional[str]) -> Dict:
+        """
+        Run an operator command on a lane
+
+        Returns:
+            dict: Lane status after the command
+
+        Raises:
+            KeyError: Unknown lane, or not a lane of that direction
+        """
+        from .lane_workflow import get_lane_workflows
+
+        workflows = get_lane_workflows()
+        workflow = workflows.for_lane(lane_id, direction)
+        await workflows.start()
+        return await workflow.command(action)
+
+    async def status(self) -> List[Dict]:
+        """Status of every lane, in configuration order"""
+        from .lane_workflow import get_lane_workflows
+
+        return get_lane_workflows().status()
+
+
+class RemoteGates(_Remote):
+    def __init__(self, url: str):
+        super().__init__([url] if url else [], "gate controller")
+
+    async def command(self, direction: str, action: str, lane_id: Optional[str]) -> Dict:
+        response = await self.call("POST", "/internal/lanes/command",
+                                    json={"direction": direction, "action": action, "lane_id": lane_id})
+        if response.status_code == 404:
+            raise KeyError(response.json().get("detail", "Unknown lane"))
+        if response.status_code != 200:
+            raise RPCError(f"Gate controller returned {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    async def status(self) -> List[Dict]:
+        response = await self.call("GET", "/internal/lanes")
+        if response.status_code != 200:
+            raise RPCError(f"Gate controller returned {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+
+_ocr = None
+_gates = None
+
+
+def get_ocr():
+    """Plate reader for this process: LocalOCR or RemoteOCR"""
+    global _ocr
+    if _ocr is None:
+        if APP_MODE in (MODE_API, MODE_GATE_CONTROLLER) and not OCR_WORKER_URLS:
+            logger.warning(f"[RunMode] OCR_WORKER_URL is not set; this {APP_MODE} process reads plates itself")
+        _ocr = LocalOCR() if runs_ocr() else RemoteOCR(OCR_WORKER_URLS)
+    return _ocr
+
+
+def get_gates():
+    """Lane control for this process: LocalGates or RemoteGates"""
+    global _gates
+    if _gates is None:
+        _gates = LocalGates() if owns_gates() else RemoteGates(GATE_CONTROLLER_URL)
+    return _gates
+
+
+async def close_rpc_clients():
+    for backend in (_ocr, _gates):
+        if isinstance(backend, _Remote):
+            await backend.close()
@@ -0,0 +1,295 @@
+"""
+Spot Assignment Service
+Orders free spots per vehicle type by a configurable strategy, kept in memory
+
+Each spot carries layout set by the admin (migrations/003_spot_layout.sql):
+    distance_rank   1 = closest to the entrance; unranked spots come last
+    zone            area of the lot ("A", "roof", ...)
+    level           floor, 0 = ground
+
+A strategy turns that layout into a sort key, and the free spots of each
+vehicle type sit in heaps ordered by it, so picking the next spot is a heap
+pop instead of a query. Strategies (SPOT_STRATEGY):
+    nearest             lowest distance rank first (default)
+    balance-zones       nearest spot of the zone with the most free spots
+    bookings-near-gate  bookings take the nearest spots; walk-ins leave the
+                        first SPOT_BOOKING_RANKS ranks to them until the
+                        rest of the lot is full
+    fill-by-level       lowest level first, nearest within it
+
+The heaps are only an ordering hint. A popped spot is still claimed with a
+conditional UPDATE (services/spots.py), and an entry whose spot was taken
+elsewhere is dropped when it reaches the top. Spots freed through the ORM
+(exit payments, cancelled bookings, admin edits) are pushed back after
+commit; a pool is re-read from the database when it runs dry or is older
+than SPOT_QUEUE_TTL seconds, which picks up changes made by other workers.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..db.models import ParkingSpot
+
+logger = logging.getLogger(__name__)
+
+SPOT_STRATEGY = os.getenv("SPOT_STRATEGY", "nearest")
+SPOT_BOOKING_RANKS = int(os.getenv("SPOT_BOOKING_RANKS", "10"))
+SPOT_QUEUE_TTL = float(os.getenv("SPOT_QUEUE_TTL", "60"))
+
+# Times a pool is read from the database per request before giving up
+POOL_READS = 2
+
+# Changing these re-orders spots, so the type's pools are rebuilt
+LAYOUT_COLUMNS = ("type_id", "zone", "level", "distance_rank")
+
+
+class SpotInfo(NamedTuple):
+    """What the heaps need to know about a spot, detached from any session"""
+    id: int
+    type_id: int
+    zone: Optional[str]
+    level: int
+    distance_rank: Optional[int]
+
+    @classmethod
+    def of(cls, spot: ParkingSpot) -> "SpotInfo":
+        return cls(spot.id, spot.type_id, spot.zone, spot.level or 0, spot.distance_rank)
+
+
+def _nearest(spot: SpotInfo) -> tuple:
+    return (spot.distance_rank is None, spot.distance_rank or 0, spot.id)
+
+
+class SpotStrategy:
+    """Nearest to the entrance first; subclasses change the sort key or grouping"""
+    name = "nearest"
+
+    def key(self, spot: SpotInfo, reserve: bool) -> tuple:
+        """Sort key, lowest assigned first; reserve is True for bookings"""
+        return _nearest(spot)
+
+    def group(self, spot: SpotInfo) -> Optional[str]:
+        """Spots are popped from the group with the most free spots"""
+        return None
+
+
+class BalanceZonesStrategy(SpotStrategy):
+    name = "balance-zones"
+
+    def group(self, spot: SpotInfo) -> Optional[str]:
+        return spot.zone or ""
+
+
+class BookingsNearGateStrategy(SpotStrategy):
+    name = "bookings-near-gate"
+
+    def __init__(self, booking_ranks: int = SPOT_BOOKING_RANKS):
+        self.booking_ranks = booking_ranks
+
+    def key(self, spot: SpotInfo, reserve: bool) -> tuple:
+        if reserve:
+            return _nearest(spot)
+        near_gate = spot.distance_rank is not None and spot.distance_rank <= self.booking_ranks
+        return (near_gate, *_nearest(spot))
+
+
+class FillByLevelStrategy(SpotStrategy):
+    name = "fill-by-level"
+
+    def key(self, spot: SpotInfo, reserve: bool) -> tuple:
+        return (spot.level, *_nearest(spot))
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (SpotStrategy, BalanceZonesStrategy, BookingsNearGateStrategy, FillByLevelStrategy)
+}
+
+
+class _Pool:
+    """Free spots of one vehicle type, ordered for walk-ins or for bookings"""
+
+    def __init__(self, strategy: SpotStrategy, reserve: bool, spots):
+        self.strategy = strategy
+        self.reserve = reserve
+        self.heaps = defaultdict(list)  # group -> [(key, spot_id)]
+        self.entries = {}  # spot_id -> (group, key) of its live heap entry
+        self.counts = Counter()  # group -> live entries
+        self.loaded_at = time.monotonic()
+        for spot in spots:
+            self.push(spot)
+
+    def push(self, spot: SpotInfo):
+        entry = (self.strategy.group(spot), self.strategy.key(spot, self.reserve))
+        if self.entries.get(spot.id) == entry:
+            return
+        self.discard(spot.id)
+        self.entries[spot.id] = entry
+        self.counts[entry[0]] += 1
+        heapq.heappush(self.heaps[entry[0]], (entry[1], spot.id))
+
+    def discard(self, spot_id: int):
+        """Forget a spot; its heap entry is skipped when it reaches the top"""
+        entry = self.entries.pop(spot_id, None)
+        if entry is not None:
+            self.counts[entry[0]] -= 1
+
+    def peek(self) -> Optional[int]:
+        groups = [group for group, count in self.counts.items() if count > 0]
+        if not groups:
+            return None
+        group = min(groups, key=lambda g: (-self.counts[g], g or ""))
+        heap = self.heaps[group]
+        # Drop entries that were discarded or re-keyed since they were pushed
+        while self.entries.get(heap[0][1]) != (group, heap[0][0]):
+            heapq.heappop(heap)
+        return heap[0][1]
+
+    def pop(self) -> Optional[int]:
+        spot_id = self.peek()
+        if spot_id is not None:
+            self.discard(spot_id)
+        return spot_id
+
+
+class SpotAllocator:
+    """Per-type heaps of free spots, shared by all requests of this process"""
+
+    def __init__(self, strategy: SpotStrategy, ttl: float = SPOT_QUEUE_TTL):
+        self.strategy = strategy
+        self.ttl = ttl
+        self._pools: Dict[Tuple[int, bool], _Pool] = {}
+        self._lock = threading.Lock()
+
+    def _read(self, db: Session, type_id: int, reserve: bool) -> _Pool:
+        rows = db.query(
+            ParkingSpot.id, ParkingSpot.type_id, ParkingSpot.zone, ParkingSpot.level, ParkingSpot.distance_rank
+        ).filter(
+            ParkingSpot.type_id == type_id,
+            ParkingSpot.is_occupied == False,
+            ParkingSpot.booking == False
+        ).all()
+        pool = _Pool(self.strategy, reserve, (SpotInfo(r[0], r[1], r[2], r[3] or 0, r[4]) for r in rows))
+        with self._lock:
+            self._pools[(type_id, reserve)] = pool
+        return pool
+
+    def _pool(self, db: Session, type_id: int, reserve: bool, reread: bool = False) -> _Pool:
+        with self._lock:
+            pool = self._pools.get((type_id, reserve))
+        if pool is None or reread or time.monotonic() - pool.loaded_at >= self.ttl:
+            pool = self._read(db, type_id, reserve)
+        return pool
+
+    def candidates(self, db: Session, type_id: int, reserve: bool = False) -> Iterator[int]:
+        """
+        Free spot ids in assignment order, each handed to one caller only
+
+        The pool is re-read from the database once it runs dry, in case
+        spots were freed where this process could not see it.
+        """
+        for read in range(POOL_READS):
+            pool = self._pool(db, type_id, reserve, reread=read > 0)
+            while True:
+                with self._lock:
+                    spot_id = pool.pop()
+                    if spot_id is not None:
+                        sibling = self._pools.get((type_id, not reserve))
+                        if sibling is not None:
+                            sibling.discard(spot_id)
+                if spot_id is None:
+                    break
+                yield spot_id
+
+    def suggest(self, db: Session, type_id: int) -> Optional[ParkingSpot]:
+        """Next spot a walk-in would get, without taking it out of the pool"""
+        for read in range(POOL_READS):
+            pool = self._pool(db, type_id, False, reread=read > 0)
+            while True:
+                with self._lock:
+                    spot_id = pool.peek()
+                if spot_id is None:
+                    break
+                spot = db.get(ParkingSpot, spot_id)
+                if spot is not None and spot.type_id == type_id and not spot.is_occupied and not spot.booking:
+                    return spot
+                with self._lock:
+                    pool.discard(spot_id)
+        return None
+
+    def release(self, spot: SpotInfo):
+        """Offer a freed spot again"""
+        with self._lock:
+            for (type_id, reserve), pool in self._pools.items():
+                if type_id == spot.type_id:
+                    pool.push(spot)
+                else:
+                    pool.discard(spot.id)
+
+    def invalidate(self, type_id: Optional[int] = None):
+        """Rebuild the pools of a type (all types if None) on next use"""
+        with self._lock:
+            for key in [k for k in self._pools if type_id is None or k[0] == type_id]:
+                del self._pools[key]
+
+
+_allocator: Optional[SpotAllocator] = None
+
+
+def get_spot_allocator() -> SpotAllocator:
+    """Get the process-wide allocator for SPOT_STRATEGY"""
+    global _allocator
+    if _allocator is None:
+        strategy = STRATEGIES.get(SPOT_STRATEGY)
+        if strategy is None:
+            logger.warning(f"[Spots] Unknown SPOT_STRATEGY '{SPOT_STRATEGY}', using nearest")
+            strategy = SpotStrategy
+        _allocator = SpotAllocator(strategy())
+    return _allocator
+
+
+# Keep the pools in step with spots changed through the ORM. Changes are
+# collected per session and applied only once the transaction commits.
+
+def _pending(session: Session) -> dict:
+    return session.info.setdefault("spot_assignment", {"freed": {}, "types": set()})
+
+
+@event.listens_for(ParkingSpot, "after_insert")
+@event.listens_for(ParkingSpot, "after_update")
+def _spot_written(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    state = inspect(target)
+    pending = _pending(session)
+    if any(state.attrs[name].history.has_changes() for name in LAYOUT_COLUMNS):
+        pending["types"].add(target.type_id)
+        pending["types"].update(t for t in state.attrs.type_id.history.deleted if t is not None)
+    elif not target.is_occupied and not target.booking:
+        pending["freed"][target.id] = SpotInfo.of(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    pending = session.info.pop("spot_assignment", None)
+    if not pending or _allocator is None:
+        return
+    for type_id in pending["types"]:
+        _allocator.invalidate(type_id)
+    for spot in pending["freed"].values():
+        if spot.type_id not in pending["types"]:
+            _allocator.release(spot)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop("spot_assignment", None)
@@ -0,0 +1,104 @@
+"""
+Spot Allocation Service
+Claims parking spots atomically for entry and mobile bookings
+
+A spot is claimed with a conditional UPDATE (... WHERE is_occupied = 0,
+plus booking = 0 for reservations) and the affected row count says
+whether this request won it. Two entries or bookings can therefore never
+take the same spot, and the loser finds out at once instead of at commit.
+
+Picking any free spot of a type takes candidates in the order of the
+configured assignment strategy (services/spot_assignment.py) and claims
+the first one still free. Where the database supports it (MySQL 8,
+MariaDB 10.6+, PostgreSQL) a candidate is locked with SELECT ... FOR
+UPDATE SKIP LOCKED, so a spot another worker is claiming right now is
+passed over instead of waited on.
+
+Claims are part of the caller's transaction: commit keeps them, rollback
+releases them.
+"""
+
+import logging
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from ..db.models import ParkingSpot
+from .spot_assignment import get_spot_allocator
+
+logger = logging.getLogger(__name__)
+
+
+def suggest_spot(db: Session, type_id: int) -> Optional[ParkingSpot]:
+    """Spot the assignment strategy would give a walk-in, without claiming it (camera suggestions)"""
+    return get_spot_allocator().suggest(db, type_id)
+
+
+def _claim_values(reserve: bool):
+    return {ParkingSpot.booking: True} if reserve else {ParkingSpot.is_occupied: True}
+
+
+def _claim(db: Session, spot_id: int, reserve: bool, include_booked: bool) -> bool:
+    query = db.query(ParkingSpot).filter(ParkingSpot.id == spot_id, ParkingSpot.is_occupied == False)
+    if reserve or not include_booked:
+        query = query.filter(ParkingSpot.booking == False)
+    return query.update(_claim_values(reserve), synchronize_session=False) == 1
+
+
+def claim_spot(db: Session, spot: ParkingSpot, reserve: bool = False) -> bool:
+    """
+    Occupy (entry) or reserve (booking) a specific spot if it is still free
+
+    Entry may take a reserved spot (the booked vehicle arriving); a
+    reservation needs the spot unreserved as well. `spot` is refreshed
+    either way.
+
+    Returns:
+        bool: True if this call claimed the spot
+    """
+    claimed = _claim(db, spot.id, reserve, include_booked=not reserve)
+    db.refresh(spot)
+    return claimed
+
+
+def _supports_skip_locked(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql":
+        return True
+    if dialect.name not in ("mysql", "mariadb"):
+        return False
+    version = dialect.server_version_info or ()
+    return version >= ((10, 6) if getattr(dialect, "is_mariadb", False) else (8, 0, 1))
+
+
+def claim_free_spot(db: Session, type_id: int, reserve: bool = False) -> Optional[ParkingSpot]:
+    """
+    Claim the best free, unreserved spot of a vehicle type
+
+    Args:
+        db: Session whose transaction holds the claim
+        type_id: Vehicle type of the spot
+        reserve: Reserve for a booking (booking=1) instead of occupying it
+
+    Returns:
+        ParkingSpot or None if every spot of the type is taken
+    """
+    skip_locked = _supports_skip_locked(db)
+    for spot_id in get_spot_allocator().candidates(db, type_id, reserve):
+        if skip_locked:
+            spot = db.query(ParkingSpot).filter(
+                ParkingSpot.id == spot_id,
+                ParkingSpot.is_occupied == False,
+                ParkingSpot.booking == False
+            ).with_for_update(skip_locked=True).first()
+            if spot is None:
+                continue
+            # Row is locked until commit, so setting the flag completes the claim
+            for column, value in _claim_values(reserve).items():
+                setattr(spot, column.key, value)
+            db.flush()
+            return spot
+        if _claim(db, spot_id, reserve, include_booked=False):
+            return db.get(ParkingSpot, spot_id, populate_existing=True)
+    logger.info(f"[Spots] No free spot for type {type_id}")
+    return None
@@ -0,0 +1,321 @@
+"""
+Lane Throughput Benchmark
+Drives full entry -> exit cycles through the FastAPI app and reports latency per step
+
+Each cycle is what the controller UI does for one vehicle:
+
+    POST /camera/camera1/capture      sample image -> plate, type, spot
+    POST /entry/create-session        park the vehicle
+    POST /controller/exit/calculate-fee
+    POST /payments/cash               close the session, free the spot
+
+The app runs in-process behind an httpx ASGI client, against a throwaway
+SQLite database by default or any DATABASE_URL (use a scratch MySQL
+schema: vehicle types, BENCH-* spots, fee bands and a "bench" user are
+seeded into it). `--concurrency` vehicles are in flight at once.
+
+Sample images are replayed in a loop, so the camera's duplicate-plate
+cooldown is cleared before each capture, and every cycle parks under its
+own plate (BM-000001, ...) so concurrent cycles never share a session.
+If OCR cannot read an image the cycle still runs on the first free spot
+and is counted under unread_plates.
+
+Usage:
+    python benchmarks/lane_throughput.py --images samples/ --cycles 200 --concurrency 4
+    python benchmarks/lane_throughput.py --database-url mysql+pymysql://root@localhost/bench_db --json
+    python benchmarks/lane_throughput.py --output release-2.3.json   # keep for comparison
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.stats import summarize
+
+STEPS = ("capture", "create_session", "calculate_fee", "pay_cash")
+IMAGE_TYPES = (".jpg", ".jpeg", ".png", ".bmp")
+BENCH_USER = "bench"
+VEHICLE_TYPES = {"CAR": "Car", "BIKE": "Motor Bike", "HEAVY": "Heavy Vehicle"}
+FEE_BANDS = (
+    ("0 to 30min", 50), ("30min - 1hr", 100), ("1 - 2 hr", 150), ("2 - 6 hr", 300),
+    ("6 - 12 hr", 500), ("12 - 24 hr", 800), ("24 hr +", 1000),
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark entry -> exit lane cycles through the API")
+    parser.add_argument("--images", help="Directory of sample vehicle images (default: one blank frame)")
+    parser.add_argument("--cycles", type=int, default=100, help="Vehicles to put through")
+    parser.add_argument("--concurrency", type=int, default=1, help="Vehicles in flight at once")
+    parser.add_argument("--duration", type=float, help="Stop starting new cycles after this many seconds")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed cycles first (loads the OCR model)")
+    parser.add_argument("--retries", type=int, default=3, help="Re-captures when the spot was taken meanwhile")
+    parser.add_argument("--spots", type=int, default=50, help="BENCH-* spots to seed per vehicle type")
+    parser.add_argument("--database-url", help="Database to run against (default: temporary SQLite file)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's request logging")
+    return parser.parse_args()
+
+
+def load_images(directory):
+    """(filename, bytes) for each sample image, or a blank frame"""
+    if directory:
+        names = sorted(n for n in os.listdir(directory) if n.lower().endswith(IMAGE_TYPES))
+        if not names:
+            raise SystemExit(f"No images in {directory}")
+        images = []
+        for name in names:
+            with open(os.path.join(directory, name), "rb") as f:
+                images.append((name, f.read()))
+        return images
+
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (1280, 720), "gray").save(buffer, format="JPEG")
+    return [("blank.jpg", buffer.getvalue())]
+
+
+def seed(db, spots_per_type):
+    """Vehicle types, BENCH-* spots, fee bands and the cashier, where missing"""
+    from app.db.models import FeeSchedule, ParkingSpot, User, VehicleType
+
+    for code, name in VEHICLE_TYPES.items():
+        vtype = db.query(VehicleType).filter(VehicleType.code == code).first()
+        if vtype is None:
+            vtype = VehicleType(code=code, name=name, is_active=True)
+            db.add(vtype)
+            db.flush()
+        for i in range(1, spots_per_type + 1):
+            label = f"BENCH-{code[0]}{i:03d}"
+            if db.query(ParkingSpot).filter(ParkingSpot.label == label).first() is None:
+                db.add(ParkingSpot(label=label, type_id=vtype.id, is_occupied=False, booking=False))
+        if db.query(FeeSchedule).filter(FeeSchedule.type_id == vtype.id).first() is None:
+            for band_name, amount in FEE_BANDS:
+                db.add(FeeSchedule(type_id=vtype.id, band_name=band_name, amount_lkr=amount))
+    if db.query(User).filter(User.username == BENCH_USER).first() is None:
+        db.add(User(username=BENCH_USER, password_hash="!", role="Controller", status=True))
+    db.commit()
+
+
+def controller_token():
+    from jose import jwt
+    from app.routers.auth import ALGORITHM, JWT_SECRET
+
+    payload = {"sub": BENCH_USER, "role": "Controller",
+               "exp": datetime.now(timezone.utc) + timedelta(hours=8)}
+    return jwt.encode(payload, JWT_SECRET, algorithm=ALGORITHM)
+
+
+class LaneBenchmark:
+    """Runs cycles against the app and collects per-step timings"""
+
+    def __init__(self, client, images, retries):
+        self.client = client
+        self.images = images
+        self.retries = retries
+        self.timings = defaultdict(list)  # step -> ms of successful requests
+        self.errors = defaultdict(Counter)  # step -> status code -> count
+        self.cycle_ms = []
+        self.completed = 0
+        self.failed = 0
+        self.unread_plates = 0
+        self.spot_conflicts = 0
+
+    async def _post(self, step, url, record, **kwargs):
+        started = time.perf_counter()
+        response = await self.client.post(url, **kwargs)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if record:
+            if response.status_code == 200:
+                self.timings[step].append(elapsed_ms)
+            else:
+                self.errors[step][response.status_code] += 1
+        return response
+
+    def _fallback_spot(self, type_code):
+        from app.db.database import SessionLocal
+        from app.services.plate_recognition import get_next_available_spot
+
+        db = SessionLocal()
+        try:
+            return get_next_available_spot(db, type_code)
+        finally:
+            db.close()
+
+    async def _park(self, n, record):
+        """Capture and create the session; returns (plate, session_id) or None"""
+        from app.routers import camera
+
+        plate = f"BM-{n:06d}"
+        filename, image = self.images[n % len(self.images)]
+        for attempt in range(self.retries + 1):
+            # Images repeat, so skip the 30s duplicate-plate cooldown
+            camera.recently_detected_plates.clear()
+            response = await self._post("capture", "/camera/camera1/capture", record,
+                                        files={"file": (filename, image, "image/jpeg")})
+            if response.status_code != 200:
+                return None
+            captured = response.json()
+            type_code = captured.get("type_code") or "CAR"
+            spot_label = captured.get("spot_label")
+            if not spot_label:
+                if record and attempt == 0:
+                    self.unread_plates += 1
+                spot_label = await asyncio.to_thread(self._fallback_spot, type_code)
+                if not spot_label:
+                    return None
+
+            response = await self._post("create_session", "/entry/create-session", record, json={
+                "plate": plate, "type_code": type_code, "spot_label": spot_label,
+            })
+            if response.status_code == 200:
+                return plate, response.json()["session_id"]
+            if response.status_code != 409:
+                return None
+            # Another vehicle took the spot between capture and entry
+            if record:
+                self.spot_conflicts += 1
+        return None
+
+    async def cycle(self, n, record=True):
+        started = time.perf_counter()
+        parked = await self._park(n, record)
+        ok = False
+        if parked is not None:
+            plate, session_id = parked
+            response = await self._post("calculate_fee", "/controller/exit/calculate-fee", record,
+                                        json={"plate": plate})
+            if response.status_code == 200:
+                response = await self._post("pay_cash", "/payments/cash", record,
+                                            json={"session_id": session_id, "cashier": BENCH_USER})
+                ok = response.status_code == 200
+        if not record:
+            return
+        if ok:
+            self.completed += 1
+            self.cycle_ms.append((time.perf_counter() - started) * 1000)
+        else:
+            self.failed += 1
+
+    async def run(self, cycles, concurrency, duration=None):
+        """Run `cycles` cycles with `concurrency` in flight; returns elapsed seconds"""
+        next_cycle = iter(range(1, cycles + 1))
+        started = time.perf_counter()
+
+        async def worker():
+            for n in next_cycle:
+                if duration is not None and time.perf_counter() - started >= duration:
+                    return
+                await self.cycle(n)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+    def report(self, elapsed):
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "completed": self.completed,
+            "failed": self.failed,
+            "unread_plates": self.unread_plates,
+            "spot_conflicts": self.spot_conflicts,
+            "vehicles_per_hour": round(self.completed / elapsed * 3600, 1) if elapsed else None,
+            "cycle_ms": summarize(self.cycle_ms),
+            "steps": {
+                step: {**summarize(self.timings[step]), "errors": dict(self.errors[step])}
+                for step in STEPS
+            },
+        }
+
+
+async def run(args):
+    import httpx
+    from app.db.database import Base, SessionLocal, engine
+    from app.main import app
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed(db, args.spots)
+    finally:
+        db.close()
+
+    images = load_images(args.images)
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {controller_token()}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers,
+                                 timeout=None) as client:
+        bench = LaneBenchmark(client, images, args.retries)
+        for i in range(args.warmup):
+            await bench.cycle(args.cycles + 1 + i, record=False)
+        elapsed = await bench.run(args.cycles, max(args.concurrency, 1), args.duration)
+
+    return {
+        "settings": {
+            "cycles": args.cycles,
+            "concurrency": args.concurrency,
+            "images": len(images),
+            "database": engine.url.render_as_string(hide_password=True),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        },
+        **bench.report(elapsed),
+    }
+
+
+def print_report(report):
+    settings = report["settings"]
+    print("=" * 72)
+    print(f"LANE THROUGHPUT ({settings['cycles']} cycles, concurrency {settings['concurrency']}, "
+          f"{settings['images']} images)")
+    print("=" * 72)
+    print(f"{report['completed']} completed, {report['failed']} failed in {report['elapsed_seconds']}s "
+          f"-> {report['vehicles_per_hour']} vehicles/hour")
+    print(f"unread plates: {report['unread_plates']}, spot conflicts: {report['spot_conflicts']}")
+    print()
+    print(f"{'step (ms)':<16}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  errors")
+    for name, s in [*report["steps"].items(), ("full cycle", report["cycle_ms"])]:
+        errors = ", ".join(f"{code}x{count}" for code, count in s.get("errors", {}).items())
+        print(f"{name:<16}{s['count']:>7}{str(s['p50']):>10}{str(s['p95']):>10}"
+              f"{str(s['p99']):>10}{str(s['max']):>10}  {errors}")
+
+
+def main():
+    args = parse_args()
+    database_dir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        database_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(database_dir.name, 'bench.db')}"
+
+    # The endpoints print every request; keep the report readable
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        report = asyncio.run(run(args))
+    if database_dir is not None:
+        database_dir.cleanup()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+OCR Accuracy Benchmark
+Runs process_vehicle_image over a labeled plate corpus and reports accuracy and latency
+
+Each image's filename is its ground-truth plate: WP-CAB-1234.jpg. Further
+shots of the same plate can be told apart after an underscore
+(WP-CAB-1234_night.jpg). Plates are compared ignoring separators, so
+WPCAB1234.jpg works too. A --labels JSON file can override plates and give
+the true vehicle type per file:
+
+    {"IMG_0042.jpg": {"plate": "WP-CAB-1234", "type_code": "VAN"}, "IMG_0043.jpg": "KN-1062"}
+
+Without a labelled type the expected type is the one the ground-truth
+plate maps to, so type accuracy measures how often misreads change type.
+
+Reports exact-match accuracy, per-character accuracy (1 - edit distance /
+plate length), type accuracy, per-image latency and preprocess/OCR time
+per preprocessing pass. Save a run with --output and diff the next one
+against it with --compare.
+
+Usage:
+    python benchmarks/ocr_accuracy.py samples/plates/
+    python benchmarks/ocr_accuracy.py samples/plates/ --output baseline.json
+    python benchmarks/ocr_accuracy.py samples/plates/ --compare baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.stats import summarize
+
+IMAGE_TYPES = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure plate OCR accuracy and speed on labeled images")
+    parser.add_argument("images", help="Directory of images named after their plates")
+    parser.add_argument("--labels", help="JSON file of per-file plate/type labels")
+    parser.add_argument("--limit", type=int, help="Only use the first N images")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--compare", help="Previous JSON report to show deltas against")
+    parser.add_argument("--verbose", action="store_true", help="Keep the recognizer's logging")
+    return parser.parse_args()
+
+
+def normalize(plate):
+    return re.sub(r"[^A-Z0-9]", "", (plate or "").upper())
+
+
+def plate_from_filename(filename):
+    stem = os.path.splitext(filename)[0]
+    return stem.split("_")[0].strip().upper().replace(" ", "-")
+
+
+def edit_distance(a, b):
+    """Levenshtein distance"""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def load_corpus(directory, labels_path=None, limit=None):
+    """[(filename, path, plate, type_code or None)]"""
+    labels = {}
+    if labels_path:
+        with open(labels_path) as f:
+            labels = json.load(f)
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith(IMAGE_TYPES))
+    corpus = []
+    for name in names[:limit]:
+        label = labels.get(name, {})
+        if isinstance(label, str):
+            label = {"plate": label}
+        corpus.append((name, os.path.join(directory, name),
+                       label.get("plate") or plate_from_filename(name), label.get("type_code")))
+    return corpus
+
+
+def evaluate(corpus):
+    """Run the recognizer over every image; returns per-image results"""
+    from app.services.plate_recognition import detect_vehicle_type_from_plate, process_vehicle_image
+
+    results = []
+    for name, path, truth, truth_type in corpus:
+        with open(path, "rb") as f:
+            image = f.read()
+        timings = {}
+        started = time.perf_counter()
+        result = process_vehicle_image(image, timings=timings)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        expected_type = truth_type or detect_vehicle_type_from_plate(truth)
+        read, expected = normalize(result.get("plate")), normalize(truth)
+        results.append({
+            "file": name,
+            "truth": truth,
+            "plate": result.get("plate"),
+            "exact": read == expected,
+            "char_errors": min(edit_distance(read, expected), len(expected)),
+            "truth_chars": len(expected),
+            "expected_type": expected_type,
+            "type_code": result.get("type_code"),
+            "type_correct": result.get("type_code") == expected_type,
+            "total_ms": total_ms,
+            "passes": timings,
+            "error": result.get("error"),
+        })
+    return results
+
+
+def build_report(results, model_load_ms):
+    count = len(results)
+    truth_chars = sum(r["truth_chars"] for r in results)
+    pass_times = defaultdict(lambda: {"preprocess_ms": [], "ocr_ms": []})
+    for r in results:
+        for name, timing in r["passes"].items():
+            pass_times[name]["preprocess_ms"].append(timing["preprocess_ms"])
+            pass_times[name]["ocr_ms"].append(timing["ocr_ms"])
+
+    def ratio(n, d):
+        return round(n / d, 4) if d else None
+
+    return {
+        "images": count,
+        "read_rate": ratio(sum(1 for r in results if r["plate"]), count),
+        "exact_accuracy": ratio(sum(r["exact"] for r in results), count),
+        "char_accuracy": ratio(truth_chars - sum(r["char_errors"] for r in results), truth_chars),
+        "type_accuracy": ratio(sum(r["type_correct"] for r in results), count),
+        "model_load_ms": round(model_load_ms, 1),
+        "latency_ms": summarize([r["total_ms"] for r in results]),
+        "passes": {
+            name: {
+                "runs": len(times["ocr_ms"]),
+                "preprocess_ms": summarize(times["preprocess_ms"]),
+                "ocr_ms": summarize(times["ocr_ms"]),
+            }
+            for name, times in pass_times.items()
+        },
+        "mismatches": [
+            {key: r[key] for key in ("file", "truth", "plate", "expected_type", "type_code", "error")}
+            for r in results if not r["exact"] or not r["type_correct"]
+        ],
+    }
+
+
+def print_report(report, previous=None):
+    print("=" * 72)
+    print(f"OCR ACCURACY ({report['images']} images, {report['settings']['images']})")
+    print("=" * 72)
+
+    def delta(key, fmt="{:+.2%}"):
+        if not previous or previous.get(key) is None or report.get(key) is None:
+            return ""
+        return f"  ({fmt.format(report[key] - previous[key])} vs previous)"
+
+    for key in ("read_rate", "exact_accuracy", "char_accuracy", "type_accuracy"):
+        value = report[key]
+        print(f"{key:<16}{'n/a' if value is None else f'{value:.2%}':>10}{delta(key)}")
+    print(f"model load      {report['model_load_ms']:>9}ms")
+    print()
+
+    latency = report["latency_ms"]
+    line = f"per image (ms)  p50={latency['p50']}  p95={latency['p95']}  p99={latency['p99']}  max={latency['max']}"
+    if previous:
+        before = previous["latency_ms"]
+        line += f"  (p50 was {before['p50']}, p95 was {before['p95']})"
+    print(line)
+    for name, timing in report["passes"].items():
+        print(f"  {name:<20} runs={timing['runs']:<5} preprocess p50={timing['preprocess_ms']['p50']}  "
+              f"ocr p50={timing['ocr_ms']['p50']}  ocr p95={timing['ocr_ms']['p95']}")
+
+    if report["mismatches"]:
+        print()
+        print(f"Mismatches ({len(report['mismatches'])}):")
+        for m in report["mismatches"][:20]:
+            print(f"  {m['file']:<30} expected {m['truth']} ({m['expected_type']}), "
+                  f"read {m['plate']} ({m['type_code']})")
+        if len(report["mismatches"]) > 20:
+            print(f"  ... {len(report['mismatches']) - 20} more in the JSON report")
+
+
+def main():
+    args = parse_args()
+    corpus = load_corpus(args.images, args.labels, args.limit)
+    if not corpus:
+        raise SystemExit(f"No images in {args.images}")
+
+    from app.services.plate_recognition import get_ocr_reader
+
+    # The recognizer prints every pass; keep the report readable
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        started = time.perf_counter()
+        reader = get_ocr_reader()
+        model_load_ms = (time.perf_counter() - started) * 1000
+        if reader is False:
+            raise SystemExit("EasyOCR is not available, nothing to benchmark")
+        results = evaluate(corpus)
+
+    report = {
+        "settings": {
+            "images": os.path.abspath(args.images),
+            "labels": args.labels,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        },
+        **build_report(results, model_load_ms),
+        "results": results,
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, previous)
+
+
+if __name__ == "__main__":
+    main()
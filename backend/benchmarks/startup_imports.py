@@ -0,0 +1,143 @@
+"""
+Startup Import Profile
+Reports what importing the app costs, module by module
+
+Imports the app module in a fresh interpreter with `python -X importtime`
+(best of --runs), and reports:
+
+    import_ms   time to import the module, interpreter start excluded
+    wall_ms     process start to exit
+    imports     the module's direct imports, slowest first (cumulative)
+    app         app.* modules, slowest first
+    heavy       OpenCV, NumPy, PIL, EasyOCR, torch or qrcode if they were
+                loaded at all: none of them should be for an API-only process
+
+The database is not touched, but DATABASE_URL must name an installed
+driver (sqlite:///... works anywhere).
+
+Usage:
+    python benchmarks/startup_imports.py
+    python benchmarks/startup_imports.py --module app.main --runs 5 --top 20
+    python benchmarks/startup_imports.py --json --output startup.json
+    python benchmarks/startup_imports.py --compare startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+HEAVY_MODULES = ("cv2", "numpy", "PIL", "easyocr", "torch", "qrcode")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Profile the import time of the app")
+    parser.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--runs", type=int, default=3, help="Imports to run; the fastest is reported")
+    parser.add_argument("--top", type=int, default=15, help="Modules to list per section")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--compare", help="Previous JSON report to show deltas against")
+    return parser.parse_args()
+
+
+def parse_importtime(stderr: str):
+    """[(name, depth, self_ms, cumulative_ms)] from -X importtime output, in import order"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us) / 1000, int(cumulative_us) / 1000))
+    return rows
+
+
+def profile_once(module: str):
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n" + "\n".join(proc.stderr.splitlines()[-15:]))
+    return wall_ms, parse_importtime(proc.stderr)
+
+
+def build_report(module: str, wall_ms: float, rows, top: int):
+    matches = [i for i, row in enumerate(rows) if row[0] == module]
+    if not matches:
+        raise SystemExit(f"{module} was already imported by the interpreter; nothing to profile")
+    index = matches[-1]
+    target = rows[index]
+    # A module is reported after everything it imported, which sits one level deeper
+    start = index
+    while start > 0 and rows[start - 1][1] > target[1]:
+        start -= 1
+    tree = rows[start:index]
+
+    def ranked(selected):
+        return [{"module": name, "cumulative_ms": round(cum, 1), "self_ms": round(own, 1)}
+                for name, _, own, cum in sorted(selected, key=lambda row: -row[3])[:top]]
+
+    return {
+        "module": module,
+        "import_ms": round(target[3], 1),
+        "wall_ms": round(wall_ms, 1),
+        "imports": ranked(row for row in tree if row[1] == target[1] + 1),
+        "app": ranked(row for row in tree if row[0].startswith("app.")),
+        "heavy": {name: round(cum, 1) for name, _, _, cum in tree if name in HEAVY_MODULES},
+    }
+
+
+def print_report(report, previous=None):
+    line = f"{report['module']}: import {report['import_ms']} ms, process {report['wall_ms']} ms"
+    if previous:
+        line += f"  (was {previous['import_ms']} ms / {previous['wall_ms']} ms)"
+    print(line)
+    if report["heavy"]:
+        print("Heavy modules loaded: " + ", ".join(f"{name} ({ms} ms)" for name, ms in report["heavy"].items()))
+    else:
+        print("Heavy modules loaded: none")
+    for title, key in (("Direct imports", "imports"), ("App modules", "app")):
+        print()
+        print(f"{title} (cumulative / self ms):")
+        for row in report[key]:
+            print(f"  {row['module']:<45} {row['cumulative_ms']:>8} {row['self_ms']:>8}")
+
+
+def main():
+    args = parse_args()
+    runs = [profile_once(args.module) for _ in range(max(args.runs, 1))]
+    reports = [build_report(args.module, wall_ms, rows, args.top) for wall_ms, rows in runs]
+
+    report = {
+        "settings": {
+            "runs": args.runs,
+            "python": sys.version.split()[0],
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        },
+        **min(reports, key=lambda r: r["import_ms"]),
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, previous)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Benchmark Statistics
+Percentile summaries shared by the benchmark scripts
+"""
+
+import math
+from typing import Dict, List, Optional
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(math.ceil(p * len(ordered) / 100) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(samples: List[float], digits: int = 2) -> Dict:
+    """Count, mean, p50/p95/p99 and max of a list of samples"""
+    def r(value):
+        return None if value is None else round(value, digits)
+
+    return {
+        "count": len(samples),
+        "mean": r(sum(samples) / len(samples)) if samples else None,
+        "p50": r(percentile(samples, 50)),
+        "p95": r(percentile(samples, 95)),
+        "p99": r(percentile(samples, 99)),
+        "max": r(max(samples)) if samples else None,
+    }
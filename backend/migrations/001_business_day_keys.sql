@@ -0,0 +1,24 @@
+-- Local business-day keys for report bucketing
+-- Apply once against parking_management_db. Values are maintained by the
+-- application on every write; this backfills existing rows.
+--
+-- The backfill uses a fixed offset for Asia/Colombo (UTC+05:30, no DST).
+-- Adjust the offset if BUSINESS_TIMEZONE is set to another zone.
+
+ALTER TABLE `payments`
+  ADD COLUMN `business_day` DATE NULL AFTER `timestamp`,
+  ADD KEY `ix_payments_business_day` (`business_day`);
+
+ALTER TABLE `parking_sessions`
+  ADD COLUMN `entry_day` DATE NULL,
+  ADD COLUMN `exit_day` DATE NULL,
+  ADD KEY `ix_parking_sessions_entry_day` (`entry_day`),
+  ADD KEY `ix_parking_sessions_exit_day` (`exit_day`);
+
+UPDATE `payments`
+  SET `business_day` = DATE(CONVERT_TZ(`timestamp`, '+00:00', '+05:30'))
+  WHERE `business_day` IS NULL;
+
+UPDATE `parking_sessions`
+  SET `entry_day` = DATE(CONVERT_TZ(`entry_time`, '+00:00', '+05:30')),
+      `exit_day` = DATE(CONVERT_TZ(`exit_time`, '+00:00', '+05:30'));
@@ -0,0 +1,62 @@
+-- Canonical plates and a unique plate key for vehicles
+-- Apply once against parking_management_db (MariaDB 10.4+ / MySQL 8+).
+-- The application stores plates in canonical form (WP-CAB-1234) and keeps
+-- plate_key (WPCAB1234) in sync on every write; this backfills existing
+-- rows and merges vehicles stored more than once under differently
+-- formatted plates ("wp cab 1234", "WPCAB1234", ...).
+--
+-- Back up first: for each plate the oldest vehicle row is kept, sessions,
+-- bookings and RFID links of the others are moved to it, and the others
+-- are deleted.
+
+ALTER TABLE `vehicles`
+  ADD COLUMN `plate_key` VARCHAR(20) NULL AFTER `plate_number`;
+
+UPDATE `vehicles`
+  SET `plate_key` = REGEXP_REPLACE(UPPER(`plate_number`), '[^A-Z0-9]', '');
+
+CREATE TEMPORARY TABLE `vehicle_merge` AS
+  SELECT v.`id` AS `duplicate_id`, k.`keep_id`
+  FROM `vehicles` v
+  JOIN (SELECT `plate_key`, MIN(`id`) AS `keep_id` FROM `vehicles` GROUP BY `plate_key`) k
+    ON k.`plate_key` = v.`plate_key`
+  WHERE v.`id` <> k.`keep_id`;
+
+UPDATE `parking_sessions` s
+  JOIN `vehicle_merge` m ON s.`vehicle_id` = m.`duplicate_id`
+  SET s.`vehicle_id` = m.`keep_id`;
+
+UPDATE `mobile_bookings` b
+  JOIN `vehicle_merge` m ON b.`vehicle_id` = m.`duplicate_id`
+  SET b.`vehicle_id` = m.`keep_id`;
+
+-- An account may be linked to several copies of one plate; keep only the
+-- link to the oldest copy so (account_id, vehicle_id) stays unique
+DELETE r FROM `rfid_vehicles` r
+  JOIN `vehicles` v ON v.`id` = r.`vehicle_id`
+  JOIN `rfid_vehicles` other ON other.`account_id` = r.`account_id`
+  JOIN `vehicles` ov ON ov.`id` = other.`vehicle_id`
+  WHERE ov.`plate_key` = v.`plate_key` AND ov.`id` < v.`id`;
+
+UPDATE `rfid_vehicles` r
+  JOIN `vehicle_merge` m ON r.`vehicle_id` = m.`duplicate_id`
+  SET r.`vehicle_id` = m.`keep_id`;
+
+DELETE v FROM `vehicles` v
+  JOIN `vehicle_merge` m ON v.`id` = m.`duplicate_id`;
+
+DROP TEMPORARY TABLE `vehicle_merge`;
+
+-- Same canonical form as services/plates.py
+UPDATE `vehicles`
+  SET `plate_number` = CASE
+    WHEN `plate_key` REGEXP '^[A-Z]{5}[0-9]{4}$'
+      THEN CONCAT(SUBSTRING(`plate_key`, 1, 2), '-', SUBSTRING(`plate_key`, 3, 3), '-', SUBSTRING(`plate_key`, 6))
+    WHEN `plate_key` REGEXP '^[A-Z]{2,3}[0-9]{4}$'
+      THEN CONCAT(LEFT(`plate_key`, CHAR_LENGTH(`plate_key`) - 4), '-', RIGHT(`plate_key`, 4))
+    ELSE UPPER(TRIM(`plate_number`))
+  END;
+
+ALTER TABLE `vehicles`
+  MODIFY `plate_key` VARCHAR(20) NOT NULL,
+  ADD UNIQUE KEY `ux_vehicles_plate_key` (`plate_key`);
@@ -0,0 +1,14 @@
+-- Spot layout for assignment strategies
+-- Apply once against parking_management_db. Columns are set per spot by the
+-- admin (PUT /admin/spots/{id} with zone, level, distance_rank); until then
+-- every spot is on level 0 in no zone, unranked spots are assigned in id
+-- order, so behaviour is unchanged.
+--
+-- distance_rank orders spots by driving distance from the entrance gate
+-- (1 = closest). Ranks only need to be ordered, not consecutive.
+
+ALTER TABLE `parking_spots`
+  ADD COLUMN `zone` VARCHAR(20) NULL AFTER `booking`,
+  ADD COLUMN `level` INT(11) NOT NULL DEFAULT 0 AFTER `zone`,
+  ADD COLUMN `distance_rank` INT(11) NULL AFTER `level`,
+  ADD KEY `ix_parking_spots_free` (`type_id`, `is_occupied`, `booking`);
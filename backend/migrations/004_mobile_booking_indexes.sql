@@ -0,0 +1,13 @@
+-- Indexes for the per-user booking endpoints
+-- Apply once against parking_management_db.
+--
+-- GET /mobile/bookings/active reads a user's bookings that are neither
+-- cancelled nor checked in and expire after now: one range scan of
+-- ix_mobile_bookings_user_state.
+-- GET /mobile/bookings/history pages through a user's bookings newest
+-- first with a (expires_at, id) cursor: ix_mobile_bookings_user_expires
+-- serves both the filter and the order, so each page reads only its rows.
+
+ALTER TABLE `mobile_bookings`
+  ADD KEY `ix_mobile_bookings_user_state` (`user_id`, `is_cancelled`, `is_checked_in`, `expires_at`),
+  ADD KEY `ix_mobile_bookings_user_expires` (`user_id`, `expires_at`, `id`);
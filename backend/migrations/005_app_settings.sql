@@ -0,0 +1,13 @@
+-- Settings the application stores for all of its processes
+-- Apply once against parking_management_db.
+--
+-- bcrypt_rounds: the password hashing cost measured on the first API start
+-- (services/passwords.py). Delete the row to have the next start measure
+-- again, e.g. after moving to other hardware; BCRYPT_ROUNDS overrides it.
+
+CREATE TABLE IF NOT EXISTS `app_settings` (
+  `key` VARCHAR(50) NOT NULL,
+  `value` VARCHAR(255) NOT NULL,
+  `updated_at` DATETIME NULL,
+  PRIMARY KEY (`key`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
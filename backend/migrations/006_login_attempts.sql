@@ -0,0 +1,18 @@
+-- Login rate limits shared by every API process
+-- Apply once against parking_management_db.
+--
+-- services/passwords.py records each login or registration attempt here
+-- (account NULL) and each failed login with its account, and counts them
+-- over LOGIN_IP_WINDOW / LOGIN_FAILURE_WINDOW, so the limits hold however
+-- many API workers and replicas run. Rows older than both windows are
+-- deleted as logins come in.
+
+CREATE TABLE IF NOT EXISTS `login_attempts` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `ip` VARCHAR(45) NOT NULL,
+  `account` VARCHAR(120) NULL,
+  `attempted_at` DATETIME NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `ix_login_attempts_ip` (`ip`, `account`, `attempted_at`),
+  KEY `ix_login_attempts_time` (`attempted_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
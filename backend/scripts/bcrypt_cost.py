@@ -0,0 +1,47 @@
+"""
+bcrypt Cost Picker
+Times bcrypt on this host and prints the cost it can afford
+
+The first API process to start measures this itself and stores it in
+app_settings (services/passwords.py). Use this script to see the figure,
+to store a new one after moving to other hardware (--store), or to pick a
+BCRYPT_ROUNDS that overrides the stored cost.
+
+Usage:
+    python scripts/bcrypt_cost.py
+    python scripts/bcrypt_cost.py --target-ms 250 --min-rounds 10 --max-rounds 16
+    python scripts/bcrypt_cost.py --store     # API processes use it from their next start
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.passwords import BCRYPT_TARGET_MS, _bcrypt_ms, pick_bcrypt_rounds, store_bcrypt_rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick a bcrypt cost for this host")
+    parser.add_argument("--target-ms", type=float, default=BCRYPT_TARGET_MS, help="Longest acceptable hash time")
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    parser.add_argument("--store", action="store_true", help="Save it as the cost of every API process")
+    args = parser.parse_args()
+
+    rounds = pick_bcrypt_rounds(args.target_ms, args.min_rounds, args.max_rounds)
+    print(f"Cost {rounds}: one hash takes {_bcrypt_ms(rounds):.0f} ms here (target {args.target_ms:g} ms)")
+    print(f"BCRYPT_ROUNDS={rounds}")
+    if args.store:
+        from app.db.database import SessionLocal
+
+        with SessionLocal() as db:
+            store_bcrypt_rounds(db, rounds, replace=True)
+        print("Stored; API processes use it from their next start")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Database Schema Setup
+Creates the tables of the SQLAlchemy models that are missing from DATABASE_URL
+
+The API does not touch the schema when it starts (unless
+AUTO_CREATE_SCHEMA=1), so run this once when setting up a database, before
+starting the API. Existing tables are left as they are: apply
+migrations/*.sql in order for columns and keys added since the database
+was created.
+
+Usage:
+    python scripts/init_db.py
+    python scripts/init_db.py --check     # list missing tables, change nothing
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import inspect
+
+from app.db import models
+from app.db.database import engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create missing tables from the models")
+    parser.add_argument("--check", action="store_true", help="Only list missing tables")
+    args = parser.parse_args()
+
+    existing = set(inspect(engine).get_table_names())
+    missing = [table.name for table in models.Base.metadata.sorted_tables if table.name not in existing]
+    if not missing:
+        print("Schema is up to date: every model table exists")
+        return 0
+    print(f"Missing tables: {', '.join(missing)}")
+    if args.check:
+        return 1
+
+    models.Base.metadata.create_all(bind=engine)
+    print(f"Created {len(missing)} table(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Lane Simulation Harness
+Replays vehicle traffic against the gate workflows using the PLC simulator
+
+Starts one simulated PLC per PLC in config/plc_config.json on localhost,
+points the app's controllers at them, runs the lane state machines with a
+simulated OCR delay, and feeds each lane N vehicles/minute. Exit lanes are
+released after a simulated payment delay. Reports per-lane throughput and
+latency percentiles.
+
+Usage:
+    python scripts/simulate_lanes.py --rate 6 --duration 300
+    python scripts/simulate_lanes.py --rate 10 --lanes entry --ocr-ms 800 --json
+    python scripts/simulate_lanes.py --serve-only      # just run the simulated PLCs
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.stats import summarize
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulate lane traffic against the gate workflows")
+    parser.add_argument("--rate", type=float, default=6, help="Vehicles per minute per lane")
+    parser.add_argument("--duration", type=float, default=120, help="Seconds of arrivals")
+    parser.add_argument("--drain", type=float, default=60, help="Max seconds to let queues empty afterwards")
+    parser.add_argument("--lanes", help="Comma-separated lane ids (default: all lanes)")
+    parser.add_argument("--uniform", action="store_true", help="Evenly spaced arrivals instead of Poisson")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ocr-ms", type=float, default=400, help="Simulated OCR latency")
+    parser.add_argument("--payment-ms", type=float, default=3000, help="Simulated payment time at exit lanes")
+    parser.add_argument("--travel", type=float, default=3.0, help="Barrier travel time in seconds")
+    parser.add_argument("--pass-time", type=float, default=2.0, help="Seconds a vehicle occupies the sensor")
+    parser.add_argument("--headway", type=float, default=1.0, help="Seconds before the next vehicle pulls up")
+    parser.add_argument("--close-delay", type=float, default=2.0, help="Seconds the gate stays up after clearing")
+    parser.add_argument("--port", type=int, default=5020, help="First local port for simulated PLCs")
+    parser.add_argument("--serve-only", action="store_true", help="Run the simulated PLCs without traffic")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args()
+
+
+def simulated_config(base_port: int):
+    """Site config with every PLC moved to a local simulator port"""
+    from app.services.plc_controller import load_plc_config, plc_settings
+
+    config = load_plc_config()
+    ports = {}
+    for i, name in enumerate(plc_settings(config)):
+        ports[name] = base_port + i
+        section = config.setdefault("plc", {}) if name == "default" else config["plcs"][name]
+        section.update({"host": "127.0.0.1", "port": ports[name], "enabled": True})
+    return config, ports
+
+
+async def release_after_payment(workflow, payment_s, stop):
+    from app.services.lane_workflow import RECOGNIZED, VEHICLE_PRESENT
+
+    while not stop.is_set():
+        result = await workflow.wait_for(RECOGNIZED, timeout=1)
+        # Vehicles that followed through an open gate have nothing to pay for here
+        if result and result.get("success") and workflow.state == VEHICLE_PRESENT:
+            await asyncio.sleep(payment_s)
+            await workflow.command("release")
+
+
+async def feed(sim, lane_id, offsets, started):
+    for offset in offsets:
+        await asyncio.sleep(max(started + offset - time.monotonic(), 0))
+        sim.arrive(lane_id)
+
+
+async def run(args):
+    config, ports = simulated_config(args.port)
+    config_file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+    json.dump(config, config_file)
+    config_file.close()
+    from app.services import plc_controller
+    from app.services.lanes import LaneRegistry, get_lane_registry
+    from app.services.lane_workflow import LaneWorkflows
+    from app.services.plc_controller import get_plc_link_status, plc_settings
+    from app.services.plc_poller import shutdown_plc_poller
+    from app.services.plc_simulator import PLCSimulator, arrival_times
+
+    # Start the simulated PLCs before any controller tries to connect
+    settings = plc_settings(config)
+    simulators = {}
+    for plc_name, lanes in LaneRegistry.from_config(config).by_plc().items():
+        simulators[plc_name] = PLCSimulator(
+            lanes, port=ports[plc_name], unit_id=settings[plc_name].get("unit_id", 1),
+            travel_time=args.travel, pass_time=args.pass_time, headway=args.headway
+        )
+        await simulators[plc_name].start()
+
+    # Controllers and lanes are created from this config from here on
+    plc_controller.PLC_CONFIG_PATH = config_file.name
+    registry = get_lane_registry()
+    sim_for_lane = {lane_id: simulators[lane.plc_name] for lane_id, lane in registry.lanes.items()}
+
+    if args.serve_only:
+        print(f"Simulated PLCs: {ports}. Ctrl+C to stop.")
+        await asyncio.Event().wait()
+
+    async def recognize(lane):
+        await asyncio.sleep(args.ocr_ms / 1000)
+        vehicle = sim_for_lane[lane.lane_id].vehicle_at_sensor(lane.lane_id)
+        return {"plate_number": vehicle.plate_number if vehicle else None, "type_code": "CAR"}
+
+    workflows = LaneWorkflows(registry, recognize)
+    for workflow in workflows.workflows.values():
+        workflow.close_delay = args.close_delay
+    await workflows.start()
+
+    lane_ids = args.lanes.split(",") if args.lanes else list(registry.lanes)
+    stop = asyncio.Event()
+    started = time.monotonic()
+    tasks = []
+    for i, lane_id in enumerate(lane_ids):
+        offsets = arrival_times(args.rate, args.duration, poisson=not args.uniform, seed=args.seed + i)
+        tasks.append(asyncio.create_task(feed(sim_for_lane[lane_id], lane_id, offsets, started)))
+        if registry.get(lane_id).direction == "exit":
+            tasks.append(asyncio.create_task(
+                release_after_payment(workflows.get(lane_id), args.payment_ms / 1000, stop)))
+
+    await asyncio.sleep(args.duration)
+    drain_until = time.monotonic() + args.drain
+    while time.monotonic() < drain_until:
+        if all(sim_for_lane[l].stats()[l]["queued"] == 0 for l in lane_ids):
+            break
+        await asyncio.sleep(0.2)
+    elapsed = time.monotonic() - started
+
+    stop.set()
+    report = {"settings": vars(args), "elapsed_seconds": round(elapsed, 1), "lanes": {}}
+    for lane_id in lane_ids:
+        sim = sim_for_lane[lane_id]
+        done = sim.lanes[lane_id].completed
+        report["lanes"][lane_id] = {
+            **sim.stats()[lane_id],
+            "vehicles_per_hour": round(len(done) / elapsed * 3600, 1),
+            "wait_seconds": summarize([v.wait_time for v in done], digits=3),
+            "service_seconds": summarize([v.service_time for v in done], digits=3),
+            "total_seconds": summarize([v.total_time for v in done], digits=3),
+        }
+    report["plc_links"] = get_plc_link_status()
+
+    for task in tasks:
+        task.cancel()
+    await workflows.stop()
+    await shutdown_plc_poller()
+    for sim in simulators.values():
+        await sim.stop()
+    os.unlink(config_file.name)
+    return report
+
+
+def print_report(report):
+    print("=" * 60)
+    print(f"LANE SIMULATION ({report['elapsed_seconds']}s)")
+    print("=" * 60)
+    for lane_id, lane in report["lanes"].items():
+        print(f"{lane_id}: {lane['completed']} vehicles, {lane['vehicles_per_hour']} veh/h, "
+              f"{lane['queued']} still queued, {lane['safety_reversals']} safety reversals")
+        for metric in ("wait_seconds", "service_seconds", "total_seconds"):
+            s = lane[metric]
+            print(f"  {metric:<16} p50={s['p50']}  p95={s['p95']}  p99={s['p99']}  max={s['max']}")
+    for name, link in (report["plc_links"] or {}).items():
+        m = link["metrics"]
+        print(f"PLC {name}: {m['requests']} requests, {m['failures']} failures, "
+              f"avg {m['latency_ms']['avg']}ms, max {m['latency_ms']['max']}ms")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        report = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\nSimulation interrupted")
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
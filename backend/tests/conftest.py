@@ -0,0 +1,69 @@
+"""
+Shared test setup
+
+Tests run against an in-memory SQLite database, so no MariaDB is needed.
+DATABASE_URL has to be set before app.db.database is first imported.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest
+
+
+@pytest.fixture
+def db():
+    """Session on a fresh in-memory schema"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.db import models
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def make_booking(db):
+    """Create a mobile booking on a reserved spot with a signed QR token; returns the booking"""
+    from datetime import datetime, timedelta, timezone
+
+    from app.db.models import MobileBooking, MobileUser, ParkingSpot, Vehicle, VehicleType
+    from app.services.booking_tokens import issue_booking_token
+
+    counter = iter(range(1, 1000))
+
+    def make(plate="WP-CAB-1234", minutes=15, username="driver"):
+        n = next(counter)
+        car = db.query(VehicleType).filter(VehicleType.code == "CAR").first()
+        if car is None:
+            car = VehicleType(code="CAR", name="Car")
+            db.add(car)
+        user = db.query(MobileUser).filter(MobileUser.username == username).first()
+        if user is None:
+            user = MobileUser(username=username, email=f"{username}@example.com", password_hash="x",
+                              full_name=username.title(), phone="0770000000")
+            db.add(user)
+        db.flush()
+        vehicle = Vehicle(plate_number=plate, type_id=car.id)
+        spot = ParkingSpot(label=f"B{n}", type_id=car.id, booking=True)
+        db.add_all([vehicle, spot])
+        db.flush()
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+        booking = MobileBooking(
+            id=f"BK{n}", user_id=user.id, vehicle_id=vehicle.id, spot_id=spot.id,
+            start_time=expires_at - timedelta(minutes=15), expires_at=expires_at,
+            qr_code_data=issue_booking_token(f"BK{n}", vehicle.plate_key, spot.id, spot.label, car.code, expires_at)
+        )
+        db.add(booking)
+        db.commit()
+        return booking
+    return make
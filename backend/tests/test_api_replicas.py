@@ -0,0 +1,128 @@
+"""
+API processes sharing one database
+
+Each case starts real uvicorn servers on a SQLite file: two replicas on
+their own ports, or one server with two workers. Whichever process
+serves a request, it sees what the others wrote.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from passlib.context import CryptContext
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("uvicorn")
+
+BACKEND = Path(__file__).resolve().parents[1]
+PASSWORD = "correct horse"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Session on a fresh schema in a file the API processes open too (replaces the in-memory one)"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db import models
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'parking.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def serve(db):
+    """Start an API server on the test database; returns its base URL"""
+    servers = []
+
+    def start(workers=1):
+        port = free_port()
+        env = dict(os.environ, DATABASE_URL=str(db.get_bind().url), APP_MODE="api", BCRYPT_ROUNDS="4",
+                   LOGIN_MAX_FAILURES="2", AUTO_CREATE_SCHEMA="0")
+        for name in ("OCR_WORKER_URL", "GATE_CONTROLLER_URL"):
+            env.pop(name, None)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers)],
+            cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        servers.append(server)
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{url}/docs", timeout=1).status_code == 200:
+                    return url
+            except httpx.HTTPError:
+                pass
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise AssertionError(f"API on port {port} did not start")
+            time.sleep(0.1)
+
+    yield start
+    for server in servers:
+        server.terminate()
+    for server in servers:
+        server.wait(timeout=10)
+
+
+@pytest.fixture(params=["replicas", "workers"])
+def api_pair(request, serve):
+    """Two ways in: separate replicas, or one port served by two uvicorn workers"""
+    if request.param == "replicas":
+        return serve(), serve()
+    url = serve(workers=2)
+    return url, url
+
+
+@pytest.fixture
+def booking(db, make_booking):
+    booking = make_booking()
+    booking.user.password_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash(PASSWORD)
+    db.commit()
+    return booking
+
+
+def login(url, password=PASSWORD):
+    return httpx.post(f"{url}/mobile/login", json={"username": "driver", "password": password})
+
+
+def test_booking_cancelled_on_one_process_is_cancelled_on_the_other(booking, api_pair):
+    first, second = api_pair
+    headers = {"Authorization": f"Bearer {login(first).json()['token']}"}
+
+    waiting = httpx.get(f"{second}/mobile/check-entry/{booking.id}", headers=headers)
+    assert waiting.json()["has_entered"] is False
+    active = httpx.get(f"{second}/mobile/bookings/active", headers=headers).json()["active_bookings"]
+    assert [b["id"] for b in active] == [booking.id]
+
+    assert httpx.post(f"{first}/mobile/bookings/{booking.id}/cancel", headers=headers).json()["success"] is True
+
+    assert httpx.get(f"{second}/mobile/bookings/active", headers=headers).json()["active_bookings"] == []
+    checkin = httpx.post(f"{second}/mobile/bookings/{booking.id}/checkin", headers=headers,
+                         json={"plate_number": "WP-CAB-1234"})
+    assert (checkin.status_code, checkin.json()["detail"]) == (400, "Booking was cancelled")
+
+
+def test_login_lockout_holds_on_every_process(booking, api_pair):
+    first, second = api_pair
+    assert [login(first, "wrong").status_code for _ in range(2)] == [401, 401]
+    locked = login(second)
+    assert locked.status_code == 429
+    assert int(locked.headers["Retry-After"]) > 0
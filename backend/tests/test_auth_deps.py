@@ -0,0 +1,109 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.db.database import get_db
+from app.routers import auth_deps, mobile_api
+from app.routers.auth_deps import (ALGORITHM, JWT_SECRET, MOBILE_ROLE, ClaimsCache, MobilePrincipal, StaffPrincipal,
+                                   get_claims, get_mobile_user, get_staff)
+
+
+def token(**claims):
+    claims.setdefault("exp", datetime.now(timezone.utc) + timedelta(hours=1))
+    return jwt.encode(claims, JWT_SECRET, algorithm=ALGORITHM)
+
+
+@pytest.fixture(autouse=True)
+def fresh_claims_cache(monkeypatch):
+    monkeypatch.setattr(auth_deps, "claims_cache", ClaimsCache(max_size=4, ttl=60))
+
+
+def status_of(coro):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(coro)
+    return raised.value.status_code
+
+
+def test_claims_are_verified_once_then_cached(monkeypatch):
+    raw = token(sub="alice", role="Admin")
+    assert asyncio.run(get_claims(raw))["sub"] == "alice"
+
+    def no_decode(*args, **kwargs):
+        raise AssertionError("decoded twice")
+    monkeypatch.setattr(auth_deps.jwt, "decode", no_decode)
+    assert asyncio.run(get_claims(raw))["role"] == "Admin"
+
+
+def test_forged_and_expired_tokens_are_401():
+    forged = jwt.encode({"sub": "alice", "role": "Admin"}, "other secret", algorithm=ALGORITHM)
+    assert status_of(get_claims(forged)) == 401
+    assert status_of(get_claims(token(sub="alice", exp=datetime.now(timezone.utc) - timedelta(seconds=1)))) == 401
+
+
+def test_cached_claims_expire_with_the_token():
+    raw = token(sub="alice", role="Admin", exp=int(time.time()) + 1)
+    asyncio.run(get_claims(raw))
+    key = next(iter(auth_deps.claims_cache._items))
+    claims, _ = auth_deps.claims_cache.get(key)
+    auth_deps.claims_cache._items[key] = (claims, time.time() - 1)
+    assert status_of(get_claims(raw)) == 401
+    assert auth_deps.claims_cache.get(key) is None
+
+
+def test_cache_keeps_most_recent_tokens():
+    cache = ClaimsCache(max_size=2, ttl=60)
+    for key in (b"a", b"b", b"c"):
+        cache.put(key, {"sub": key.decode()})
+    assert cache.get(b"a") is None
+    assert cache.get(b"c")[0] == {"sub": "c"}
+
+
+def test_principals_by_role():
+    assert asyncio.run(get_staff({"sub": "alice", "role": "Controller"})) == StaffPrincipal("alice", "Controller")
+    assert status_of(get_staff({"sub": "alice"})) == 401
+    assert status_of(get_staff({"sub": "bob", "role": MOBILE_ROLE, "user_id": 1})) == 403
+    assert asyncio.run(get_mobile_user({"sub": "bob", "role": MOBILE_ROLE, "user_id": 1})) == MobilePrincipal(1, "bob")
+    assert status_of(get_mobile_user({"sub": "alice", "role": "Admin"})) == 403
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(mobile_api.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+STAFF = {"Authorization": f"Bearer {token(sub='gate', role='Controller')}"}
+MOBILE = {"Authorization": f"Bearer {token(sub='driver', role=MOBILE_ROLE, user_id=1)}"}
+
+
+@pytest.mark.parametrize("headers, status", [({}, 401), (MOBILE, 403)])
+def test_gate_lookups_need_staff(client, make_booking, headers, status):
+    booking = make_booking()
+    search = client.get("/mobile/bookings/search-by-plate", params={"plate_number": "WPCAB1234"}, headers=headers)
+    validate = client.post("/mobile/validate-qr", json={"qr_data": booking.qr_code_data}, headers=headers)
+    assert (search.status_code, validate.status_code) == (status, status)
+
+
+def test_plate_search_returns_booking_without_its_qr(client, make_booking):
+    booking = make_booking()
+    response = client.get("/mobile/bookings/search-by-plate", params={"plate_number": "wp cab 1234"}, headers=STAFF)
+    assert response.status_code == 200
+    body = response.json()
+    assert "qr_code_data" not in body
+    assert booking.qr_code_data not in response.text
+    assert body["valid"] is True
+    assert (body["booking_id"], body["plate_number"], body["vehicle_type"]["code"]) == (booking.id, "WP-CAB-1234", "CAR")
+
+
+def test_staff_can_validate_a_qr(client, make_booking):
+    booking = make_booking()
+    response = client.post("/mobile/validate-qr", json={"qr_data": booking.qr_code_data}, headers=STAFF)
+    assert response.status_code == 200
+    assert response.json()["valid"] is True
@@ -0,0 +1,22 @@
+from benchmarks.stats import percentile, summarize
+
+
+def test_nearest_rank_percentiles():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+
+
+def test_percentile_of_few_samples_is_a_sample():
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([5, 1, 3], 50) == 3
+    assert percentile([], 50) is None
+
+
+def test_summarize_rounds_and_handles_no_samples():
+    assert summarize([0.1234, 0.5678], digits=3) == {
+        "count": 2, "mean": 0.346, "p50": 0.123, "p95": 0.568, "p99": 0.568, "max": 0.568,
+    }
+    assert summarize([]) == {"count": 0, "mean": None, "p50": None, "p95": None, "p99": None, "max": None}
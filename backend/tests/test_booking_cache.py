@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import MobileBooking, ParkingSpot
+from app.routers import mobile_api
+from app.routers.auth_deps import MobilePrincipal
+from app.services.booking_cache import get_booking
+
+def test_record_is_read_once_per_transaction(db, make_booking):
+    booking = make_booking()
+    record = get_booking(db, booking.id)
+    assert record.status == "active"
+    assert get_booking(db, booking.id) is record
+    db.commit()
+    assert get_booking(db, booking.id) is not record
+
+
+def test_missing_booking_is_none(db, make_booking):
+    assert get_booking(db, "BK999") is None
+
+
+def test_own_writes_are_read_back_at_once(db, make_booking):
+    booking = make_booking()
+    assert get_booking(db, booking.id).status == "active"
+    booking.is_cancelled = True
+    db.flush()
+    assert get_booking(db, booking.id).status == "cancelled"
+    db.rollback()
+    assert get_booking(db, booking.id).status == "active"
+
+
+def test_writes_of_other_workers_are_seen_by_the_next_request(db, make_booking):
+    booking = make_booking()
+    assert get_booking(db, booking.id).status == "active"
+    written_elsewhere(db, booking.id, is_checked_in=True)
+    db.commit()  # end of the request
+    assert get_booking(db, booking.id).status == "checked_in"
+
+
+def checkin(db, booking_id, user_id=1, plate="WP-CAB-1234"):
+    return asyncio.run(mobile_api.checkin_booking(
+        booking_id, mobile_api.CheckinRequest(plate_number=plate), MobilePrincipal(user_id, "driver"), db))
+
+
+def cancel(db, booking_id, user_id=1):
+    return asyncio.run(mobile_api.cancel_booking(booking_id, MobilePrincipal(user_id, "driver"), db))
+
+
+def error(call):
+    with pytest.raises(HTTPException) as raised:
+        call()
+    return raised.value.status_code, raised.value.detail
+
+
+def written_elsewhere(db, booking_id, **values):
+    """Change a booking through a session of its own, as another worker would"""
+    other = sessionmaker(bind=db.get_bind())()
+    try:
+        other.query(MobileBooking).filter(MobileBooking.id == booking_id).update(values, synchronize_session=False)
+        other.commit()
+    finally:
+        other.close()
+
+
+@pytest.mark.parametrize("action", [checkin, cancel])
+def test_unknown_or_foreign_booking_is_404(db, make_booking, action):
+    booking = make_booking()
+    assert error(lambda: action(db, "BK999")) == (404, "Booking not found")
+    assert error(lambda: action(db, booking.id, user_id=2)) == (404, "Booking not found")
+
+
+def test_check_in_decides_on_the_row_not_a_stale_cache(db, make_booking):
+    booking = make_booking()
+    get_booking(db, booking.id)
+    written_elsewhere(db, booking.id, is_cancelled=True)
+    assert get_booking(db, booking.id).is_cancelled is False  # read earlier in this transaction
+    assert error(lambda: checkin(db, booking.id)) == (400, "Booking was cancelled")
+
+
+def test_cancel_decides_on_the_row_not_a_stale_cache(db, make_booking):
+    booking = make_booking()
+    get_booking(db, booking.id)
+    written_elsewhere(db, booking.id, is_checked_in=True)
+    assert error(lambda: cancel(db, booking.id)) == (400, "Cannot cancel checked-in booking")
+
+
+def test_check_in_after_entry(db, make_booking):
+    booking = make_booking()
+    assert error(lambda: checkin(db, booking.id))[0] == 400  # not through the gate yet
+    assert error(lambda: checkin(db, booking.id, plate="CAB-9999"))[0] == 400
+
+    db.get(ParkingSpot, booking.spot_id).is_occupied = True
+    db.commit()
+    assert checkin(db, booking.id)["success"] is True
+    assert get_booking(db, booking.id).status == "checked_in"
+    assert error(lambda: checkin(db, booking.id)) == (400, "Already checked in")
+
+
+def test_cancel_frees_the_spot(db, make_booking):
+    booking = make_booking()
+    assert cancel(db, booking.id)["success"] is True
+    spot = db.get(ParkingSpot, booking.spot_id)
+    assert not spot.booking and not spot.is_occupied
+    assert get_booking(db, booking.id).status == "cancelled"
+    assert error(lambda: cancel(db, booking.id)) == (400, "Booking already cancelled")
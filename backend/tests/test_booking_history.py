@@ -0,0 +1,58 @@
+import asyncio
+import base64
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers import mobile_api
+from app.routers.auth_deps import MobilePrincipal
+
+
+def history(db, limit, cursor=None, user_id=1):
+    return asyncio.run(mobile_api.get_booking_history(MobilePrincipal(user_id, "driver"), limit, cursor, db))
+
+
+@pytest.fixture
+def bookings(db, make_booking):
+    made = [make_booking(plate=f"CAB-{n:04d}", minutes=15 + n) for n in range(5)]
+    # Two bookings expiring at the same moment are ordered by id
+    made[2].expires_at = made[3].expires_at
+    db.commit()
+    return made
+
+
+def test_pages_walk_every_booking_newest_first(db, bookings):
+    seen, cursor = [], None
+    while True:
+        page = history(db, limit=2, cursor=cursor)
+        seen.extend(b["id"] for b in page["bookings"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["BK5", "BK4", "BK3", "BK2", "BK1"]
+
+
+def test_last_page_has_no_cursor(db, bookings):
+    page = history(db, limit=5)
+    assert len(page["bookings"]) == 5
+    assert page["next_cursor"] is None
+
+
+def test_bookings_of_other_users_are_not_listed(db, bookings, make_booking):
+    make_booking(plate="CAB-9999", username="other")
+    assert [b["id"] for b in history(db, limit=10)["bookings"]] == ["BK5", "BK4", "BK3", "BK2", "BK1"]
+
+
+def test_cursor_is_expiry_and_id_of_last_row(db, bookings):
+    cursor = history(db, limit=1)["next_cursor"]
+    expires_at, booking_id = mobile_api._parse_history_cursor(cursor)
+    assert booking_id == "BK5"
+    assert expires_at.replace(tzinfo=None) == bookings[4].expires_at.replace(tzinfo=None)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", base64.urlsafe_b64encode(b"no separator").decode(),
+                                    base64.urlsafe_b64encode(b"yesterday|BK1").decode()])
+def test_bad_cursor_is_400(db, bookings, cursor):
+    with pytest.raises(HTTPException) as raised:
+        history(db, limit=2, cursor=cursor)
+    assert raised.value.status_code == 400
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.routers import mobile_api
+from app.routers.auth_deps import StaffPrincipal
+from app.services.booking_tokens import BookingTokenError, is_booking_token, issue_booking_token, verify_booking_token
+
+EXPIRES = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+def token(**overrides):
+    fields = dict(booking_id="BK1", plate_key="WPCAB1234", spot_id=7, spot_label="C7", type_code="CAR",
+                  expires_at=EXPIRES)
+    fields.update(overrides)
+    return issue_booking_token(**fields)
+
+
+def test_token_round_trips_its_claims():
+    claims = verify_booking_token(token(), now=EXPIRES - timedelta(minutes=1))
+    assert (claims.booking_id, claims.plate_key, claims.spot_id, claims.spot_label, claims.type_code) == \
+        ("BK1", "WPCAB1234", 7, "C7", "CAR")
+    assert claims.expires_at == EXPIRES
+    assert is_booking_token(token())
+    assert not is_booking_token("BOOKING-BK1-WP-CAB-1234-C7")
+
+
+def test_tampered_payload_fails_signature():
+    prefix, _, signature = token().split(".")
+    _, other_payload, _ = token(spot_id=8).split(".")
+    with pytest.raises(BookingTokenError, match="signature"):
+        verify_booking_token(f"{prefix}.{other_payload}.{signature}", now=EXPIRES)
+
+
+@pytest.mark.parametrize("bad", ["BK1", "BK1.abc", "BK1.a.b.c", "BK1.!!!.???"])
+def test_malformed_tokens_are_refused(bad):
+    with pytest.raises(BookingTokenError):
+        verify_booking_token(bad, now=EXPIRES)
+
+
+def test_other_prefix_is_refused():
+    _, payload, signature = token().split(".")
+    with pytest.raises(BookingTokenError):
+        verify_booking_token(f"BK2.{payload}.{signature}", now=EXPIRES)
+
+
+def test_expired_token_is_refused():
+    with pytest.raises(BookingTokenError, match="expired"):
+        verify_booking_token(token(), now=EXPIRES + timedelta(seconds=1))
+
+
+def test_separator_in_fields_is_rejected_at_issue():
+    with pytest.raises(ValueError):
+        token(spot_label="C|7")
+
+
+def validate(db, qr_data):
+    return asyncio.run(mobile_api.validate_qr(mobile_api.QRValidateRequest(qr_data=qr_data),
+                                              StaffPrincipal("gate", "Controller"), db))
+
+
+def test_gate_accepts_a_live_booking(db, make_booking):
+    booking = make_booking()
+    result = validate(db, booking.qr_code_data)
+    assert result["valid"] is True
+    assert result["booking_id"] == booking.id
+    assert result["plate_number"] == "WP-CAB-1234"
+
+
+def test_cancelled_booking_qr_is_refused(db, make_booking):
+    booking = make_booking()
+    booking.is_cancelled = True
+    db.commit()
+    assert validate(db, booking.qr_code_data) == {"valid": False, "message": "Booking was cancelled"}
+
+
+def test_qr_cannot_be_replayed_after_check_in(db, make_booking):
+    booking = make_booking()
+    assert validate(db, booking.qr_code_data)["valid"] is True
+    booking.is_checked_in = True
+    booking.checked_in_at = datetime.now(timezone.utc)
+    db.commit()
+    assert validate(db, booking.qr_code_data) == {"valid": False, "message": "Booking was already used to enter"}
+
+
+def test_qr_for_deleted_booking_is_refused(db, make_booking):
+    booking = make_booking()
+    qr = booking.qr_code_data
+    db.delete(booking)
+    db.commit()
+    assert validate(db, qr) == {"valid": False, "message": "Booking not found"}
+
+
+def test_old_format_qr_cannot_be_replayed_after_check_in(db, make_booking):
+    booking = make_booking()
+    qr = f"BOOKING-{booking.id}-WP-CAB-1234-{booking.spot.label}"
+    assert validate(db, qr)["valid"] is True
+    booking.is_checked_in = True
+    db.commit()
+    assert validate(db, qr)["valid"] is False
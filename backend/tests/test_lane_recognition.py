@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.services import camera, lane_workflow, run_mode
+from app.services.lanes import ENTRY, Lane
+
+
+def lane(camera_id="camera1"):
+    return Lane(lane_id="entry", direction=ENTRY, name="Entry", plc_name="default", camera=camera_id,
+                open_coil=0, close_coil=1, open_status=0, closed_status=1, vehicle_sensor=2)
+
+
+class FakeOCR:
+    def __init__(self, result):
+        self.result = result
+        self.images = []
+
+    async def recognize(self, image):
+        self.images.append(image)
+        return self.result
+
+
+@pytest.fixture
+def ocr(monkeypatch):
+    def install(result):
+        fake = FakeOCR(result)
+        monkeypatch.setattr(run_mode, "get_ocr", lambda: fake)
+        return fake
+    return install
+
+
+def test_captured_frame_goes_through_ocr(monkeypatch, ocr):
+    monkeypatch.setattr(camera, "capture_frame", lambda camera_id: f"jpeg:{camera_id}".encode())
+    fake = ocr({"plate": "WP CAB 1234", "type_code": None, "error": None})
+    result = asyncio.run(lane_workflow.recognize_plate(lane()))
+    assert fake.images == [b"jpeg:camera1"]
+    assert result == {"plate_number": "WP-CAB-1234", "type_code": "CAR"}
+
+
+def test_camera_failure_falls_back_to_manual(monkeypatch, ocr):
+    def broken(camera_id):
+        raise camera.CameraError("Could not open camera camera1")
+    monkeypatch.setattr(camera, "capture_frame", broken)
+    ocr({"plate": "WP-CAB-1234"})
+    assert asyncio.run(lane_workflow.recognize_plate(lane())) == {"plate_number": None, "type_code": "CAR"}
+
+
+def test_unexpected_errors_are_not_swallowed(monkeypatch, ocr):
+    def broken(camera_id):
+        raise ImportError("No module named 'cv2'")
+    monkeypatch.setattr(camera, "capture_frame", broken)
+    ocr({})
+    with pytest.raises(ImportError):
+        asyncio.run(lane_workflow.recognize_plate(lane()))
+
+
+def test_camera_source_from_config():
+    config = {"cameras": {"camera1": {"rtsp_url": "rtsp://cam/1", "enabled": True},
+                          "camera2": {"rtsp_url": "rtsp://cam/2", "enabled": False}}}
+    assert camera.camera_source("camera1", config) == "rtsp://cam/1"
+    assert camera.camera_source("0", config) == 0
+    with pytest.raises(camera.CameraError):
+        camera.camera_source("camera2", config)
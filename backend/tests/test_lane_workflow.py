@@ -0,0 +1,241 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import List
+
+from app.services import gate_manager
+from app.services.lane_workflow import (CLOSING, EMERGENCY_CLOSED, EMERGENCY_OPEN, IDLE, OPEN, OPENING,
+                                        RECOGNIZING, VEHICLE_CLEARED, VEHICLE_PRESENT, LaneWorkflow,
+                                        LaneWorkflows)
+from app.services.lanes import ENTRY, EXIT, Lane, LaneRegistry
+
+
+@dataclass
+class FakeLane(Lane):
+    """Lane whose gate commands are recorded instead of sent to a PLC"""
+    commands: List[str] = field(default_factory=list)
+
+    def open_gate(self) -> bool:
+        self.commands.append("open")
+        return True
+
+    def close_gate(self) -> bool:
+        self.commands.append("close")
+        return True
+
+
+def fake_lane(direction=ENTRY, lane_id=None, enabled=True):
+    return FakeLane(lane_id=lane_id or direction, direction=direction, name=direction.title(), plc_name="default",
+                    camera=None, open_coil=0, close_coil=1, open_status=0, closed_status=1, vehicle_sensor=2,
+                    enabled=enabled)
+
+
+def reader(plate="WP-CAB-1234", gate: asyncio.Event = None):
+    async def recognize(lane):
+        if gate is not None:
+            await gate.wait()
+        return {"plate_number": plate, "type_code": "CAR"}
+    return recognize
+
+
+async def reach(workflow, state, timeout=1.0):
+    """Let the lane task run until it is in `state`"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while workflow.state != state:
+        if loop.time() > deadline:
+            raise AssertionError(f"lane stuck in {workflow.state}, expected {state}")
+        await asyncio.sleep(0.005)
+
+
+def run(scenario):
+    async def main():
+        workflows = []
+        try:
+            await scenario(workflows)
+        finally:
+            for workflow in workflows:
+                await workflow.stop()
+    asyncio.run(main())
+
+
+def make(workflows, lane, recognize=None, **kwargs):
+    workflow = LaneWorkflow(lane, recognize or reader(), close_delay=0.01, **kwargs)
+    workflow.start()
+    workflows.append(workflow)
+    return workflow
+
+
+def visited(workflow):
+    return [entry["to"] for entry in workflow.history]
+
+
+def test_entry_cycle_follows_gate_feedback():
+    async def scenario(workflows):
+        lane = fake_lane(ENTRY)
+        workflow = make(workflows, lane)
+        workflow.post("vehicle_arrived")
+        await reach(workflow, OPENING)
+        workflow.post("gate_opened")
+        await reach(workflow, OPEN)
+        workflow.post("vehicle_left")
+        await reach(workflow, CLOSING)
+        workflow.post("gate_closed")
+        await reach(workflow, IDLE)
+
+        assert visited(workflow) == [VEHICLE_PRESENT, RECOGNIZING, OPENING, OPEN, VEHICLE_CLEARED, CLOSING, IDLE]
+        assert lane.commands == ["open", "close"]
+        assert workflow.last_result["success"] is True
+        assert workflow.last_result["plate_number"] == "WP-CAB-1234"
+    run(scenario)
+
+
+def test_entry_without_feedback_completes_on_commands():
+    async def scenario(workflows):
+        workflow = make(workflows, fake_lane(ENTRY, enabled=False))
+        workflow.post("vehicle_arrived")
+        await reach(workflow, OPEN)
+        workflow.post("vehicle_left")
+        await reach(workflow, IDLE)
+        assert visited(workflow)[-3:] == [VEHICLE_CLEARED, CLOSING, IDLE]
+    run(scenario)
+
+
+def test_exit_waits_for_release_and_closes_when_vehicle_passes():
+    async def scenario(workflows):
+        lane = fake_lane(EXIT)
+        workflow = make(workflows, lane)
+        workflow.post("vehicle_arrived")
+        await reach(workflow, VEHICLE_PRESENT)
+        await asyncio.sleep(0.02)
+        assert workflow.vehicle["plate_number"] == "WP-CAB-1234"
+        assert lane.commands == []
+
+        status = await workflow.command("release")
+        assert status["state"] == OPENING
+        workflow.post("gate_opened")
+        await reach(workflow, OPEN)
+        workflow.post("vehicle_left")
+        await reach(workflow, CLOSING)
+        assert VEHICLE_CLEARED in visited(workflow)
+        assert lane.commands == ["open", "close"]
+    run(scenario)
+
+
+def test_release_is_rejected_when_no_vehicle_waits():
+    async def scenario(workflows):
+        workflow = make(workflows, fake_lane(EXIT))
+        status = await workflow.command("release")
+        assert status["state"] == IDLE
+        assert not workflow.history
+    run(scenario)
+
+
+def test_vehicle_following_through_exit_is_flagged():
+    async def scenario(workflows):
+        workflow = make(workflows, fake_lane(EXIT), reader("WP-CAB-0002"))
+        workflow.post("vehicle_arrived")
+        await reach(workflow, VEHICLE_PRESENT)
+        await workflow.command("release")
+        workflow.post("gate_opened")
+        await reach(workflow, OPEN)
+
+        workflow.post("vehicle_arrived")
+        await asyncio.sleep(0.05)
+        assert len(workflow.alerts) == 1
+        assert workflow.alerts[0]["type"] == "tailgate"
+        assert workflow.last_result["tailgate"] is True
+        assert workflow.alerts[0]["plate_number"] == "WP-CAB-0002"
+    run(scenario)
+
+
+def test_safety_reversal_reopens_closing_gate():
+    async def scenario(workflows):
+        workflow = make(workflows, fake_lane(ENTRY))
+        await workflow.command("open")
+        workflow.post("gate_opened")
+        await reach(workflow, OPEN)
+        await workflow.command("close")
+        assert workflow.state == CLOSING
+        workflow.post("gate_opened")
+        await reach(workflow, OPEN)
+        assert workflow.history[-1]["reason"] == "safety reversal"
+    run(scenario)
+
+
+def test_unknown_command_leaves_lane_alone():
+    async def scenario(workflows):
+        workflow = make(workflows, fake_lane(ENTRY))
+        status = await workflow.command("jump")
+        assert status["state"] == IDLE
+    run(scenario)
+
+
+def test_emergency_open_overrides_vehicle_in_recognition():
+    async def scenario(workflows):
+        lane = fake_lane(ENTRY)
+        workflow = make(workflows, lane, reader(gate=asyncio.Event()))
+        workflow.post("vehicle_arrived")
+        await reach(workflow, RECOGNIZING)
+
+        status = await workflow.command("emergency_open")
+        assert status["state"] == EMERGENCY_OPEN
+        assert status["gate_up"] is True
+        assert lane.commands == ["open"]
+        assert workflow.last_result["success"] is False
+        assert workflow.last_result["error"] == "Emergency override"
+    run(scenario)
+
+
+def test_emergency_state_ignores_plc_events_and_normal_commands():
+    async def scenario(workflows):
+        lane = fake_lane(ENTRY)
+        workflow = make(workflows, lane)
+        await workflow.command("emergency_open")
+        for event in ("vehicle_arrived", "gate_closed", "vehicle_left"):
+            workflow.post(event)
+        await workflow.command("close")
+        await asyncio.sleep(0.02)
+        assert workflow.state == EMERGENCY_OPEN
+        assert lane.commands == ["open"]
+
+        status = await workflow.command("resume")
+        assert status["state"] == CLOSING
+        workflow.post("gate_closed")
+        await reach(workflow, IDLE)
+        assert lane.commands == ["open", "close"]
+    run(scenario)
+
+
+def test_emergency_close_from_open_gate_and_resume():
+    async def scenario(workflows):
+        lane = fake_lane(ENTRY)
+        workflow = make(workflows, lane)
+        await workflow.command("open")
+        workflow.post("gate_opened")
+        await reach(workflow, OPEN)
+
+        status = await workflow.command("emergency_close")
+        assert status["state"] == EMERGENCY_CLOSED
+        assert status["gate_up"] is False
+        assert (await workflow.command("resume"))["state"] == IDLE
+        assert lane.commands == ["open", "close"]
+    run(scenario)
+
+
+def test_gate_manager_emergency_goes_through_every_workflow(monkeypatch):
+    async def scenario(workflows):
+        registry = LaneRegistry([fake_lane(ENTRY, enabled=False), fake_lane(EXIT, enabled=False)])
+        lane_workflows = LaneWorkflows(registry, reader())
+        workflows.extend(lane_workflows.workflows.values())
+        monkeypatch.setattr(gate_manager, "get_lane_workflows", lambda: lane_workflows)
+        manager = gate_manager.GateManager()
+
+        result = await manager.emergency_open_all_gates()
+        assert result["success"] is True
+        assert result["opened"] == {ENTRY: EMERGENCY_OPEN, EXIT: EMERGENCY_OPEN}
+        assert all(status["gate_up"] for status in lane_workflows.status())
+
+        result = await manager.resume_all_gates()
+        assert result["resumed"] == {ENTRY: IDLE, EXIT: IDLE}
+        assert [lane.commands for lane in registry.lanes.values()] == [["open", "close"]] * 2
+    run(scenario)
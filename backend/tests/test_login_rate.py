@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.db.models import LoginAttempt
+from app.routers import auth_deps
+from app.routers.auth_deps import check_login_rate, client_ip
+from app.services import passwords
+from app.services.passwords import LoginRateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(passwords, "_utcnow", clock)
+    return clock
+
+
+def test_failures_lock_the_username_from_that_address_only(db, clock):
+    limiter = LoginRateLimiter(max_failures=3, failure_window=60, ip_attempts=100, ip_window=60)
+    for _ in range(3):
+        assert limiter.check(db, "10.0.0.1", "staff:alice") == 0
+        limiter.failed(db, "staff:alice", "10.0.0.1")
+    assert limiter.check(db, "10.0.0.1", "staff:alice") == 61
+    assert limiter.check(db, "10.0.0.2", "staff:alice") == 0
+    assert limiter.check(db, "10.0.0.1", "staff:bob") == 0
+
+
+def test_lockout_ends_with_the_window(db, clock):
+    limiter = LoginRateLimiter(max_failures=2, failure_window=60, ip_attempts=100, ip_window=60)
+    limiter.failed(db, "staff:alice", "10.0.0.1")
+    clock.advance(30)
+    limiter.failed(db, "staff:alice", "10.0.0.1")
+    assert limiter.check(db, "10.0.0.1", "staff:alice") == 31
+    clock.advance(31)
+    assert limiter.check(db, "10.0.0.1", "staff:alice") == 0
+
+
+def test_success_clears_failures(db, clock):
+    limiter = LoginRateLimiter(max_failures=2, failure_window=60, ip_attempts=100, ip_window=60)
+    limiter.failed(db, "staff:alice", "10.0.0.1")
+    limiter.succeeded(db, "staff:alice", "10.0.0.1")
+    limiter.failed(db, "staff:alice", "10.0.0.1")
+    assert limiter.check(db, "10.0.0.1", "staff:alice") == 0
+
+
+def test_attempts_per_address_are_capped(db, clock):
+    limiter = LoginRateLimiter(max_failures=5, failure_window=60, ip_attempts=3, ip_window=10)
+    assert [limiter.check(db, "10.0.0.1") for _ in range(4)] == [0, 0, 0, 11]
+    assert limiter.check(db, "10.0.0.2") == 0
+    clock.advance(10)
+    assert limiter.check(db, "10.0.0.1") == 0
+
+
+
+def test_limits_are_shared_by_every_limiter_on_the_database(db, clock):
+    """Each API worker has its own limiter; they count the same rows"""
+    worker_a = LoginRateLimiter(max_failures=2, failure_window=60, ip_attempts=100, ip_window=60)
+    worker_b = LoginRateLimiter(max_failures=2, failure_window=60, ip_attempts=100, ip_window=60)
+    worker_a.failed(db, "staff:alice", "10.0.0.1")
+    worker_b.failed(db, "staff:alice", "10.0.0.1")
+    assert worker_a.check(db, "10.0.0.1", "staff:alice") == 61
+    worker_a.succeeded(db, "staff:alice", "10.0.0.1")
+    assert worker_b.check(db, "10.0.0.1", "staff:alice") == 0
+
+
+def test_rows_past_every_window_are_deleted(db, clock):
+    limiter = LoginRateLimiter(max_failures=5, failure_window=60, ip_attempts=100, ip_window=10)
+    limiter.check(db, "10.0.0.1")
+    limiter.failed(db, "staff:alice", "10.0.0.1")
+    clock.advance(passwords.LIMITER_SWEEP_INTERVAL + 1)
+    limiter.check(db, "10.0.0.2")
+    assert [row.ip for row in db.query(LoginAttempt)] == ["10.0.0.2"]
+
+
+def request(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", value.encode()) for value in ([forwarded] if forwarded else [])]
+    return Request({"type": "http", "method": "POST", "path": "/auth/login", "headers": headers,
+                    "client": (peer, 50000)})
+
+
+@pytest.fixture
+def behind_nginx(monkeypatch):
+    monkeypatch.setattr(auth_deps, "TRUSTED_PROXIES", [auth_deps.ipaddress.ip_network("172.28.0.10"),
+                                                       auth_deps.ipaddress.ip_network("10.1.0.0/16")])
+
+
+def test_forwarded_header_is_ignored_without_trusted_proxies():
+    assert client_ip(request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_forwarded_header_is_ignored_from_untrusted_peer(behind_nginx):
+    assert client_ip(request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_client_is_the_last_untrusted_hop(behind_nginx):
+    assert client_ip(request("172.28.0.10", "198.51.100.1")) == "198.51.100.1"
+    # A spoofed entry on the left and a second trusted proxy on the right
+    assert client_ip(request("172.28.0.10", "1.2.3.4, 198.51.100.1, 10.1.2.3")) == "198.51.100.1"
+    assert client_ip(request("172.28.0.10")) == "172.28.0.10"
+    assert client_ip(request("172.28.0.10", "garbage")) == "garbage"
+
+
+def test_check_login_rate_answers_429_with_retry_after(db, monkeypatch, behind_nginx, clock):
+    monkeypatch.setattr(auth_deps, "login_limiter",
+                        LoginRateLimiter(max_failures=1, failure_window=60, ip_attempts=100, ip_window=60))
+    ip = check_login_rate(request("172.28.0.10", "198.51.100.1"), db, "staff:alice")
+    assert ip == "198.51.100.1"
+    auth_deps.login_limiter.failed(db, "staff:alice", ip)
+    with pytest.raises(HTTPException) as raised:
+        check_login_rate(request("172.28.0.10", "198.51.100.1"), db, "staff:alice")
+    assert raised.value.status_code == 429
+    assert raised.value.headers == {"Retry-After": "61"}
+    assert check_login_rate(request("172.28.0.10", "198.51.100.2"), db, "staff:alice") == "198.51.100.2"
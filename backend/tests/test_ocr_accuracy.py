@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from benchmarks.ocr_accuracy import build_report, edit_distance, load_corpus, normalize, plate_from_filename
+
+
+def test_plates_compare_without_separators():
+    assert normalize("wp-cab 1234") == "WPCAB1234"
+    assert normalize(None) == ""
+
+
+def test_ground_truth_comes_from_filename():
+    assert plate_from_filename("WP-CAB-1234.jpg") == "WP-CAB-1234"
+    assert plate_from_filename("wp cab 1234_night.png") == "WP-CAB-1234"
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("WPCAB1234", "WPCAB1234", 0),
+    ("WPCAB1234", "WPCA81234", 1),
+    ("WPCAB1234", "WPCAB123", 1),
+    ("", "KN1062", 6),
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b) == distance
+
+
+def test_labels_override_filenames(tmp_path):
+    for name in ("WP-CAB-1234.jpg", "IMG_0042.jpg", "IMG_0043.jpg", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    labels = tmp_path / "labels.json"
+    labels.write_text(json.dumps({"IMG_0042.jpg": {"plate": "KN-1062", "type_code": "VAN"},
+                                  "IMG_0043.jpg": "WP-CAD-0001"}))
+
+    corpus = load_corpus(tmp_path, labels)
+    assert [(name, plate, type_code) for name, _, plate, type_code in corpus] == [
+        ("IMG_0042.jpg", "KN-1062", "VAN"),
+        ("IMG_0043.jpg", "WP-CAD-0001", None),
+        ("WP-CAB-1234.jpg", "WP-CAB-1234", None),
+    ]
+    assert len(load_corpus(tmp_path, limit=1)) == 1
+
+
+def result(file, plate, truth, char_errors=0, type_correct=True):
+    return {"file": file, "truth": truth, "plate": plate, "exact": char_errors == 0 and plate is not None,
+            "char_errors": char_errors, "truth_chars": 9, "expected_type": "CAR",
+            "type_code": "CAR" if type_correct else "VAN", "type_correct": type_correct, "total_ms": 100.0,
+            "passes": {"gray": {"preprocess_ms": 2.0, "ocr_ms": 90.0}}, "error": None}
+
+
+def test_report_scores_reads_and_lists_mismatches():
+    report = build_report([
+        result("a.jpg", "WP-CAB-1234", "WP-CAB-1234"),
+        result("b.jpg", "WP-CA8-1234", "WP-CAB-1234", char_errors=1),
+        result("c.jpg", None, "WP-CAB-1234", char_errors=9, type_correct=False),
+        result("d.jpg", "WP-CAB-1235", "WP-CAB-1235"),
+    ], model_load_ms=1234.56)
+
+    assert report["images"] == 4
+    assert report["read_rate"] == 0.75
+    assert report["exact_accuracy"] == 0.5
+    assert report["char_accuracy"] == round(26 / 36, 4)
+    assert report["type_accuracy"] == 0.75
+    assert report["model_load_ms"] == 1234.6
+    assert report["passes"]["gray"]["runs"] == 4
+    assert [m["file"] for m in report["mismatches"]] == ["b.jpg", "c.jpg"]
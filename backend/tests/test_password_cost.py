@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import AppSetting
+from app.services import passwords
+from app.services.passwords import BCRYPT_ROUNDS_SETTING, bcrypt_rounds, configure_password_cost
+
+
+@pytest.fixture
+def sessions(db):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+
+
+@pytest.fixture
+def host(monkeypatch):
+    """A host where cost 10 takes 10 ms, so 14 is the highest within the 250 ms target"""
+    timed = []
+
+    def bcrypt_ms(rounds):
+        timed.append(rounds)
+        return 10 * 2 ** (rounds - 10)
+
+    monkeypatch.setattr(passwords, "BCRYPT_ROUNDS", None)
+    monkeypatch.setattr(passwords, "BCRYPT_TARGET_MS", 250)
+    monkeypatch.setattr(passwords, "pwd_context", passwords.pwd_context)
+    monkeypatch.setattr(passwords, "_bcrypt_ms", bcrypt_ms)
+    return timed
+
+
+def stored(db):
+    db.expire_all()
+    setting = db.get(AppSetting, BCRYPT_ROUNDS_SETTING)
+    return setting and setting.value
+
+
+def test_cost_is_measured_once_and_stored(db, sessions, host):
+    assert configure_password_cost(sessions, background=False) == 14
+    assert bcrypt_rounds() == 14
+    assert stored(db) == "14"
+
+    host.clear()
+    assert configure_password_cost(sessions, background=False) == 14
+    assert host == []
+
+
+def test_first_start_measures_in_the_background(db, sessions, host):
+    assert configure_password_cost(sessions) == passwords.DEFAULT_BCRYPT_ROUNDS
+    for thread in threading.enumerate():
+        if thread.name == "bcrypt-cost":
+            thread.join(timeout=5)
+    assert bcrypt_rounds() == 14
+    assert stored(db) == "14"
+
+
+def test_cost_stored_by_another_process_wins(db, sessions, host):
+    db.add(AppSetting(key=BCRYPT_ROUNDS_SETTING, value="13"))
+    db.commit()
+    with sessions() as other:
+        assert passwords.store_bcrypt_rounds(other, 14) == 13
+    assert passwords.calibrate_password_cost(sessions) == 13
+    assert bcrypt_rounds() == 13
+
+
+def test_bcrypt_rounds_overrides_the_stored_cost(db, sessions, host, monkeypatch):
+    monkeypatch.setattr(passwords, "BCRYPT_ROUNDS", "5")
+    assert configure_password_cost(sessions) == 5
+    assert host == []
+    assert stored(db) is None
+
+
+def test_missing_settings_table_falls_back_to_default(host):
+    empty = sessionmaker(bind=create_engine("sqlite://"))
+    assert configure_password_cost(empty) == passwords.DEFAULT_BCRYPT_ROUNDS
+    assert host == []
@@ -0,0 +1,52 @@
+import pytest
+
+from app.services.plates import canonical_plate, find_plate, is_canonical_plate, parse_plate, plate_key
+
+
+@pytest.mark.parametrize("text, canonical, key, type_code", [
+    ("WP-CAB-1234", "WP-CAB-1234", "WPCAB1234", "CAR"),
+    ("wp cab 1234", "WP-CAB-1234", "WPCAB1234", "CAR"),
+    ("WPCAB1234", "WP-CAB-1234", "WPCAB1234", "CAR"),
+    ("  WP   BAA-0001 ", "WP-BAA-0001", "WPBAA0001", "BIKE"),
+    ("CAB-1234", "CAB-1234", "CAB1234", "CAR"),
+    ("PD 4455", "PD-4455", "PD4455", "VAN"),
+    ("KN1062", "KN-1062", "KN1062", "CAR"),
+    ("NC-2210", "NC-2210", "NC2210", "HEAVY"),
+    ("ZZ-1234", "ZZ-1234", "ZZ1234", "CAR"),
+])
+def test_parse_plate(text, canonical, key, type_code):
+    parsed = parse_plate(text)
+    assert parsed.canonical == canonical
+    assert parsed.key == key
+    assert parsed.type_code == type_code
+
+
+@pytest.mark.parametrize("text", [None, "", "HELLO", "WP-CAB-12345", "12-1234", "WP-CAB-1234 extra", "W-1234"])
+def test_parse_plate_rejects_non_plates(text):
+    assert parse_plate(text) is None
+
+
+def test_provincial_format_wins_inside_text():
+    assert find_plate("plate: wp cab 1234 (front)").canonical == "WP-CAB-1234"
+    assert find_plate("CAB1234 rear").canonical == "CAB-1234"
+    assert find_plate("#KN 1062").canonical == "KN-1062"
+    assert find_plate("no plate here") is None
+    assert find_plate(None) is None
+
+
+def test_canonical_forms():
+    assert is_canonical_plate("wp-cab-1234")
+    assert is_canonical_plate("KN-1062")
+    assert not is_canonical_plate("WPCAB1234")
+    assert not is_canonical_plate("")
+
+
+def test_canonical_plate_keeps_unparsed_input_trimmed():
+    assert canonical_plate("wp cab 1234") == "WP-CAB-1234"
+    assert canonical_plate("  temp   plate ") == "TEMP PLATE"
+    assert canonical_plate(None) == ""
+
+
+def test_plate_key_matches_any_spelling():
+    assert plate_key("WP-CAB-1234") == plate_key("wp cab 1234") == plate_key("WPCAB1234") == "WPCAB1234"
+    assert plate_key(None) == ""
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import socket
+
+import pytest
+
+pytest.importorskip("pymodbus")
+
+from app.services import lanes, plc_controller, plc_poller
+from app.services.plc_simulator import arrival_times
+from scripts import simulate_lanes
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def fresh_plcs(monkeypatch):
+    """Controllers, pollers and lanes created by a test are its own and are shut down after it"""
+    monkeypatch.setattr(plc_controller, "PLC_CONFIG_PATH", plc_controller.PLC_CONFIG_PATH)
+    monkeypatch.setattr(plc_controller, "_plc_controllers", {})
+    monkeypatch.setattr(plc_poller, "_plc_pollers", {})
+    monkeypatch.setattr(lanes, "_lane_registry", None)
+    yield
+    for controller in plc_controller._plc_controllers.values():
+        controller.disconnect()
+
+
+def test_uniform_arrivals_are_evenly_spaced():
+    assert arrival_times(6, 60, poisson=False) == [10.0, 20.0, 30.0, 40.0, 50.0]
+    assert arrival_times(0, 60) == []
+
+
+def test_poisson_arrivals_repeat_with_seed():
+    first = arrival_times(30, 120, seed=7)
+    assert first == arrival_times(30, 120, seed=7)
+    assert all(0 < t < 120 for t in first)
+    assert first == sorted(first)
+
+
+def test_lanes_serve_simulated_traffic_over_modbus(fresh_plcs):
+    args = argparse.Namespace(
+        rate=30, duration=4, drain=20, lanes=None, uniform=True, seed=1,
+        ocr_ms=20, payment_ms=50, travel=0.2, pass_time=0.2, headway=0.1, close_delay=0.1,
+        port=free_port(), serve_only=False, json=True,
+    )
+    report = asyncio.run(simulate_lanes.run(args))
+
+    assert set(report["lanes"]) == {"entry", "exit"}
+    for lane_id, lane in report["lanes"].items():
+        assert lane["queued"] == 0, lane_id
+        assert lane["completed"] == len(arrival_times(30, 4, poisson=False)), lane_id
+        assert lane["gate_cycles"] >= 1
+    link = report["plc_links"]["default"]
+    assert link["metrics"]["requests"] > 0
+    assert link["metrics"]["failures"] == 0
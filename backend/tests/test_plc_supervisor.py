@@ -0,0 +1,88 @@
+from app.services import plc_supervisor
+from app.services.plc_supervisor import CLOSED, HALF_OPEN, OPEN, ConnectionSupervisor
+
+
+class Response:
+    def __init__(self, error=False):
+        self.error = error
+
+    def isError(self):
+        return self.error
+
+
+def supervisor(**kwargs):
+    kwargs.setdefault("failure_threshold", 2)
+    kwargs.setdefault("max_retries", 0)
+    return ConnectionSupervisor(connect=lambda: True, disconnect=lambda: None, **kwargs)
+
+
+def fail():
+    raise ConnectionError("link down")
+
+
+def test_success_keeps_circuit_closed():
+    sup = supervisor()
+    assert isinstance(sup.call("read", lambda: Response()), Response)
+    assert sup.state == CLOSED
+    assert sup.metrics.requests == 1
+
+
+def test_opens_after_threshold_and_rejects_fast():
+    sup = supervisor()
+    sup.call("read", fail)
+    assert sup.state == CLOSED
+    sup.call("read", fail)
+    assert sup.state == OPEN
+    calls = []
+    assert sup.call("read", lambda: calls.append(1)) is None
+    assert calls == []
+    assert sup.metrics.rejected == 1
+    assert sup.metrics.circuit_opens == 1
+
+
+def test_probes_are_not_counted_as_rejected():
+    sup = supervisor()
+    sup.call("read", fail)
+    sup.call("read", fail)
+    for _ in range(10):
+        assert sup.call("heartbeat", lambda: Response(), probe=True) is None
+        assert not sup.allow_request(probe=True)
+    assert sup.metrics.rejected == 0
+
+
+def test_half_open_trial_closes_or_reopens_with_doubled_backoff(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(plc_supervisor.time, "monotonic", lambda: now[0])
+    sup = supervisor(backoff_initial=1, backoff_max=4)
+    sup.call("read", fail)
+    sup.call("read", fail)
+    assert sup.retry_at == 1001.0
+
+    now[0] = 1001.5
+    sup.call("read", fail)  # half-open trial fails
+    assert sup.state == OPEN
+    assert sup.retry_at == 1003.5  # backoff doubled to 2s
+
+    now[0] = 1004.0
+    assert sup.allow_request()
+    assert sup.state == HALF_OPEN
+    sup.record_success()
+    assert sup.state == CLOSED
+    assert sup.backoff == 1
+
+
+def test_backoff_is_capped():
+    sup = supervisor(backoff_initial=1, backoff_max=4)
+    for _ in range(6):
+        sup.record_failure("down")
+    assert sup.backoff == 4
+
+
+def test_modbus_exception_response_is_not_a_link_failure():
+    class ExceptionResponse(Response):
+        exception_code = 2
+
+    sup = supervisor()
+    result = sup.call("read", lambda: ExceptionResponse(error=True))
+    assert isinstance(result, ExceptionResponse)
+    assert sup.consecutive_failures == 0
@@ -0,0 +1,98 @@
+import pytest
+
+from app.db.models import ParkingSpot, VehicleType
+from app.services import spot_assignment
+from app.services.spot_assignment import (BalanceZonesStrategy, BookingsNearGateStrategy, FillByLevelStrategy,
+                                          SpotAllocator, SpotInfo, SpotStrategy, _Pool)
+
+
+def layout(*spots):
+    """SpotInfo for (id, zone, level, distance_rank) tuples, all of type 1"""
+    return [SpotInfo(spot_id, 1, zone, level, rank) for spot_id, zone, level, rank in spots]
+
+
+def drain(pool):
+    order = []
+    while (spot_id := pool.pop()) is not None:
+        order.append(spot_id)
+    return order
+
+
+def test_nearest_takes_ranked_spots_first():
+    spots = layout((1, None, 0, None), (2, None, 0, 5), (3, None, 0, 1), (4, None, 0, None), (5, None, 0, 2))
+    assert drain(_Pool(SpotStrategy(), False, spots)) == [3, 5, 2, 1, 4]
+
+
+def test_balance_zones_pops_from_the_emptiest_zone():
+    spots = layout((1, "A", 0, 1), (2, "A", 0, 2), (3, "A", 0, 3), (4, "B", 0, 4), (5, "B", 0, 5))
+    # A has 3 free, so it gives one first; then A and B tie at 2 and A wins by name
+    assert drain(_Pool(BalanceZonesStrategy(), False, spots)) == [1, 2, 4, 3, 5]
+
+
+def test_bookings_near_gate_keeps_front_ranks_for_bookings():
+    spots = layout((1, None, 0, 1), (2, None, 0, 2), (3, None, 0, 3), (4, None, 0, 4))
+    strategy = BookingsNearGateStrategy(booking_ranks=2)
+    assert drain(_Pool(strategy, False, spots)) == [3, 4, 1, 2]
+    assert drain(_Pool(strategy, True, spots)) == [1, 2, 3, 4]
+
+
+def test_fill_by_level_fills_lower_floors_first():
+    spots = layout((1, None, 1, 1), (2, None, 0, 3), (3, None, 2, 1), (4, None, 0, 2))
+    assert drain(_Pool(FillByLevelStrategy(), False, spots)) == [4, 2, 1, 3]
+
+
+def test_discarded_and_rekeyed_spots_are_skipped():
+    spots = layout((1, None, 0, 1), (2, None, 0, 2), (3, None, 0, 3))
+    pool = _Pool(SpotStrategy(), False, spots)
+    pool.discard(1)
+    pool.push(SpotInfo(2, 1, None, 0, 9))
+    assert drain(pool) == [3, 2]
+
+
+@pytest.fixture
+def car_spots(db, monkeypatch):
+    allocator = SpotAllocator(SpotStrategy())
+    monkeypatch.setattr(spot_assignment, "_allocator", allocator)
+    car = VehicleType(code="CAR", name="Car")
+    db.add(car)
+    db.flush()
+    rows = [ParkingSpot(label=f"C{rank}", type_id=car.id, distance_rank=rank) for rank in (1, 2, 3)]
+    db.add_all(rows)
+    db.commit()
+    return allocator, car.id, {spot.label: spot.id for spot in rows}
+
+
+def test_candidates_are_handed_out_once(db, car_spots):
+    allocator, type_id, ids = car_spots
+    first = allocator.candidates(db, type_id)
+    second = allocator.candidates(db, type_id)
+    assert [next(first), next(second), next(first)] == [ids["C1"], ids["C2"], ids["C3"]]
+
+
+def test_spot_freed_on_commit_is_offered_again(db, car_spots):
+    allocator, type_id, ids = car_spots
+    assert next(allocator.candidates(db, type_id)) == ids["C1"]
+    spot = db.get(ParkingSpot, ids["C1"])
+    spot.is_occupied = True
+    db.commit()
+    assert next(allocator.candidates(db, type_id)) == ids["C2"]
+
+    spot.is_occupied = False
+    db.commit()
+    assert next(allocator.candidates(db, type_id)) == ids["C1"]
+
+
+def test_suggest_does_not_take_the_spot(db, car_spots):
+    allocator, type_id, ids = car_spots
+    assert allocator.suggest(db, type_id).id == ids["C1"]
+    assert allocator.suggest(db, type_id).id == ids["C1"]
+    assert next(allocator.candidates(db, type_id)) == ids["C1"]
+
+
+def test_layout_change_rebuilds_the_order(db, car_spots):
+    allocator, type_id, ids = car_spots
+    assert allocator.suggest(db, type_id).id == ids["C1"]
+    spot = db.get(ParkingSpot, ids["C3"])
+    spot.distance_rank = 0
+    db.commit()
+    assert allocator.suggest(db, type_id).id == ids["C3"]
@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import ParkingSpot, VehicleType
+from app.services import spot_assignment
+from app.services.spots import claim_free_spot, claim_spot
+
+
+@pytest.fixture
+def allocator(monkeypatch):
+    allocator = spot_assignment.SpotAllocator(spot_assignment.SpotStrategy())
+    monkeypatch.setattr(spot_assignment, "_allocator", allocator)
+    return allocator
+
+
+@pytest.fixture
+def spots(db, allocator):
+    car = VehicleType(code="CAR", name="Car")
+    db.add(car)
+    db.flush()
+    rows = [ParkingSpot(label=f"C{rank}", type_id=car.id, distance_rank=rank) for rank in (3, 1, 2)]
+    db.add_all(rows)
+    db.commit()
+    return {spot.label: spot for spot in rows}
+
+
+def test_entry_occupies_a_free_spot_once(db, spots):
+    assert claim_spot(db, spots["C1"]) is True
+    assert spots["C1"].is_occupied
+    assert claim_spot(db, spots["C1"]) is False
+
+
+def test_booking_needs_an_unreserved_spot_and_entry_may_take_it(db, spots):
+    assert claim_spot(db, spots["C2"], reserve=True) is True
+    assert spots["C2"].booking and not spots["C2"].is_occupied
+    assert claim_spot(db, spots["C2"], reserve=True) is False
+    # The booked vehicle arriving
+    assert claim_spot(db, spots["C2"]) is True
+
+
+def test_stale_copy_in_another_session_loses_the_claim(db, spots):
+    other = sessionmaker(bind=db.get_bind())()
+    try:
+        stale = other.get(ParkingSpot, spots["C3"].id)
+        assert claim_spot(db, spots["C3"]) is True
+        db.commit()
+        assert claim_spot(other, stale) is False
+        assert stale.is_occupied
+    finally:
+        other.close()
+
+
+def test_free_spots_are_claimed_nearest_first_until_full(db, spots):
+    type_id = spots["C1"].type_id
+    claimed = [claim_free_spot(db, type_id).label for _ in range(3)]
+    assert claimed == ["C1", "C2", "C3"]
+    assert claim_free_spot(db, type_id) is None
+
+
+def test_reservations_skip_booked_spots(db, spots):
+    type_id = spots["C1"].type_id
+    claim_spot(db, spots["C1"], reserve=True)
+    db.commit()
+    spot = claim_free_spot(db, type_id, reserve=True)
+    assert spot.label == "C2"
+    assert spot.booking and not spot.is_occupied
+
+
+def test_rollback_releases_the_claim(db, spots):
+    type_id = spots["C1"].type_id
+    assert claim_free_spot(db, type_id).label == "C1"
+    db.rollback()
+    assert not db.get(ParkingSpot, spots["C1"].id).is_occupied
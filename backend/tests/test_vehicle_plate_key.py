@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.db.models import Vehicle, VehicleType
+
+
+@pytest.fixture
+def car(db):
+    vtype = VehicleType(code="CAR", name="Car")
+    db.add(vtype)
+    db.commit()
+    return vtype
+
+
+def test_plates_are_stored_canonical_with_key(db, car):
+    vehicle = Vehicle(plate_number="wp cab 1234", type_id=car.id)
+    db.add(vehicle)
+    db.commit()
+    assert (vehicle.plate_number, vehicle.plate_key) == ("WP-CAB-1234", "WPCAB1234")
+
+    found = db.query(Vehicle).filter(Vehicle.plate_key == "WPCAB1234").one()
+    assert found.id == vehicle.id
+
+
+def test_key_follows_plate_updates(db, car):
+    vehicle = Vehicle(plate_number="CAB-1234", type_id=car.id)
+    db.add(vehicle)
+    db.commit()
+    vehicle.plate_number = "wpcad0001"
+    db.commit()
+    assert (vehicle.plate_number, vehicle.plate_key) == ("WP-CAD-0001", "WPCAD0001")
+
+
+def test_same_plate_spelled_differently_is_one_vehicle(db, car):
+    db.add(Vehicle(plate_number="WP-CAB-1234", type_id=car.id))
+    db.commit()
+    db.add(Vehicle(plate_number="WPCAB 1234", type_id=car.id))
+    with pytest.raises(IntegrityError):
+        db.commit()
@@ -397,10 +397,9 @@ export default function ControllerEntry() {
             );
             
             console.log('✓ Mobile booking found:', bookingResponse.data);
-            setQrInput(bookingResponse.data.qr_code_data);
             
-            // Validate the booking
-            await validateMobileBooking(bookingResponse.data.qr_code_data);
+            // The search already validated the booking
+            applyBookingValidation(bookingResponse.data);
             
             // Stop OCR detection after successful mobile booking validation
             setAutoDetecting(false);
@@ -763,6 +762,38 @@ export default function ControllerEntry() {
     startAutoDetection();
   };
 
+  // Fill the entry form from a validated booking (validate-qr or search-by-plate response)
+  const applyBookingValidation = (booking) => {
+    let plateNumber = booking.plate_number;
+    
+    // Format plate number: "CAV 8537-A" -> "CAV-8537"
+    // Remove everything after the last digit
+    plateNumber = plateNumber.replace(/\s+/g, '-').replace(/-[A-Z]+$/, '');
+    
+    const vehicleTypeCode = booking.vehicle_type?.code || '';
+    const bookedSpotLabel = booking.spot_label;
+    
+    console.log('📱 Mobile Booking Data:', {
+      plate: plateNumber,
+      typeCode: vehicleTypeCode,
+      bookedSpot: bookedSpotLabel,
+      bookingId: booking.booking_id
+    });
+    
+    // Auto-fill the Vehicle Entry Form with booking data
+    setPlate(plateNumber);
+    setTypeCode(vehicleTypeCode);
+    setSpotLabel(bookedSpotLabel);
+    setBookingValidation(booking);
+    
+    // Stop auto-detection since we have valid booking
+    if (autoDetecting) {
+      stopAutoDetection();
+    }
+
+    setSuccess(`✓ Booking Validated!\nForm auto-filled - Please review and submit manually`);
+  };
+
   const validateMobileBooking = async (qrData) => {
     setLoading(true);
     setError('');
@@ -781,36 +812,7 @@ export default function ControllerEntry() {
       console.log('Validation response:', response.data);
 
       if (response.data.valid) {
-        // Get booking data from validation response
-        let plateNumber = response.data.plate_number;
-        
-        // Format plate number: "CAV 8537-A" -> "CAV-8537"
-        // Remove everything after the last digit
-        plateNumber = plateNumber.replace(/\s+/g, '-').replace(/-[A-Z]+$/, '');
-        
-        const vehicleTypeCode = response.data.vehicle_type?.code || '';
-        const bookedSpotLabel = response.data.spot_label;
-        
-        console.log('📱 Mobile Booking Data:', {
-          plate: plateNumber,
-          typeCode: vehicleTypeCode,
-          bookedSpot: bookedSpotLabel,
-          bookingId: response.data.booking_id
-        });
-        
-        // Auto-fill the Vehicle Entry Form with booking data
-        setPlate(plateNumber);
-        setTypeCode(vehicleTypeCode);
-        setSpotLabel(bookedSpotLabel);
-        setBookingValidation(response.data);
-        
-        // Stop auto-detection since we have valid booking
-        if (autoDetecting) {
-          stopAutoDetection();
-        }
-
-        setSuccess(`✓ Booking Validated!\nForm auto-filled - Please review and submit manually`);
-
+        applyBookingValidation(response.data);
       } else {
         setError(`❌ Invalid Booking: ${response.data.message}`);
       }
@@ -837,10 +839,9 @@ export default function ControllerEntry() {
 
       console.log('Plate search response:', response.data);
 
-      // Auto-fill QR and validate
-      if (response.data.qr_code_data) {
-        setQrInput(response.data.qr_code_data);
-        await validateMobileBooking(response.data.qr_code_data);
+      // The search returns the validated booking; fill the form from it
+      if (response.data.valid) {
+        applyBookingValidation(response.data);
       }
     } catch (err) {
       console.error('Plate search error:', err);